@@ -1,17 +1,40 @@
 import streamlit as st
+import html
 import json
-import base64
+import os
 import uuid
-from io import BytesIO
-from PIL import Image
-from datetime import datetime
+import zipfile
+from datetime import datetime, timedelta
 import time
 
 # Import utility functions
-from utils.content_generation.content_generation import generate_text, generate_image
-from utils.project_management.project_management import create_project, export_project
-from utils.asset_management.asset_management import save_to_project
+from utils.content_generation.content_generation import (
+    generate_text_variants, generate_text_stream, generate_image_variants, find_similar_generations,
+    GenerationError
+)
+from utils.project_management.project_management import (
+    create_project, get_project_by_id, get_project_by_name,
+    list_projects, count_projects, clear_all_data
+)
+from utils.project_management.project_archive import (
+    export_project_archive, import_project_archive, list_import_files
+)
+from utils.asset_management.asset_management import (
+    save_to_project, get_all_assets, count_assets, search_assets, count_search_results,
+    get_recent_history, get_history_range, count_history, get_image_preview,
+    get_image_rendition, find_duplicate_images, find_similar_images, collect_garbage
+)
+from utils.blob_store.blob_store import is_blob_ref
+from utils.renditions.renditions import get_rendition_cache, PLATFORM_RENDITIONS
+from utils.content_generation.client_pool import get_client_pool
+from utils.content_generation.response_cache import get_response_cache
+from utils.content_generation.rate_limiter import get_limiter_states
+from utils.job_queue.job_queue import get_job_queue, job_owner, ACTIVE_STATES, DONE
+from utils.search_index.search_index import HIGHLIGHT_START
+from utils.prompt_templates.prompt_templates import GENERATION_TYPES, IMAGE, build_prompt, get_template
+from utils.metrics.metrics import get_metrics, span, METRICS_PORT, METRICS_FILE, SAMPLE_SIZE
 from utils.session_helpers.session_helpers import initialize_session_state
+from utils.storage.storage import lock_data_dir
 
 # Set page configuration
 st.set_page_config(
@@ -21,13 +44,149 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def load_styles():
+    # Read once per process; every rerun of every session reuses the same string
+    with open("static/styles.css") as f:
+        return f'<style>{f.read()}</style>'
+
 # Apply CSS
-with open("static/styles.css") as f:
-    st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
+st.markdown(load_styles(), unsafe_allow_html=True)
+
+# The in-memory indexes assume this process is the only writer to the data directory
+if not lock_data_dir():
+    st.error("The data directory is in use by another process, e.g. a bulk_generate.py run or a second "
+             "copy of the app. Reload this page once it has finished.")
+    st.stop()
 
 # Initialize session state
 initialize_session_state()
 
+# Width of image previews in the three-column asset grids
+GRID_PREVIEW_WIDTH = 320
+# Widths of the previews in the image dialog and of generated images (one or several side by side)
+FULL_PREVIEW_WIDTH = 1280
+VARIANT_PREVIEW_WIDTH = 640
+LIBRARY_PAGE_SIZES = [12, 24, 48, 96]
+DEFAULT_LIBRARY_PAGE_SIZE = 24
+
+# How often the background job panel polls for finished jobs
+JOB_POLL_SECONDS = 2
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_background_jobs():
+    # Reruns on its own every few seconds without rerunning the rest of the page
+    if not st.session_state.api_key:
+        return
+    # Only this user's jobs, for the selected project if there is one
+    jobs = get_job_queue().list_jobs(
+        job_owner(st.session_state.api_key), project_id=st.session_state.current_project, limit=10
+    )
+    if not jobs:
+        return
+    
+    st.markdown("<h3 style='margin-top: 30px;'>Background Jobs</h3>", unsafe_allow_html=True)
+    for job in jobs:
+        job_col1, job_col2, job_col3 = st.columns([4, 1, 1])
+        with job_col1:
+            icon = "📝" if job["kind"] == "text" else "🖼️"
+            status = {"queued": "⏳ Queued", "running": "⚙️ Running", "done": "✅ Done", "failed": "❌ Failed"}[job["state"]]
+            st.markdown(f"{icon} **{job['params'].get('generation_type', job['kind'])}** "
+                        f"({job['params'].get('count', 1)} variant(s)) · {status} · "
+                        f"<small>{job['created_at']}</small>", unsafe_allow_html=True)
+            if job["error"]:
+                st.caption(job["error"])
+        with job_col2:
+            if job["state"] == DONE and st.button("Open", key=f"job_open_{job['id']}", use_container_width=True):
+                st.session_state.generated_content = {
+                    "id": job["id"],
+                    "type": job["kind"],
+                    "variants": job["result"]["variants"],
+                    "prompt": job["params"]["prompt"],
+                    "generation_type": job["params"].get("generation_type")
+                }
+                get_job_queue().dismiss(job["id"])
+                st.rerun()
+        with job_col3:
+            if job["state"] not in ACTIVE_STATES and st.button("Dismiss", key=f"job_dismiss_{job['id']}", use_container_width=True):
+                get_job_queue().dismiss(job["id"])
+                st.rerun(scope="fragment")
+
+def render_pager(prefix, page_count):
+    # Previous/Next buttons over st.session_state[f"{prefix}_page"], the zero-based page shown
+    page_key = f"{prefix}_page"
+    nav_prev, nav_label, nav_next = st.columns([1, 3, 1])
+    with nav_prev:
+        if st.button("◀ Previous", key=f"{prefix}_prev", use_container_width=True,
+                     disabled=st.session_state[page_key] == 0):
+            st.session_state[page_key] -= 1
+            st.rerun()
+    with nav_label:
+        st.markdown(f"""
+        <div style="text-align: center; padding-top: 8px; color: var(--grey-600);">
+            Page {st.session_state[page_key] + 1} of {page_count}
+        </div>
+        """, unsafe_allow_html=True)
+    with nav_next:
+        if st.button("Next ▶", key=f"{prefix}_next", use_container_width=True,
+                     disabled=st.session_state[page_key] >= page_count - 1):
+            st.session_state[page_key] += 1
+            st.rerun()
+
+def read_project_export(project_id):
+    # Streamlit keeps the returned bytes for the download, so the file is closed right away
+    with open(export_project_archive(project_id), "rb") as f:
+        return f.read()
+
+@st.dialog("Image Preview", width="large")
+def show_full_image(asset):
+    # The largest preview is loaded only when the user opens it; the original stays in the export
+    try:
+        st.image(get_image_preview(asset["content"], FULL_PREVIEW_WIDTH), caption=asset["description"], use_column_width=True)
+    except Exception as e:
+        st.error(f"Error displaying image: {str(e)}")
+        return
+    st.markdown(f"<small>Created: {asset['created_at']}</small>", unsafe_allow_html=True)
+    if not is_blob_ref(asset["content"]):
+        return
+    platform = st.selectbox(
+        "Size for",
+        list(PLATFORM_RENDITIONS),
+        format_func=lambda name: PLATFORM_RENDITIONS[name]["label"],
+        key=f"rendition_{asset['id']}"
+    )
+    rendition_cache = get_rendition_cache()
+    # The rendition is read (or rendered, for older images) only when the button is clicked
+    st.download_button(
+        label="Download",
+        data=lambda: get_image_rendition(asset["content"], platform),
+        file_name=f"{asset['id']}_{platform}.{rendition_cache.image_format}",
+        mime=rendition_cache.mime_type,
+        key=f"download_rendition_{asset['id']}",
+        use_container_width=True
+    )
+
+@st.dialog("Similar Images", width="large")
+def show_similar_images(asset):
+    # Nearest images by perceptual hash, from every project
+    try:
+        st.image(get_image_preview(asset["content"], GRID_PREVIEW_WIDTH), caption=asset["description"], width=GRID_PREVIEW_WIDTH)
+    except Exception as e:
+        st.error(f"Error displaying image: {str(e)}")
+    similar_assets = find_similar_images(asset["id"])
+    if not similar_assets:
+        st.info("No similar images found.")
+        return
+    cols = st.columns(3)
+    for i, similar in enumerate(similar_assets):
+        with cols[i % 3]:
+            try:
+                st.image(get_image_preview(similar["content"], GRID_PREVIEW_WIDTH), caption=similar["description"], use_column_width=True)
+            except Exception as e:
+                st.error(f"Error displaying image: {str(e)}")
+            match = "Near-identical" if similar["distance"] <= 2 else f"{similar['distance']} bits apart"
+            st.markdown(f"<small>{similar['project_name']} · {match}</small>", unsafe_allow_html=True)
+
 # Main layout
 def main():
     # Custom header with modern design
@@ -42,7 +201,7 @@ def main():
     tabs = st.tabs(["Dashboard", "Content Generator", "Asset Library", "Projects", "Settings"])
     
     # Dashboard Tab
-    with tabs[0]:
+    with tabs[0], span("tab_script", tab="dashboard"):
         st.header("Dashboard")
         
         # Display quick stats with modern cards
@@ -51,13 +210,13 @@ def main():
             st.markdown(f"""
             <div class="stat-card projects">
                 <h3>Projects</h3>
-                <p>{len(st.session_state.projects)}</p>
+                <p>{count_projects()}</p>
                 <small>Total projects</small>
             </div>
             """, unsafe_allow_html=True)
         
         with col2:
-            total_assets = sum(len(p["assets"]) for p in st.session_state.projects)
+            total_assets = count_assets()
             st.markdown(f"""
             <div class="stat-card assets">
                 <h3>Assets</h3>
@@ -70,7 +229,7 @@ def main():
             st.markdown(f"""
             <div class="stat-card activity">
                 <h3>Activity</h3>
-                <p>{len(st.session_state.history)}</p>
+                <p>{count_history()}</p>
                 <small>Recent generations</small>
             </div>
             """, unsafe_allow_html=True)
@@ -80,17 +239,15 @@ def main():
         <h2 class="animated">Recent Projects</h2>
         """, unsafe_allow_html=True)
         
-        if not st.session_state.projects:
+        recent_projects = list_projects(limit=3, newest_first=True)
+        if not recent_projects:
             st.info("No projects yet. Create a new project in the Projects tab.")
         else:
-            recent_projects = sorted(st.session_state.projects, 
-                                    key=lambda x: x["created_at"], 
-                                    reverse=True)[:3]
             
             for i, project in enumerate(recent_projects):
                 st.markdown(f"""
                 <div class="project-card hover-elevate" style="animation-delay: {i * 0.1}s">
-                    <h3>{project['name']} <span style="float: right; font-size: 0.9rem; background: var(--grey-200); padding: 3px 10px; border-radius: 20px;">{len(project['assets'])} assets</span></h3>
+                    <h3>{project['name']} <span style="float: right; font-size: 0.9rem; background: var(--grey-200); padding: 3px 10px; border-radius: 20px;">{count_assets(project_id=project['id'])} assets</span></h3>
                     <p><strong>Created:</strong> {project['created_at']}</p>
                     <p>{project['description'][:150]}{'...' if len(project['description']) > 150 else ''}</p>
                 </div>
@@ -101,12 +258,10 @@ def main():
         <h2 class="animated" style="animation-delay: 0.2s">Recent Activity</h2>
         """, unsafe_allow_html=True)
         
-        if not st.session_state.history:
+        recent_history = get_recent_history(limit=5)
+        if not recent_history:
             st.info("No activity recorded yet.")
         else:
-            recent_history = sorted(st.session_state.history, 
-                                   key=lambda x: x["timestamp"], 
-                                   reverse=True)[:5]
             
             for i, item in enumerate(recent_history):
                 # Determine icon based on asset type
@@ -124,9 +279,34 @@ def main():
                     <p style="margin-top: 10px;">{item['description'][:100]}{'...' if len(item['description']) > 100 else ''}</p>
                 </div>
                 """, unsafe_allow_html=True)
+            
+            # Older activity is read from the history log by date range
+            with st.expander("Activity Log"):
+                today = datetime.now().date()
+                log_range = st.date_input("Date Range", (today - timedelta(days=7), today), max_value=today)
+                if isinstance(log_range, (list, tuple)) and len(log_range) == 2:
+                    log_start = datetime.combine(log_range[0], datetime.min.time())
+                    log_end = datetime.combine(log_range[1] + timedelta(days=1), datetime.min.time())
+                    log_items = get_history_range(start=log_start, end=log_end)
+                    if log_items:
+                        st.dataframe(
+                            [
+                                {
+                                    "Time": item["timestamp"],
+                                    "Project": item["project_name"],
+                                    "Type": item["asset_type"],
+                                    "Description": item["description"],
+                                }
+                                for item in reversed(log_items)
+                            ],
+                            use_container_width=True,
+                            hide_index=True
+                        )
+                    else:
+                        st.info("No activity in this date range.")
     
     # Content Generator Tab
-    with tabs[1]:
+    with tabs[1], span("tab_script", tab="generator"):
         st.header("Content Generator")
         
         # Check for API key with styled alert
@@ -141,13 +321,15 @@ def main():
         # Project selection with modern UI
         col1, col2 = st.columns([2, 1])
         
+        projects = list_projects()
+        
         with col1:
-            if st.session_state.projects:
-                project_names = ["None"] + [p["name"] for p in st.session_state.projects]
+            if projects:
+                project_names = ["None"] + [p["name"] for p in projects]
                 selected_project = st.selectbox("Select Project", project_names)
                 
                 if selected_project != "None":
-                    project = next((p for p in st.session_state.projects if p["name"] == selected_project), None)
+                    project = get_project_by_name(selected_project)
                     if project:
                         st.session_state.current_project = project["id"]
                     else:
@@ -164,7 +346,7 @@ def main():
         
         with col2:
             if st.session_state.current_project:
-                project = next((p for p in st.session_state.projects if p["id"] == st.session_state.current_project), None)
+                project = get_project_by_id(st.session_state.current_project)
                 if project:
                     st.markdown("""
                     <div style="background-color: #e8f5e9; border-left: 5px solid #4caf50; padding: 15px; border-radius: 4px;">
@@ -175,7 +357,7 @@ def main():
         
         # Display selected project info with better styling
         if st.session_state.current_project:
-            project = next((p for p in st.session_state.projects if p["id"] == st.session_state.current_project), None)
+            project = get_project_by_id(st.session_state.current_project)
             if project:
                 st.markdown(f"""
                 <div class="glass-effect" style="padding: 20px; border-radius: var(--border-radius-md); margin: 20px 0;">
@@ -198,10 +380,7 @@ def main():
         <h3 style="margin-top: 30px;">Select Content Type</h3>
         """, unsafe_allow_html=True)
         
-        generation_type = st.radio("", 
-                                  ["Marketing Copy", "Social Media Post", "Campaign Concept", 
-                                   "Brand Storytelling", "Visual Content", "Custom Content"],
-                                  label_visibility="collapsed")
+        generation_type = st.radio("", GENERATION_TYPES, label_visibility="collapsed")
         
         # Generation form with styled container
         st.markdown(f"""
@@ -221,12 +400,8 @@ def main():
                 key_features = st.text_area("Key Features/Selling Points", height=100)
                 copy_length = st.select_slider("Copy Length", options=["Short", "Medium", "Long"])
                 
-                prompt = f"""Create a compelling marketing copy for {product_name}.
-                Key features: {key_features}
-                Length: {copy_length}
-                Tone: {tone}
-                Make it persuasive and focused on benefits. Format it nicely with headlines and sections.
-                """
+                prompt = build_prompt(generation_type, product_name=product_name, key_features=key_features,
+                                      copy_length=copy_length, tone=tone)
                 
             elif generation_type == "Social Media Post":
                 col1, col2 = st.columns(2)
@@ -241,11 +416,8 @@ def main():
                 with col4:
                     include_call_to_action = st.checkbox("Include Call-to-Action")
                 
-                prompt = f"""Create an engaging social media post for {platform} about {topic}.
-                {'Include relevant hashtags.' if include_hashtags else ''}
-                {'Include a strong call-to-action.' if include_call_to_action else ''}
-                Make it attention-grabbing and appropriate for the platform's audience.
-                """
+                prompt = build_prompt(generation_type, platform=platform, topic=topic, include_hashtags=include_hashtags,
+                                      include_call_to_action=include_call_to_action)
                 
             elif generation_type == "Campaign Concept":
                 col1, col2 = st.columns(2)
@@ -257,19 +429,8 @@ def main():
                 target_audience = st.text_area("Target Audience Description", height=80)
                 key_message = st.text_input("Key Message")
                 
-                prompt = f"""Develop a creative campaign concept with the following details:
-                Objective: {campaign_objective}
-                Target Audience: {target_audience}
-                Key Message: {key_message}
-                Duration: {campaign_duration}
-                
-                Include the following sections:
-                1. Campaign Name/Tagline
-                2. Concept Overview
-                3. Key Visuals Description
-                4. Channel Strategy
-                5. Expected Outcomes
-                """
+                prompt = build_prompt(generation_type, campaign_objective=campaign_objective, campaign_duration=campaign_duration,
+                                      target_audience=target_audience, key_message=key_message)
                 
             elif generation_type == "Brand Storytelling":
                 col1, col2 = st.columns(2)
@@ -281,14 +442,8 @@ def main():
                 brand_history = st.text_area("Brand History/Background", height=80)
                 target_audience = st.text_area("Target Audience", height=80)
                 
-                prompt = f"""Craft a compelling brand story for {brand_name} with the following elements:
-                Brand History: {brand_history}
-                Brand Values: {brand_values}
-                Target Audience: {target_audience}
-                
-                Create a narrative that emotionally connects with the audience, highlights the brand's journey,
-                and emphasizes its values and vision for the future. The story should be authentic and memorable.
-                """
+                prompt = build_prompt(generation_type, brand_name=brand_name, brand_values=brand_values,
+                                      brand_history=brand_history, target_audience=target_audience)
                 
             elif generation_type == "Visual Content":
                 col1, col2 = st.columns(2)
@@ -300,26 +455,27 @@ def main():
                 description = st.text_area("Detailed Description", height=80)
                 theme = st.text_input("Theme/Mood")
                 
-                prompt = f"""Create a {style.lower()} {visual_type.lower()} with the following details:
-                Description: {description}
-                Theme/Mood: {theme}
-                
-                Make it visually striking and appropriate for commercial use. Ensure it has professional quality
-                and would be suitable for a {visual_type.lower()}.
-                """
+                prompt = build_prompt(generation_type, visual_type=visual_type, style=style, description=description, theme=theme)
                 
             elif generation_type == "Custom Content":
                 content_description = st.text_area("Describe what you need in detail", height=120)
                 additional_context = st.text_area("Any additional context or requirements", height=80)
                 
-                prompt = f"""Create content based on the following requirements:
-                {content_description}
-                
-                Additional context:
-                {additional_context}
-                
-                Provide a well-structured, creative and professional output that meets these requirements.
-                """
+                prompt = build_prompt(generation_type, content_description=content_description,
+                                      additional_context=additional_context)
+            
+            num_variants = st.slider("Number of Variants", min_value=1, max_value=8, value=1,
+                                     help="Alternatives are generated concurrently and shown side by side")
+            option_col1, option_col2, option_col3 = st.columns(3)
+            with option_col1:
+                bypass_cache = st.checkbox("Bypass cache", value=False,
+                                           help="Always call the API, even if an identical or near-identical brief was answered before")
+            with option_col2:
+                stream_output = st.checkbox("Stream text output", value=True,
+                                            help="Show text as it is generated (single variant only)")
+            with option_col3:
+                run_in_background = st.checkbox("Run in background", value=False,
+                                                help="Queue the generation and keep working; results appear under Background Jobs")
             
             # Add a loading indicator that will be shown when generating
             submit_col1, submit_col2 = st.columns([3, 1])
@@ -330,33 +486,119 @@ def main():
                     st.markdown('<div class="loading-spinner"></div>', unsafe_allow_html=True)
         
         # Generate content on submit
-        if submitted:
+        generate_anyway = st.session_state.pop("generate_anyway", False)
+        if submitted or generate_anyway:
+            is_image = get_template(generation_type)["kind"] == IMAGE
             if not st.session_state.api_key:
                 st.error("Please add your API key in the Settings tab before generating content.")
             else:
-                if generation_type == "Visual Content":
-                    # Generate image
+                # Offer results of near-identical earlier briefs before paying for a new generation
+                previous_generations = []
+                if not bypass_cache and not generate_anyway:
+                    previous_generations = find_similar_generations(
+                        prompt,
+                        "image" if is_image else "text",
+                        st.session_state.default_image_model if is_image else st.session_state.default_text_model
+                    )
+                st.session_state.prompt_matches = None
+                
+                if previous_generations:
+                    st.session_state.prompt_matches = {
+                        "type": "image" if is_image else "text",
+                        "prompt": prompt,
+                        "generation_type": generation_type,
+                        "matches": previous_generations
+                    }
+                elif run_in_background:
+                    # Hand the work to the job queue; the page stays responsive
+                    get_job_queue().submit(
+                        "image" if is_image else "text",
+                        {
+                            "prompt": prompt,
+                            "count": num_variants,
+                            "model": st.session_state.default_image_model if is_image else st.session_state.default_text_model,
+                            "use_cache": not bypass_cache,
+                            "generation_type": generation_type
+                        },
+                        st.session_state.api_key,
+                        project_id=st.session_state.current_project
+                    )
+                    st.success("Generation queued. You can keep working; results will appear under Background Jobs.")
+                elif is_image:
+                    # Generate images
                     with st.spinner("Creating your visual content..."):
-                        image_data = generate_image(prompt)
-                        if image_data:
+                        image_variants = generate_image_variants(prompt, num_variants)
+                        if image_variants:
                             st.session_state.generated_content = {
+                                "id": str(uuid.uuid4()),
                                 "type": "image",
-                                "data": image_data,
+                                "variants": image_variants,
                                 "prompt": prompt,
                                 "generation_type": generation_type
                             }
+                elif stream_output and num_variants == 1:
+                    # Stream text into a placeholder; the stored result is rendered below once complete
+                    stream_placeholder = st.empty()
+                    try:
+                        with stream_placeholder.container():
+                            st.subheader("Generated Content")
+                            text_content = st.write_stream(generate_text_stream(prompt, use_cache=not bypass_cache))
+                    except GenerationError as e:
+                        text_content = None
+                        stream_placeholder.empty()
+                        # Reported after clearing the placeholder, which would remove it too
+                        st.error(f"An error occurred: {str(e)}")
+                    else:
+                        stream_placeholder.empty()
+                    if text_content:
+                        st.session_state.generated_content = {
+                            "id": str(uuid.uuid4()),
+                            "type": "text",
+                            "variants": [text_content],
+                            "prompt": prompt,
+                            "generation_type": generation_type
+                        }
                 else:
                     # Generate text
                     with st.spinner("Generating your content..."):
-                        text_content = generate_text(prompt)
-                        if text_content:
+                        text_variants = generate_text_variants(prompt, num_variants, use_cache=not bypass_cache)
+                        if text_variants:
                             st.session_state.generated_content = {
+                                "id": str(uuid.uuid4()),
                                 "type": "text",
-                                "data": text_content,
+                                "variants": text_variants,
                                 "prompt": prompt,
                                 "generation_type": generation_type
                             }
         
+        prompt_matches = st.session_state.prompt_matches
+        if prompt_matches:
+            st.info(f"{len(prompt_matches['matches'])} similar brief(s) were generated before. "
+                    "Reuse a result, or generate anyway.")
+            for i, match in enumerate(prompt_matches["matches"]):
+                match_col1, match_col2 = st.columns([4, 1])
+                with match_col1:
+                    st.markdown(f"**{match['similarity']:.0%} similar** · {len(match['outputs'])} variant(s) · "
+                                f"<small>{match['model']} · {match['created_at']}</small>", unsafe_allow_html=True)
+                    st.caption(" ".join(match["prompt"].split())[:300])
+                with match_col2:
+                    if st.button("Use Result", key=f"prompt_match_{i}", use_container_width=True):
+                        st.session_state.generated_content = {
+                            "id": str(uuid.uuid4()),
+                            "type": prompt_matches["type"],
+                            "variants": match["outputs"],
+                            "prompt": prompt_matches["prompt"],
+                            "generation_type": prompt_matches["generation_type"]
+                        }
+                        st.session_state.prompt_matches = None
+                        st.rerun()
+            if st.button("Generate Anyway", key="prompt_match_generate"):
+                st.session_state.prompt_matches = None
+                st.session_state.generate_anyway = True
+                st.rerun()
+        
+        render_background_jobs()
+        
         # Display generated content with improved styling
         if "generated_content" in st.session_state and st.session_state.generated_content:
             st.markdown("<div class='animated' style='margin-top: 40px;'>", unsafe_allow_html=True)
@@ -366,23 +608,33 @@ def main():
             with st.container():
                 st.markdown('<div class="output-container animated">', unsafe_allow_html=True)
                 
-                # Display content based on type
-                if st.session_state.generated_content["type"] == "text":
-                    st.markdown(st.session_state.generated_content["data"])
-                elif st.session_state.generated_content["type"] == "image":
-                    # Handle both URL and base64 image data
-                    if isinstance(st.session_state.generated_content["data"], str):
-                        if st.session_state.generated_content["data"].startswith('http'):
-                            # If it's a URL
-                            st.image(st.session_state.generated_content["data"], use_column_width=True)
+                content_type = st.session_state.generated_content["type"]
+                variants = st.session_state.generated_content["variants"]
+                generation_id = st.session_state.generated_content["id"]
+                
+                # Show variants side by side in a comparison grid
+                render_started = time.perf_counter()
+                grid_cols = st.columns(min(len(variants), 2 if content_type == "text" else 4))
+                selected_variants = []
+                for i, variant in enumerate(variants):
+                    with grid_cols[i % len(grid_cols)]:
+                        if len(variants) > 1:
+                            if st.checkbox(f"Variant {i + 1}", key=f"variant_{generation_id}_{i}"):
+                                selected_variants.append(variant)
                         else:
-                            # If it's base64
+                            selected_variants.append(variant)
+                        
+                        # Display content based on type
+                        if content_type == "text":
+                            st.markdown(variant)
+                        elif content_type == "image":
+                            # Previews are encoded in the background as soon as the images are stored
                             try:
-                                image_bytes = base64.b64decode(st.session_state.generated_content["data"])
-                                image = Image.open(BytesIO(image_bytes))
-                                st.image(image, use_column_width=True)
+                                preview_width = FULL_PREVIEW_WIDTH if len(variants) == 1 else VARIANT_PREVIEW_WIDTH
+                                st.image(get_image_preview(variant, preview_width), use_column_width=True)
                             except Exception as e:
                                 st.error(f"Error displaying image: {str(e)}")
+                get_metrics().observe("render", time.perf_counter() - render_started, view=f"generated_{content_type}")
                 
                 st.markdown('</div>', unsafe_allow_html=True)
                 
@@ -399,13 +651,19 @@ def main():
                     save_col1, save_col2 = st.columns([3, 2])
                     
                     with save_col1:
-                        if st.button("Save to Current Project", use_container_width=True):
-                            content_type = st.session_state.generated_content["type"]
-                            content_data = st.session_state.generated_content["data"]
-                            
-                            with st.spinner("Saving to project..."):
-                                if save_to_project(content_type, content_data, content_description):
+                        save_label = "Save to Current Project" if len(variants) == 1 else "Save Selected to Current Project"
+                        if st.button(save_label, use_container_width=True):
+                            if not selected_variants:
+                                st.warning("Select at least one variant to save.")
+                            else:
+                                with st.spinner("Saving to project..."):
+                                    saved = [v for v in selected_variants
+                                             if save_to_project(content_type, v, content_description,
+                                                                prompt=st.session_state.generated_content.get("prompt"))]
+                                if len(saved) == 1:
                                     st.success("Content saved to project successfully!")
+                                elif saved:
+                                    st.success(f"{len(saved)} variants saved to project successfully!")
                     
                     with save_col2:
                         if st.button("Generate New Content", type="secondary", use_container_width=True):
@@ -413,7 +671,7 @@ def main():
                             st.rerun()
     
     # Asset Library Tab
-    with tabs[2]:
+    with tabs[2], span("tab_script", tab="library"):
         st.header("Asset Library")
         
         # Filter options with modern styling
@@ -422,12 +680,18 @@ def main():
             <h3 style="margin-top: 0;">Filter Assets</h3>
         """, unsafe_allow_html=True)
         
-        col1, col2 = st.columns(2)
+        search_query = st.text_input(
+            "Search",
+            placeholder="Search text, descriptions and prompts...",
+            key="library_search"
+        ).strip()
+        
+        col1, col2, col3 = st.columns([2, 2, 1])
         
         with col1:
             filter_project = st.selectbox(
                 "Filter by Project", 
-                ["All Projects"] + [p["name"] for p in st.session_state.projects]
+                ["All Projects"] + [p["name"] for p in projects]
             )
         
         with col2:
@@ -436,24 +700,71 @@ def main():
                 ["All Types", "text", "image"]
             )
         
+        with col3:
+            page_size = st.selectbox(
+                "Items per Page",
+                LIBRARY_PAGE_SIZES,
+                index=LIBRARY_PAGE_SIZES.index(DEFAULT_LIBRARY_PAGE_SIZE)
+            )
+        
+        collapse_duplicates = st.checkbox(
+            "Collapse near-duplicate images",
+            key="library_collapse",
+            disabled=bool(search_query) or filter_type == "text",
+            help="Show only the newest of each group of visually near-identical images"
+        )
+        
         st.markdown("</div>", unsafe_allow_html=True)
         
-        # Collect all assets
-        all_assets = []
-        for project in st.session_state.projects:
-            for asset in project["assets"]:
-                asset_with_project = asset.copy()
-                asset_with_project["project_name"] = project["name"]
-                asset_with_project["project_id"] = project["id"]
-                all_assets.append(asset_with_project)
-        
-        # Apply filters
-        filtered_assets = all_assets
+        # Count matches from metadata and load only the visible page
+        filter_project_id = None
         if filter_project != "All Projects":
-            filtered_assets = [a for a in filtered_assets if a["project_name"] == filter_project]
+            filter_project_obj = get_project_by_name(filter_project)
+            filter_project_id = filter_project_obj["id"] if filter_project_obj else None
+        filter_asset_type = None if filter_type == "All Types" else filter_type
+        
+        total_assets = 0
+        hidden_duplicates = set()
+        duplicate_counts = {}
+        if filter_project == "All Projects" or filter_project_id:
+            if search_query:
+                total_assets = count_search_results(search_query, project_id=filter_project_id, asset_type=filter_asset_type)
+            else:
+                total_assets = count_assets(project_id=filter_project_id, asset_type=filter_asset_type)
+                if collapse_duplicates and filter_asset_type != "text":
+                    # Keep the newest image of each group and hide the rest
+                    for group in find_duplicate_images(project_id=filter_project_id):
+                        duplicate_counts[group[0]] = len(group) - 1
+                        hidden_duplicates.update(group[1:])
+                    total_assets -= len(hidden_duplicates)
+        page_count = max(1, -(-total_assets // page_size))
+        
+        # Start over on the first page whenever the filters change
+        library_filter = (search_query, filter_project, filter_type, page_size, collapse_duplicates)
+        if st.session_state.get("library_filter") != library_filter:
+            st.session_state.library_filter = library_filter
+            st.session_state.library_page = 0
+        st.session_state.library_page = min(st.session_state.library_page, page_count - 1)
         
-        if filter_type != "All Types":
-            filtered_assets = [a for a in filtered_assets if a["type"] == filter_type]
+        filtered_assets = []
+        if total_assets and search_query:
+            # Search results are ranked by relevance instead of creation time
+            filtered_assets = search_assets(
+                search_query,
+                project_id=filter_project_id,
+                asset_type=filter_asset_type,
+                offset=st.session_state.library_page * page_size,
+                limit=page_size
+            )
+        elif total_assets:
+            filtered_assets = get_all_assets(
+                project_id=filter_project_id,
+                asset_type=filter_asset_type,
+                offset=st.session_state.library_page * page_size,
+                limit=page_size,
+                newest_first=True,
+                exclude_ids=hidden_duplicates
+            )
         
         # Display assets with modern styling
         if not filtered_assets:
@@ -462,10 +773,13 @@ def main():
             st.markdown(f"""
             <div style="display: flex; align-items: center; margin: 30px 0 20px;">
                 <h2 style="margin: 0;">Asset Gallery</h2>
-                <span style="margin-left: 15px; background: var(--primary-color); color: white; padding: 5px 12px; border-radius: 20px; font-size: 0.9rem;">{len(filtered_assets)} items</span>
+                <span style="margin-left: 15px; background: var(--primary-color); color: white; padding: 5px 12px; border-radius: 20px; font-size: 0.9rem;">{total_assets} items</span>
             </div>
             """, unsafe_allow_html=True)
             
+            if page_count > 1:
+                render_pager("library", page_count)
+            
             # Display as grid for images, list for text
             image_assets = [a for a in filtered_assets if a["type"] == "image"]
             text_assets = [a for a in filtered_assets if a["type"] == "text"]
@@ -480,6 +794,7 @@ def main():
                 """, unsafe_allow_html=True)
                 
                 # Create a responsive grid for images
+                render_started = time.perf_counter()
                 cols = st.columns(3)
                 for i, asset in enumerate(image_assets):
                     with cols[i % 3]:
@@ -487,37 +802,44 @@ def main():
                         <div class="gallery-image-container" style="margin-bottom: 25px; animation: fadeIn 0.5s ease forwards; animation-delay: {i * 0.05}s; opacity: 0;">
                         """, unsafe_allow_html=True)
                         
-                        # Display the image
-                        if asset["content"].startswith('http'):
-                            # If it's a URL
-                            st.image(asset["content"], 
+                        # Display a cached preview of the image
+                        try:
+                            st.image(get_image_preview(asset["content"], GRID_PREVIEW_WIDTH), 
                                     caption=asset["description"][:30] + "..." if len(asset["description"]) > 30 else asset["description"], 
-                                    use_column_width=True,
+                                    use_column_width=True, 
                                     clamp=True)
-                        else:
-                            # If it's base64
-                            try:
-                                image_bytes = base64.b64decode(asset["content"])
-                                image = Image.open(BytesIO(image_bytes))
-                                st.image(image, 
-                                        caption=asset["description"][:30] + "..." if len(asset["description"]) > 30 else asset["description"], 
-                                        use_column_width=True, 
-                                        output_format="PNG", 
-                                        clamp=True)
-                            except Exception as e:
-                                st.error(f"Error displaying image: {str(e)}")
+                        except Exception as e:
+                            st.error(f"Error displaying image: {str(e)}")
+                        
+                        open_col, similar_col = st.columns(2)
+                        with open_col:
+                            if st.button("View Full Size", key=f"library_open_{asset['id']}", use_container_width=True):
+                                show_full_image(asset)
+                        with similar_col:
+                            if st.button("Find Similar", key=f"library_similar_{asset['id']}", use_container_width=True):
+                                show_similar_images(asset)
+                        
+                        if duplicate_counts.get(asset["id"]):
+                            st.caption(f"+{duplicate_counts[asset['id']]} near-duplicate(s) hidden")
                         
                         # Add image details
                         st.markdown(f"""
                         <div style="background: white; padding: 10px 15px; border-radius: 0 0 8px 8px; box-shadow: 0 4px 6px rgba(0,0,0,0.07); margin-top: -20px; position: relative; z-index: 1;">
                             <div style="display: flex; justify-content: space-between; align-items: center;">
                                 <span style="font-weight: 500; color: var(--primary-dark);">{asset['project_name']}</span>
-                                <span style="font-size: 0.8rem; color: var(--grey-600);">{asset['created_at'].split()[0]}</span>
+                                <span style="font-size: 0.8rem; color: var(--grey-600);">{asset['created_at']:%Y-%m-%d}</span>
                             </div>
                         </div>
                         """, unsafe_allow_html=True)
                         
+                        # Show why an image matched the search
+                        for match_text in (asset.get("description_highlight"), asset.get("prompt_snippet")):
+                            if match_text and HIGHLIGHT_START in match_text:
+                                st.markdown(f"<small>{match_text}</small>", unsafe_allow_html=True)
+                                break
+                        
                         st.markdown("</div>", unsafe_allow_html=True)
+                get_metrics().observe("render", time.perf_counter() - render_started, view="library_images")
             
             # Show text in cards with improved styling
             if text_assets:
@@ -529,7 +851,8 @@ def main():
                 """, unsafe_allow_html=True)
                 
                 for i, asset in enumerate(text_assets):
-                    with st.expander(f"{asset['description']} ({asset['project_name']})"):
+                    # Search hits open expanded with the matching words highlighted
+                    with st.expander(f"{asset['description']} ({asset['project_name']})", expanded=bool(search_query)):
                         st.markdown(f"""
                         <div style="display: flex; justify-content: space-between; margin-bottom: 10px;">
                             <span style="font-weight: 500; color: var(--primary-dark);">{asset['project_name']}</span>
@@ -539,20 +862,82 @@ def main():
                         
                         st.markdown(f"""
                         <div style="background: var(--grey-100); padding: 15px; border-radius: var(--border-radius-sm); font-family: 'Georgia', serif; line-height: 1.6;">
-                            {asset["content"]}
+                            {asset.get("content_highlight") or html.escape(asset["content"])}
                         </div>
                         """, unsafe_allow_html=True)
+                        
+                        if HIGHLIGHT_START in (asset.get("prompt_snippet") or ""):
+                            st.markdown(f"<small><strong>Prompt:</strong> {asset['prompt_snippet']}</small>",
+                                        unsafe_allow_html=True)
     
     # Projects Tab
-    with tabs[3]:
+    with tabs[3], span("tab_script", tab="projects"):
         st.header("Projects")
         
-        # Create new project button
-        col1, col2 = st.columns([3, 1])
+        # Create and import project buttons
+        col1, col2, col3 = st.columns([2, 1, 1])
         with col2:
+            if st.button("📥 Import Project", use_container_width=True):
+                st.session_state.show_import_project = True
+        with col3:
             if st.button("➕ New Project", use_container_width=True, type="primary"):
                 st.session_state.show_new_project = True
         
+        # Import project form
+        if st.session_state.get("show_import_project", False):
+            st.markdown("""
+            <div style="background: white; border-radius: var(--border-radius-md); padding: 20px; box-shadow: var(--card-shadow); margin: 20px 0 30px; border-left: 5px solid var(--primary-color);">
+                <h3 style="margin-top: 0;">Import Project</h3>
+            """, unsafe_allow_html=True)
+            
+            import_file = st.file_uploader("Project Export (JSON or ZIP)", type=["json", "zip"])
+            server_files = list_import_files()
+            server_file = None
+            if server_files:
+                server_file = st.selectbox(
+                    "Or import a file from the server's imports folder",
+                    ["None"] + server_files,
+                    format_func=lambda path: path if path == "None" else os.path.basename(path)
+                )
+            dry_run = st.checkbox("Dry run (only show what would be imported)")
+            
+            col3, col4 = st.columns([3, 1])
+            with col3:
+                run_import = st.button("Import", use_container_width=True, type="primary")
+            with col4:
+                if st.button("Cancel", key="cancel_import", use_container_width=True):
+                    st.session_state.show_import_project = False
+                    st.rerun()
+            
+            if run_import:
+                import_source = import_file or (server_file if server_file and server_file != "None" else None)
+                if import_source is None:
+                    st.warning("Choose a file to import.")
+                else:
+                    progress_bar = st.progress(0.0, text="Importing project...")
+                    try:
+                        summary = import_project_archive(
+                            import_source,
+                            dry_run=dry_run,
+                            progress=lambda done: progress_bar.progress(done, text=f"Importing project... {done:.0%}")
+                        )
+                    except (ValueError, KeyError, UnicodeDecodeError, zipfile.BadZipFile) as e:
+                        st.error(f"Import failed: {str(e)}")
+                    else:
+                        action = "would import" if dry_run else "imported"
+                        target = "a new project" if summary["new_project"] else "the existing project"
+                        message = (
+                            f"'{summary['project_name']}': {action} {summary['imported']} of {summary['total']} assets "
+                            f"({summary['text']} text, {summary['image']} images) into {target}; "
+                            f"{summary['duplicates']} duplicates skipped."
+                        )
+                        if dry_run:
+                            st.info(message)
+                        else:
+                            st.success(message)
+            
+            st.markdown("</div>", unsafe_allow_html=True)
+        
         # Create new project form
         if st.session_state.get("show_new_project", False):
             st.markdown("""
@@ -590,7 +975,8 @@ def main():
             st.markdown("</div>", unsafe_allow_html=True)
         
         # List existing projects with modern cards
-        if not st.session_state.projects:
+        projects = list_projects()
+        if not projects:
             st.markdown("""
             <div style="background-color: #f5f5f5; border-radius: var(--border-radius-md); padding: 40px; text-align: center; margin-top: 30px;">
                 <img src="https://img.icons8.com/clouds/100/000000/folder-invoices.png" style="width: 80px; height: 80px; margin-bottom: 20px;">
@@ -600,15 +986,15 @@ def main():
             """, unsafe_allow_html=True)
         else:
             # Create a grid for projects
-            project_cols = [st.columns(3) for _ in range((len(st.session_state.projects) + 2) // 3)]
+            project_cols = [st.columns(3) for _ in range((len(projects) + 2) // 3)]
             flattened_cols = [col for cols in project_cols for col in cols]
             
-            for i, project in enumerate(st.session_state.projects):
+            for i, project in enumerate(projects):
                 with flattened_cols[i]:
                     # Calculate asset counts
-                    total_assets = len(project['assets'])
-                    image_count = len([a for a in project['assets'] if a['type'] == 'image'])
-                    text_count = len([a for a in project['assets'] if a['type'] == 'text'])
+                    image_count = count_assets(project_id=project['id'], asset_type='image')
+                    text_count = count_assets(project_id=project['id'], asset_type='text')
+                    total_assets = image_count + text_count
                     
                     # Create a custom project card
                     st.markdown(f"""
@@ -633,7 +1019,7 @@ def main():
             
             # Project details view
             if st.session_state.get("current_project_view"):
-                project = next((p for p in st.session_state.projects if p["id"] == st.session_state.current_project_view), None)
+                project = get_project_by_id(st.session_state.current_project_view)
                 if project:
                     st.markdown("<hr style='margin: 40px 0 30px;'>", unsafe_allow_html=True)
                     
@@ -679,36 +1065,41 @@ def main():
                     
                     # Assets tab
                     with project_tabs[1]:
-                        if not project['assets']:
+                        # Load only the visible page, like the Asset Library
+                        pager_prefix = f"project_{project['id']}"
+                        project_page_count = max(1, -(-count_assets(project_id=project['id']) // DEFAULT_LIBRARY_PAGE_SIZE))
+                        page_key = f"{pager_prefix}_page"
+                        st.session_state[page_key] = min(st.session_state.get(page_key, 0), project_page_count - 1)
+                        page_assets = get_all_assets(
+                            project_id=project['id'],
+                            offset=st.session_state[page_key] * DEFAULT_LIBRARY_PAGE_SIZE,
+                            limit=DEFAULT_LIBRARY_PAGE_SIZE
+                        )
+                        image_assets = [a for a in page_assets if a["type"] == "image"]
+                        text_assets = [a for a in page_assets if a["type"] == "text"]
+                        if not page_assets:
                             st.info("No assets yet in this project.")
                         else:
-                            # Group by type
-                            text_assets = [a for a in project['assets'] if a['type'] == 'text']
-                            image_assets = [a for a in project['assets'] if a['type'] == 'image']
-                            
+                            if project_page_count > 1:
+                                render_pager(pager_prefix, project_page_count)
                             # Display image assets
                             if image_assets:
                                 st.markdown("### Images")
+                                render_started = time.perf_counter()
                                 image_cols = st.columns(3)
                                 for i, asset in enumerate(image_assets):
                                     with image_cols[i % 3]:
                                         try:
-                                            if isinstance(asset["content"], str) and asset["content"].startswith('http'):
-                                                # If it's a URL
-                                                st.image(asset["content"], 
-                                                        caption=asset["description"], 
-                                                        use_column_width=True)
-                                            else:
-                                                # If it's base64
-                                                image_bytes = base64.b64decode(asset["content"])
-                                                image = Image.open(BytesIO(image_bytes))
-                                                st.image(image, 
-                                                        caption=asset["description"], 
-                                                        use_column_width=True)
+                                            st.image(get_image_preview(asset["content"], GRID_PREVIEW_WIDTH), 
+                                                    caption=asset["description"], 
+                                                    use_column_width=True)
+                                            if st.button("View Full Size", key=f"project_open_{asset['id']}", use_container_width=True):
+                                                show_full_image(asset)
                                             
                                             st.markdown(f"<small>Created: {asset['created_at']}</small>", unsafe_allow_html=True)
                                         except Exception as e:
                                             st.error(f"Error displaying image: {str(e)}")
+                                get_metrics().observe("render", time.perf_counter() - render_started, view="project_images")
                             
                             # Display text assets
                             if text_assets:
@@ -736,25 +1127,24 @@ def main():
                     with project_tabs[2]:
                         st.markdown("""
                         <div style="background-color: #fff8e6; border-left: 5px solid #ffc107; padding: 15px; border-radius: 4px; margin: 20px 0;">
-                            <p style="margin: 0;"><strong>Note:</strong> Exporting will create a JSON file containing all project details and assets.</p>
+                            <p style="margin: 0;"><strong>Note:</strong> Exporting will create a ZIP file containing a project manifest, every text asset and the original image files.</p>
                         </div>
                         """, unsafe_allow_html=True)
                         
                         col1, col2 = st.columns([3, 2])
                         with col1:
-                            if st.button("Export Project as JSON", use_container_width=True):
-                                project_json = export_project(project['id'])
-                                if project_json:
-                                    st.download_button(
-                                        label="Download Project Data",
-                                        data=project_json,
-                                        file_name=f"{project['name'].replace(' ', '_')}_export.json",
-                                        mime="application/json",
-                                        key=f"download_{project['id']}"
-                                    )
+                            # The archive is built (or taken from the export cache) only when the button is clicked
+                            st.download_button(
+                                label="Export Project as ZIP",
+                                data=lambda project_id=project['id']: read_project_export(project_id),
+                                file_name=f"{project['name'].replace(' ', '_')}_export.zip",
+                                mime="application/zip",
+                                key=f"download_{project['id']}",
+                                use_container_width=True
+                            )
     
     # Settings Tab
-    with tabs[4]:
+    with tabs[4], span("tab_script", tab="settings"):
         st.header("Settings")
         
         # Settings in a card layout
@@ -769,6 +1159,8 @@ def main():
         with api_col1:
             if st.button("Save API Key", use_container_width=True):
                 st.session_state.api_key = api_key
+                if api_key:
+                    get_client_pool().prewarm(api_key)
                 st.success("API Key saved successfully!")
         
         st.markdown("""
@@ -809,6 +1201,118 @@ def main():
         
         st.markdown("</div>", unsafe_allow_html=True)
         
+        # Rate limiter state for this session's API key
+        if st.session_state.api_key:
+            limiter_states = get_limiter_states(st.session_state.api_key)
+            if limiter_states:
+                st.markdown("""
+                <div style="background: white; border-radius: var(--border-radius-md); padding: 25px; box-shadow: var(--card-shadow); margin: 30px 0;">
+                    <h3 style="margin-top: 0;">API Rate Limits</h3>
+                """, unsafe_allow_html=True)
+                st.caption("Shared by all sessions using this API key. The concurrency limit halves on every 429 and recovers gradually.")
+                st.dataframe(
+                    [{
+                        "Model": s["model"],
+                        "Concurrency Limit": s["concurrency_limit"],
+                        "In Flight": s["in_flight"],
+                        "Tokens": s["tokens"],
+                        "Paused (s)": s["paused_for"],
+                        "Requests": s["requests"],
+                        "Throttled": s["throttled"],
+                        "Retries": s["retries"],
+                        "Failures": s["failures"]
+                    } for s in limiter_states],
+                    use_container_width=True,
+                    hide_index=True
+                )
+                st.markdown("</div>", unsafe_allow_html=True)
+        
+        # Response cache
+        st.markdown("""
+        <div style="background: white; border-radius: var(--border-radius-md); padding: 25px; box-shadow: var(--card-shadow); margin: 30px 0;">
+            <h3 style="margin-top: 0;">Response Cache</h3>
+        """, unsafe_allow_html=True)
+        
+        cache_stats = get_response_cache().stats()
+        cache_lookups = cache_stats["memory_hits"] + cache_stats["disk_hits"] + cache_stats["misses"]
+        cache_col1, cache_col2, cache_col3, cache_col4 = st.columns(4)
+        cache_col1.metric("Hits", cache_stats["memory_hits"] + cache_stats["disk_hits"])
+        cache_col2.metric("Misses", cache_stats["misses"])
+        cache_col3.metric("Hit Rate", f"{(cache_stats['memory_hits'] + cache_stats['disk_hits']) / cache_lookups:.0%}" if cache_lookups else "n/a")
+        cache_col4.metric("Bypassed", cache_stats["bypassed"])
+        st.caption(
+            f"Memory: {cache_stats['memory_entries']} entries ({cache_stats['memory_bytes'] / 1024:.1f} KB) · "
+            f"Disk: {cache_stats['disk_entries']} entries ({cache_stats['disk_bytes'] / 1024:.1f} KB)"
+        )
+        if st.button("Clear Response Cache", use_container_width=True):
+            get_response_cache().clear()
+            st.success("Response cache cleared!")
+        
+        st.markdown("</div>", unsafe_allow_html=True)
+        
+        # Diagnostics
+        st.markdown("""
+        <div style="background: white; border-radius: var(--border-radius-md); padding: 25px; box-shadow: var(--card-shadow); margin: 30px 0;">
+            <h3 style="margin-top: 0;">Diagnostics</h3>
+        """, unsafe_allow_html=True)
+        
+        metrics = get_metrics()
+        st.caption(f"Time spent in API calls, image handling, saves and script runs by all sessions, "
+                   f"slowest in total first. Percentiles cover the last {SAMPLE_SIZE} samples of each span.")
+        span_timings = sorted(metrics.timings(), key=lambda t: t["total_s"], reverse=True)
+        if span_timings:
+            st.dataframe(
+                [{
+                    "Span": t["name"],
+                    "Labels": ", ".join(f"{k}={v}" for k, v in t["labels"].items()),
+                    "Count": t["count"],
+                    "p50 (ms)": t["p50_ms"],
+                    "p95 (ms)": t["p95_ms"],
+                    "p99 (ms)": t["p99_ms"],
+                    "Max (ms)": t["max_ms"],
+                    "Total (s)": t["total_s"]
+                } for t in span_timings],
+                use_container_width=True,
+                hide_index=True
+            )
+        else:
+            st.info("No timings recorded yet.")
+        
+        metric_counters = metrics.counters()
+        if metric_counters:
+            st.dataframe(
+                [{
+                    "Counter": c["name"],
+                    "Labels": ", ".join(f"{k}={v}" for k, v in c["labels"].items()),
+                    "Value": c["value"]
+                } for c in metric_counters],
+                use_container_width=True,
+                hide_index=True
+            )
+        
+        if METRICS_PORT:
+            st.caption(f"Prometheus endpoint: port {METRICS_PORT}, path /metrics")
+        if METRICS_FILE:
+            st.caption(f"OpenMetrics file: {METRICS_FILE}")
+        if metrics.export_error:
+            st.warning(metrics.export_error)
+        
+        diag_col1, diag_col2 = st.columns(2)
+        with diag_col1:
+            st.download_button(
+                "Download Metrics",
+                metrics.render(openmetrics=True),
+                file_name="creativeflow-metrics.txt",
+                mime="application/openmetrics-text",
+                use_container_width=True
+            )
+        with diag_col2:
+            if st.button("Reset Metrics", use_container_width=True):
+                metrics.reset()
+                st.success("Metrics reset!")
+        
+        st.markdown("</div>", unsafe_allow_html=True)
+        
         # Data management
         st.markdown("""
         <div style="background: white; border-radius: var(--border-radius-md); padding: 25px; box-shadow: var(--card-shadow); margin: 30px 0;">
@@ -826,6 +1330,11 @@ def main():
             if st.button("Clear All Projects and History", type="secondary", use_container_width=True):
                 st.session_state.show_clear_confirm = True
         
+        with col2:
+            if st.button("Clean Up Unused Images", use_container_width=True):
+                removed = collect_garbage()
+                st.success(f"Removed {removed} unused image file(s).")
+        
         # Confirmation dialog
         if st.session_state.get("show_clear_confirm", False):
             st.markdown("""
@@ -846,10 +1355,7 @@ def main():
             with confirm_col2:
                 if st.button("Yes, Delete All Data", use_container_width=True, type="primary"):
                     if confirm:
-                        st.session_state.projects = []
-                        st.session_state.current_project = None
-                        st.session_state.generated_content = {}
-                        st.session_state.history = []
+                        clear_all_data()
                         st.session_state.show_clear_confirm = False
                         st.success("All data has been cleared successfully!")
                     else:
@@ -867,14 +1373,5 @@ def main():
 
 # Update session helpers
 if __name__ == "__main__":
-    # Initialize additional session state variables
-    if 'show_new_project' not in st.session_state:
-        st.session_state.show_new_project = False
-    
-    if 'current_project_view' not in st.session_state:
-        st.session_state.current_project_view = None
-    
-    if 'show_clear_confirm' not in st.session_state:
-        st.session_state.show_clear_confirm = False
-    
-    main()
+    with span("script_run"):
+        main()
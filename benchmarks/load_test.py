@@ -0,0 +1,372 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import requests
+
+from utils.prompt_templates.prompt_templates import build_prompt
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SESSIONS = 10
+DEFAULT_SUBMISSIONS = 3
+DEFAULT_IMAGE_SHARE = 0.25
+DEFAULT_REPEAT_SHARE = 0.1
+DEFAULT_THINK_TIME = 2.0
+DEFAULT_RAMP_UP = 5.0
+RESULTS_DIRNAME = "results"
+# Options forwarded to the mock server when the load test starts one
+MOCK_OPTIONS = ("text_latency", "image_latency", "token_delay", "completion_words", "image_kib", "image_format",
+                "error_rate", "error_status", "throttle_rate", "retry_after", "rate_limit", "burst", "seed")
+
+PRODUCTS = ("cold brew", "trail runner", "face serum", "oat latte", "city bike", "linen shirt", "green tea",
+            "yoga mat", "travel mug", "rain jacket", "protein bar", "desk lamp")
+ADJECTIVES = ("organic", "limited edition", "lightweight", "premium", "sustainable", "everyday", "bold", "classic")
+FEATURES = ("recycled packaging", "all-day comfort", "small-batch roasting", "two-year warranty", "plant-based",
+            "ships in 24 hours", "locally made", "award-winning design", "zero added sugar", "fits any bag")
+MOODS = ("warm morning light", "energetic and playful", "calm and minimal", "moody evening", "fresh and airy")
+TONES = ("Professional", "Casual", "Humorous", "Inspirational", "Urgent")
+LENGTHS = ("Short", "Medium", "Long")
+STYLES = ("Realistic", "Illustrated", "Minimalist", "Bold & Colorful", "Elegant & Sophisticated")
+VISUAL_TYPES = ("Brand Image", "Product Showcase", "Advertisement", "Social Media Graphic")
+
+
+def start_mock_server(options):
+    """
+    Start the mock Together API in a child process, so it doesn't compete for the load test's GIL
+
+    Args:
+        options (dict): MockTogetherServer options by name; None values are left at their defaults
+
+    Returns:
+        tuple: (subprocess.Popen, base URL)
+    """
+    command = [sys.executable, "-m", "benchmarks.mock_together", "--port", "0"]
+    for name, value in options.items():
+        if value is not None:
+            command += [f"--{name.replace('_', '-')}", str(value)]
+    process = subprocess.Popen(command, cwd=REPO_ROOT, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line:
+        process.wait()
+        raise RuntimeError("The mock server did not start")
+    return process, line.rsplit(" ", 1)[-1].strip()
+
+
+def _brief(rng, is_image):
+    # Filled in the way a user fills the Marketing Copy and Visual Content forms
+    product = f"{rng.choice(ADJECTIVES)} {rng.choice(PRODUCTS)} {rng.randint(1, 10 ** 6)}"
+    if is_image:
+        return "image", build_prompt(
+            "Visual Content", visual_type=rng.choice(VISUAL_TYPES), style=rng.choice(STYLES),
+            description=f"{product} on a table, {', '.join(rng.sample(FEATURES, 2))}", theme=rng.choice(MOODS)
+        )
+    return "text", build_prompt(
+        "Marketing Copy", product_name=product, key_features="\n".join(rng.sample(FEATURES, 3)),
+        copy_length=rng.choice(LENGTHS), tone=rng.choice(TONES)
+    )
+
+
+class LoadTest:
+    """
+    Concurrent sessions submitting the generation form
+
+    Every session is a thread that runs what a click on "Generate Content"
+    runs: the near-duplicate brief lookup, then generate_text_stream,
+    generate_text_variants or generate_image_variants. All sessions share the
+    process-wide client pool, rate limiters, caches and stores, like browser
+    tabs on one Streamlit server. AppTest can't be used for this, because it
+    swaps a process-global runtime in and out around every script run, so
+    concurrent runs break each other.
+    """
+
+    def __init__(self, sessions=DEFAULT_SESSIONS, submissions=DEFAULT_SUBMISSIONS, image_share=DEFAULT_IMAGE_SHARE,
+                 repeat_share=DEFAULT_REPEAT_SHARE, variants=1, stream=True, think_time=DEFAULT_THINK_TIME,
+                 ramp_up=DEFAULT_RAMP_UP, seed=0):
+        """
+        Args:
+            sessions (int): Concurrent sessions
+            submissions (int): Form submissions per session
+            image_share (float): Share of submissions that generate images
+            repeat_share (float): Share of submissions that resend an earlier brief
+                (answered with the similar-brief offer instead of a generation)
+            variants (int): Variants per submission
+            stream (bool): Stream single text variants
+            think_time (float): Mean seconds between a session's submissions (exponentially distributed)
+            ramp_up (float): Seconds over which session starts are spread
+            seed (int): Random seed for briefs and timing
+        """
+        self.sessions = sessions
+        self.submissions = submissions
+        self.image_share = image_share
+        self.repeat_share = repeat_share
+        self.variants = variants
+        self.stream = stream
+        self.think_time = think_time
+        self.ramp_up = ramp_up
+        self.seed = seed
+        self.results = []
+        self._briefs = []
+        self._lock = threading.Lock()
+
+    def _pick_brief(self, rng):
+        with self._lock:
+            if self._briefs and rng.random() < self.repeat_share:
+                return rng.choice(self._briefs), True
+        brief = _brief(rng, rng.random() < self.image_share)
+        with self._lock:
+            self._briefs.append(brief)
+        return brief, False
+
+    def _submit(self, kind, prompt):
+        from utils.content_generation.content_generation import (
+            find_similar_generations, generate_text_stream, generate_text_variants, generate_image_variants,
+            DEFAULT_TEXT_MODEL, DEFAULT_IMAGE_MODEL, GenerationError
+        )
+
+        # The sessions generate with the default models, so only look for their results
+        if find_similar_generations(prompt, kind, DEFAULT_IMAGE_MODEL if kind == "image" else DEFAULT_TEXT_MODEL):
+            return "reused"
+        if kind == "image":
+            outputs = generate_image_variants(prompt, self.variants)
+        elif self.stream and self.variants == 1:
+            # st.write_stream consumes the generator the same way
+            try:
+                outputs = [text for text in ["".join(generate_text_stream(prompt))] if text]
+            except GenerationError:
+                outputs = []
+        else:
+            outputs = generate_text_variants(prompt, self.variants)
+        if not outputs:
+            return "failed"
+        return "generated" if len(outputs) == self.variants else "partial"
+
+    def _session(self, index, started_at):
+        rng = random.Random(self.seed * 100003 + index)
+        time.sleep(max(0.0, started_at + self.ramp_up * index / max(1, self.sessions) - time.monotonic()))
+        for submission in range(self.submissions):
+            if submission:
+                time.sleep(rng.expovariate(1 / self.think_time) if self.think_time > 0 else 0)
+            (kind, prompt), repeated = self._pick_brief(rng)
+            message = None
+            started = time.perf_counter()
+            try:
+                outcome = self._submit(kind, prompt)
+            except Exception as e:
+                outcome, message = "exception", f"{type(e).__name__}: {e}"
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.results.append({
+                    "session": index,
+                    "kind": kind,
+                    "repeated": repeated,
+                    "seconds": round(elapsed, 4),
+                    "outcome": outcome,
+                    "message": message,
+                })
+
+    def run(self):
+        """
+        Run all sessions to completion
+
+        Returns:
+            float: Wall-clock seconds
+        """
+        import streamlit as st
+
+        # Without a script run context every thread sees the same fallback session state
+        st.session_state.api_key = "load-test"
+        started_at = time.monotonic()
+        threads = [
+            threading.Thread(target=self._session, args=(i, started_at), name=f"load-session-{i}")
+            for i in range(self.sessions)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.monotonic() - started_at
+
+
+def summarize(seconds):
+    """
+    Latency percentiles of a list of durations
+
+    Args:
+        seconds (list): Durations in seconds
+
+    Returns:
+        dict: count and mean/p50/p90/p95/p99/max in ms, or just the count if empty
+    """
+    if not seconds:
+        return {"count": 0}
+    timings_ms = np.array(seconds) * 1000
+    return {
+        "count": len(seconds),
+        "mean_ms": round(float(timings_ms.mean()), 1),
+        "p50_ms": round(float(np.percentile(timings_ms, 50)), 1),
+        "p90_ms": round(float(np.percentile(timings_ms, 90)), 1),
+        "p95_ms": round(float(np.percentile(timings_ms, 95)), 1),
+        "p99_ms": round(float(np.percentile(timings_ms, 99)), 1),
+        "max_ms": round(float(timings_ms.max()), 1),
+    }
+
+
+def build_report(load_test, wall_seconds, mock_stats, config):
+    """
+    Summarize a finished load test
+
+    Args:
+        load_test (LoadTest): The finished run
+        wall_seconds (float): Duration of the run
+        mock_stats (dict, optional): Counters from the mock server's /stats endpoint
+        config (dict): Options of the run, stored with the report
+
+    Returns:
+        dict: Report with throughput, outcomes, latency percentiles, limiter states, span timings
+            and counters, and per-submission results
+    """
+    from utils.content_generation.rate_limiter import get_limiter_states
+    from utils.metrics.metrics import get_metrics
+
+    results = load_test.results
+    completed = [r for r in results if r["outcome"] in ("generated", "partial")]
+    latency = {kind: summarize([r["seconds"] for r in completed if r["kind"] == kind]) for kind in ("text", "image")}
+    latency["reused"] = summarize([r["seconds"] for r in results if r["outcome"] == "reused"])
+    latency["failed"] = summarize([r["seconds"] for r in results if r["outcome"] in ("failed", "exception")])
+    generated = len(completed)
+    return {
+        "meta": {
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "config": config,
+        },
+        "wall_seconds": round(wall_seconds, 2),
+        "submissions": len(results),
+        "generations_per_minute": round(generated / wall_seconds * 60, 2) if wall_seconds else None,
+        "outcomes": dict(Counter(r["outcome"] for r in results)),
+        "latency": latency,
+        "errors": dict(Counter(r["message"] for r in results if r["message"]).most_common(10)),
+        "limiters": get_limiter_states(),
+        "spans": get_metrics().timings(),
+        "counters": get_metrics().counters(),
+        "mock_server": mock_stats,
+        "results": results,
+    }
+
+
+def print_report(report):
+    print(f"\n{report['submissions']} submissions in {report['wall_seconds']}s "
+          f"({report['generations_per_minute']} generations/min)")
+    print("Outcomes: " + ", ".join(f"{k} {v}" for k, v in sorted(report["outcomes"].items())))
+    print(f"{'latency':<10}{'count':>7}{'mean ms':>11}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'max ms':>11}")
+    for name, stats in report["latency"].items():
+        if stats["count"]:
+            print(f"{name:<10}{stats['count']:>7}{stats['mean_ms']:>11.1f}{stats['p50_ms']:>11.1f}"
+                  f"{stats['p95_ms']:>11.1f}{stats['p99_ms']:>11.1f}{stats['max_ms']:>11.1f}")
+    for state in report["limiters"]:
+        print(f"limiter {state['model']}: {state['requests']} requests, {state['throttled']} throttled, "
+              f"{state['retries']} retries, {state['failures']} failures, limit {state['concurrency_limit']}")
+    if report["mock_server"]:
+        print("mock server: " + ", ".join(f"{k} {v}" for k, v in report["mock_server"].items()))
+    for message, count in report["errors"].items():
+        print(f"  {count}x {message[:160]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Drive concurrent Streamlit sessions through the generation form against a mock Together API"
+    )
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS, help="Concurrent sessions")
+    parser.add_argument("--submissions", type=int, default=DEFAULT_SUBMISSIONS, help="Form submissions per session")
+    parser.add_argument("--image-share", type=float, default=DEFAULT_IMAGE_SHARE,
+                        help="Share of submissions that generate images")
+    parser.add_argument("--repeat-share", type=float, default=DEFAULT_REPEAT_SHARE,
+                        help="Share of submissions that resend an earlier brief")
+    parser.add_argument("--variants", type=int, default=1, help="Variants per submission")
+    parser.add_argument("--no-stream", action="store_true", help="Don't stream single text variants")
+    parser.add_argument("--think-time", type=float, default=DEFAULT_THINK_TIME,
+                        help="Mean seconds between a session's submissions")
+    parser.add_argument("--ramp-up", type=float, default=DEFAULT_RAMP_UP,
+                        help="Seconds over which session starts are spread")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for briefs, timing and the mock server")
+    parser.add_argument("--base-url", help="Use an already running API (mock or real) instead of starting the mock")
+    parser.add_argument("--data-dir", help="Data directory to use (default: a temporary one, removed afterwards)")
+    parser.add_argument("--output", help="Write the report to this JSON file "
+                                         "(default: benchmarks/results/load-<timestamp>.json)")
+
+    mock = parser.add_argument_group("mock server", "Options for the mock server started when --base-url is not given")
+    mock.add_argument("--text-latency", help="Time to first token, e.g. lognormal:0.6,0.4")
+    mock.add_argument("--image-latency", help="Time per image, e.g. lognormal:3,0.3")
+    mock.add_argument("--token-delay", type=float, help="Seconds per generated word")
+    mock.add_argument("--completion-words", type=int)
+    mock.add_argument("--image-kib", type=int, help="Approximate PNG size in KiB")
+    mock.add_argument("--image-format", choices=["request", "url", "b64_json"])
+    mock.add_argument("--error-rate", type=float, help="Share of requests failed with --error-status")
+    mock.add_argument("--error-status", type=int)
+    mock.add_argument("--throttle-rate", type=float, help="Share of requests rejected with 429")
+    mock.add_argument("--retry-after", type=float)
+    mock.add_argument("--rate-limit", type=float, help="Requests per second above which the mock answers 429")
+    mock.add_argument("--burst", type=int)
+    args = parser.parse_args()
+
+    mock_process = None
+    base_url = args.base_url
+    if not base_url:
+        mock_process, base_url = start_mock_server({name: getattr(args, name) for name in MOCK_OPTIONS})
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="creativeflow-load-")
+
+    # Both are read at import time, so they have to be set before anything from utils is imported
+    os.environ["TOGETHER_API_BASE"] = base_url
+    os.environ["CREATIVEFLOW_DATA_DIR"] = data_dir
+    os.chdir(REPO_ROOT)
+    sys.path.insert(0, REPO_ROOT)
+
+    from streamlit import config, logger
+
+    config.set_option("logger.level", "error")
+    logger.set_log_level("error")
+
+    try:
+        load_test = LoadTest(
+            sessions=args.sessions, submissions=args.submissions, image_share=args.image_share,
+            repeat_share=args.repeat_share, variants=args.variants, stream=not args.no_stream,
+            think_time=args.think_time, ramp_up=args.ramp_up, seed=args.seed
+        )
+        print(f"Running {args.sessions} sessions x {args.submissions} submissions against {base_url}...",
+              file=sys.stderr)
+        wall_seconds = load_test.run()
+        try:
+            mock_stats = requests.get(f"{base_url}/stats", timeout=5).json() if mock_process else None
+        except (requests.RequestException, ValueError):
+            mock_stats = None
+        config_values = {k: v for k, v in vars(args).items() if k not in ("output", "data_dir")}
+        config_values["base_url"] = base_url
+        report = build_report(load_test, wall_seconds, mock_stats, config_values)
+    finally:
+        if mock_process:
+            mock_process.terminate()
+            mock_process.wait()
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    print_report(report)
+    output = args.output or os.path.join(
+        REPO_ROOT, "benchmarks", RESULTS_DIRNAME, datetime.now().strftime("load-%Y%m%d-%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\nReport written to {output}")
+
+
+if __name__ == "__main__":
+    main()
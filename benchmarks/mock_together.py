@@ -0,0 +1,391 @@
+import argparse
+import base64
+import io
+import json
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+DEFAULT_TEXT_LATENCY = "lognormal:0.6,0.4"
+DEFAULT_IMAGE_LATENCY = "lognormal:3.0,0.3"
+DEFAULT_TOKEN_DELAY = 0.01
+DEFAULT_COMPLETION_WORDS = 250
+DEFAULT_IMAGE_KIB = 1024
+IMAGE_POOL_SIZE = 8
+# Words per streamed chunk; real servers send a token or two per event
+WORDS_PER_CHUNK = 2
+
+WORDS = (
+    "discover bold fresh flavor crafted for everyday moments our new launch brings premium quality "
+    "sustainable design and trusted comfort to your morning routine join the community share your story "
+    "limited edition available now experience the difference style energy adventure natural modern"
+).split()
+
+
+def parse_latency(spec):
+    """
+    Parse a latency distribution
+
+    Supported forms (all values in seconds): ``fixed:S``, ``uniform:LOW,HIGH``,
+    ``normal:MEAN,SD``, ``lognormal:MEDIAN,SIGMA`` and ``exponential:MEAN``.
+    Samples are never negative.
+
+    Args:
+        spec (str): Distribution spec
+
+    Returns:
+        callable: Function taking a random.Random and returning a delay in seconds
+    """
+    name, _, values = spec.partition(":")
+    try:
+        params = [float(v) for v in values.split(",")] if values else []
+    except ValueError:
+        raise ValueError(f"Invalid latency spec: {spec}")
+
+    distributions = {
+        "fixed": (1, lambda rng, s: s),
+        "uniform": (2, lambda rng, low, high: rng.uniform(low, high)),
+        "normal": (2, lambda rng, mean, sd: rng.gauss(mean, sd)),
+        "lognormal": (2, lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0),
+        "exponential": (1, lambda rng, mean: rng.expovariate(1 / mean) if mean > 0 else 0.0),
+    }
+    if name not in distributions or len(params) != distributions[name][0]:
+        raise ValueError(f"Invalid latency spec: {spec}")
+    sample = distributions[name][1]
+    return lambda rng: max(0.0, sample(rng, *params))
+
+
+def _noise_png(rng, kib):
+    # Random pixels don't compress, so the PNG ends up close to the raw RGB size
+    side = max(8, int(math.sqrt(kib * 1024 / 3)))
+    image = Image.frombytes("RGB", (side, side), rng.randbytes(side * side * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def _unique_png(png):
+    # Insert a random text chunk before IEND; otherwise the content-addressed blob store
+    # would store repeated pool images only once and hide the cost of saving them
+    data = b"Comment\0" + uuid.uuid4().hex.encode("ascii")
+    chunk = len(data).to_bytes(4, "big") + b"tEXt" + data + zlib.crc32(b"tEXt" + data).to_bytes(4, "big")
+    return png[:-12] + chunk + png[-12:]
+
+
+class MockTogetherServer:
+    """
+    Local stand-in for the Together AI API
+
+    Serves ``/v1/chat/completions`` (plain and streamed as server-sent events)
+    and ``/v1/images/generations`` (``url`` and ``b64_json`` responses, with the
+    URLs served by the mock itself), so the app and load tests run without
+    network access or an API key. Response times follow configurable latency
+    distributions, and a share of requests can be failed or throttled with 429
+    on purpose. ``GET /stats`` returns the request counters.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, text_latency=DEFAULT_TEXT_LATENCY,
+                 image_latency=DEFAULT_IMAGE_LATENCY, token_delay=DEFAULT_TOKEN_DELAY,
+                 completion_words=DEFAULT_COMPLETION_WORDS, image_kib=DEFAULT_IMAGE_KIB, image_format="request",
+                 error_rate=0.0, error_status=503, throttle_rate=0.0, retry_after=1.0,
+                 rate_limit=None, burst=10, seed=0):
+        """
+        Args:
+            host (str): Interface to listen on
+            port (int): Port to listen on; 0 picks a free one
+            text_latency (str): Time to first token, see parse_latency
+            image_latency (str): Time per generated image, see parse_latency
+            token_delay (float): Seconds per generated word after the first
+            completion_words (int): Words per chat completion
+            image_kib (int): Approximate size of each generated PNG in KiB
+            image_format (str): 'request' to honour the request's response_format,
+                or 'url' / 'b64_json' to always answer that way
+            error_rate (float): Share of requests failed with error_status
+            error_status (int): Status code of injected errors
+            throttle_rate (float): Share of requests rejected with 429
+            retry_after (float): Retry-After seconds sent with injected 429s
+            rate_limit (float, optional): Requests per second above which requests get 429
+            burst (int): Token bucket size for rate_limit
+            seed (int): Random seed for latencies, injected failures and images
+        """
+        self.text_latency = parse_latency(text_latency)
+        self.image_latency = parse_latency(image_latency)
+        self.token_delay = token_delay
+        self.completion_words = completion_words
+        self.image_format = image_format
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._images = [_noise_png(self._rng, image_kib) for _ in range(IMAGE_POOL_SIZE)]
+        self._files = {}
+        self.counters = {
+            "chat": 0, "chat_stream": 0, "images": 0, "image_files": 0,
+            "errors": 0, "throttled": 0, "rate_limited": 0, "bytes_sent": 0, "in_flight": 0, "peak_in_flight": 0,
+        }
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        """Serve requests on a background thread"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-together", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] += amount
+            if counter == "in_flight":
+                self.counters["peak_in_flight"] = max(self.counters["peak_in_flight"], self.counters["in_flight"])
+
+    def _sample(self, distribution):
+        with self._lock:
+            return distribution(self._rng)
+
+    def _rejection(self):
+        """Decide whether a generation request fails; returns (status, retry_after) or None"""
+        with self._lock:
+            if self.rate_limit:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_limit)
+                self._updated = now
+                if self._tokens < 1:
+                    self.counters["rate_limited"] += 1
+                    return 429, round((1 - self._tokens) / self.rate_limit, 2)
+                self._tokens -= 1
+            draw = self._rng.random()
+            if draw < self.throttle_rate:
+                self.counters["throttled"] += 1
+                return 429, self.retry_after
+            if draw < self.throttle_rate + self.error_rate:
+                self.counters["errors"] += 1
+                return self.error_status, None
+        return None
+
+    def _completion(self, prompt):
+        with self._lock:
+            words = [self._rng.choice(WORDS) for _ in range(self.completion_words)]
+        # Echo the start of the prompt so distinct briefs get distinct answers
+        return f"{' '.join(prompt.split()[:8])}: {' '.join(words).capitalize()}."
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type="application/json", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                server._count("bytes_sent", len(body))
+
+            def _send_json(self, status, payload, headers=None):
+                self._send(status, json.dumps(payload).encode("utf-8"), headers=headers)
+
+            def _send_error(self, status, message, retry_after=None):
+                headers = {"Retry-After": str(retry_after)} if retry_after is not None else None
+                self._send_json(status, {"error": {"message": message, "type": "mock_error", "code": status}},
+                                headers=headers)
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/stats"):
+                    self._send_json(200, server.stats())
+                    return
+                name = self.path.rsplit("/", 1)[-1]
+                with server._lock:
+                    body = server._files.pop(name, None)
+                if body is None:
+                    self._send_error(404, f"Unknown file {name}")
+                    return
+                server._count("image_files")
+                self._send(200, body, "image/png")
+
+            def do_POST(self):
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                except ValueError:
+                    self._send_error(400, "Invalid JSON body")
+                    return
+
+                if self.path.endswith("/chat/completions"):
+                    handler = self._chat
+                elif self.path.endswith("/images/generations"):
+                    handler = self._images
+                else:
+                    self._send_error(404, f"Unknown endpoint {self.path}")
+                    return
+
+                rejection = server._rejection()
+                if rejection:
+                    status, retry_after = rejection
+                    message = "Rate limit exceeded" if status == 429 else "Injected server error"
+                    self._send_error(status, message, retry_after)
+                    return
+
+                server._count("in_flight")
+                try:
+                    handler(body)
+                finally:
+                    server._count("in_flight", -1)
+
+            def _chat(self, body):
+                model = body.get("model", "mock")
+                messages = body.get("messages") or [{}]
+                text = server._completion(str(messages[-1].get("content", "")))
+                time.sleep(server._sample(server.text_latency))
+                completion_id = f"mock-{uuid.uuid4().hex[:12]}"
+                created = int(time.time())
+
+                if not body.get("stream"):
+                    server._count("chat")
+                    time.sleep(server.token_delay * server.completion_words)
+                    words = len(text.split())
+                    self._send_json(200, {
+                        "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                     "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": words, "total_tokens": words},
+                    })
+                    return
+
+                server._count("chat_stream")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                words = text.split(" ")
+                for i in range(0, len(words), WORDS_PER_CHUNK):
+                    if i:
+                        time.sleep(server.token_delay * WORDS_PER_CHUNK)
+                    piece = " ".join(words[i:i + WORDS_PER_CHUNK]) + ("" if i + WORDS_PER_CHUNK >= len(words) else " ")
+                    self._write_event({
+                        "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                    })
+                self._write_event({
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                })
+                self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_event(self, payload):
+                self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+            def _write_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+                server._count("bytes_sent", len(data))
+
+            def _images(self, body):
+                count = max(1, int(body.get("n", 1)))
+                server._count("images", count)
+                # A batch takes as long as generating its images one after another
+                time.sleep(sum(server._sample(server.image_latency) for _ in range(count)))
+
+                response_format = body.get("response_format") or "url"
+                if server.image_format != "request":
+                    response_format = server.image_format
+                data = []
+                for _ in range(count):
+                    with server._lock:
+                        image = _unique_png(server._rng.choice(server._images))
+                    if response_format == "b64_json":
+                        data.append({"b64_json": base64.b64encode(image).decode("ascii")})
+                    else:
+                        name = f"{uuid.uuid4().hex}.png"
+                        with server._lock:
+                            server._files[name] = image
+                        data.append({"url": f"{server.base_url}/files/{name}"})
+                self._send_json(200, {"id": f"mock-{uuid.uuid4().hex[:12]}", "model": body.get("model"),
+                                      "object": "list", "data": data})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the Together AI API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (0 picks a free one)")
+    parser.add_argument("--text-latency", default=DEFAULT_TEXT_LATENCY,
+                        help="Time to first token, e.g. fixed:0.5, uniform:0.2,1, normal:1,0.2, "
+                             "lognormal:MEDIAN,SIGMA or exponential:MEAN (seconds)")
+    parser.add_argument("--image-latency", default=DEFAULT_IMAGE_LATENCY, help="Time per generated image")
+    parser.add_argument("--token-delay", type=float, default=DEFAULT_TOKEN_DELAY, help="Seconds per generated word")
+    parser.add_argument("--completion-words", type=int, default=DEFAULT_COMPLETION_WORDS)
+    parser.add_argument("--image-kib", type=int, default=DEFAULT_IMAGE_KIB, help="Approximate PNG size in KiB")
+    parser.add_argument("--image-format", choices=["request", "url", "b64_json"], default="request",
+                        help="Answer image requests with URLs or base64 regardless of the requested format")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failed with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests rejected with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds of injected 429s")
+    parser.add_argument("--rate-limit", type=float, help="Requests per second above which requests get 429")
+    parser.add_argument("--burst", type=int, default=10, help="Burst size for --rate-limit")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockTogetherServer(
+        host=args.host, port=args.port, text_latency=args.text_latency, image_latency=args.image_latency,
+        token_delay=args.token_delay, completion_words=args.completion_words, image_kib=args.image_kib,
+        image_format=args.image_format, error_rate=args.error_rate, error_status=args.error_status,
+        throttle_rate=args.throttle_rate, retry_after=args.retry_after, rate_limit=args.rate_limit,
+        burst=args.burst, seed=args.seed
+    )
+    # The load test reads this line to find the port
+    print(f"Mock Together API listening on {server.base_url}", flush=True)
+    print(f"Run the app against it with TOGETHER_API_BASE={server.base_url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
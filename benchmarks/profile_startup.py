@@ -0,0 +1,263 @@
+import argparse
+import ast
+import importlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "app.py")
+DEFAULT_REPEAT = 3
+DEFAULT_RERUNS = 5
+DEFAULT_TOP = 15
+RESULTS_DIRNAME = "results"
+PHASES = ("process_ms", "streamlit_import_ms", "app_import_ms", "first_paint_ms", "rerun_ms")
+
+
+def app_modules():
+    """
+    List the project modules app.py imports, in import order
+
+    Returns:
+        list: Dotted module names, e.g. 'utils.storage.storage'
+    """
+    with open(APP_PATH, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module.startswith("utils.") and node.module not in modules:
+            modules.append(node.module)
+    return modules
+
+
+def _elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def run_worker(reruns, result_path):
+    """
+    Time one cold start (in a child process started with -X importtime)
+
+    The phases are the Streamlit import, the app's own imports, the first
+    script run (first paint) and warm reruns of the same session.
+    """
+    os.chdir(REPO_ROOT)
+    sys.path.insert(0, REPO_ROOT)
+
+    started = time.perf_counter()
+    import streamlit
+    from streamlit import config, logger
+    from streamlit.testing.v1 import AppTest
+    streamlit_import_ms = _elapsed_ms(started)
+
+    # Bare-mode warnings from every call would bury the import profile on stderr
+    config.set_option("logger.level", "error")
+    logger.set_log_level("error")
+
+    modules = {}
+    started = time.perf_counter()
+    for module in app_modules():
+        module_started = time.perf_counter()
+        importlib.import_module(module)
+        modules[module] = _elapsed_ms(module_started)
+    app_import_ms = _elapsed_ms(started)
+
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    started = time.perf_counter()
+    at.run()
+    first_paint_ms = _elapsed_ms(started)
+
+    rerun_ms = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        at.run()
+        rerun_ms.append(_elapsed_ms(started))
+
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "streamlit_version": streamlit.__version__,
+            "streamlit_import_ms": streamlit_import_ms,
+            "app_import_ms": app_import_ms,
+            "app_modules_ms": modules,
+            "first_paint_ms": first_paint_ms,
+            "rerun_ms": rerun_ms,
+            "exceptions": [e.value for e in at.exception],
+        }, f)
+
+
+def parse_importtime(output):
+    """
+    Sum the self time of every import in -X importtime output by top-level package
+
+    Args:
+        output (str): stderr of a process started with -X importtime
+
+    Returns:
+        dict: Top-level package name -> self import time in ms
+    """
+    packages = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, _, name = line[len("import time:"):].split("|", 2)
+            package = name.strip().split(".")[0]
+            packages[package] = packages.get(package, 0.0) + int(self_us) / 1000
+        except ValueError:
+            continue
+    return packages
+
+
+def profile_cold_start(reruns, data_dir=None):
+    """
+    Start a fresh interpreter and profile its imports and first paint
+
+    Args:
+        reruns (int): Warm reruns timed after the first paint
+        data_dir (str, optional): Data directory to copy for the run; an empty one is used otherwise
+
+    Returns:
+        dict: Phase timings in ms and per-package import times
+    """
+    work_dir = tempfile.mkdtemp(prefix="creativeflow-startup-")
+    result_path = os.path.join(work_dir, "result.json")
+    env = dict(os.environ, CREATIVEFLOW_DATA_DIR=os.path.join(work_dir, "data"))
+    try:
+        if data_dir:
+            shutil.copytree(data_dir, env["CREATIVEFLOW_DATA_DIR"])
+        else:
+            os.makedirs(env["CREATIVEFLOW_DATA_DIR"])
+        command = [sys.executable, "-X", "importtime", "-m", "benchmarks.profile_startup",
+                   "--worker", "--reruns", str(reruns), "--result-file", result_path]
+        started = time.perf_counter()
+        process = subprocess.run(command, cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+        process_ms = _elapsed_ms(started)
+        if process.returncode != 0:
+            raise RuntimeError(f"Startup worker failed:\n{process.stderr[-4000:]}")
+        with open(result_path, encoding="utf-8") as f:
+            result = json.load(f)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    result["process_ms"] = process_ms
+    result["packages_ms"] = parse_importtime(process.stderr)
+    return result
+
+
+def _summary(values):
+    # Kept free of numpy: the worker runs this module, and its imports would skew the profile
+    return {
+        "median": round(statistics.median(values), 2),
+        "min": round(min(values), 2),
+        "max": round(max(values), 2),
+    }
+
+
+def _values(value):
+    return value if isinstance(value, list) else [value]
+
+
+def profile(repeat, reruns, data_dir=None):
+    """
+    Profile several cold starts and summarize them
+
+    Args:
+        repeat (int): Number of cold starts
+        reruns (int): Warm reruns timed per cold start
+        data_dir (str, optional): Data directory to start against
+
+    Returns:
+        dict: Report with "meta", per-phase and per-package "summary" and the raw "runs"
+    """
+    runs = []
+    for i in range(repeat):
+        print(f"Cold start {i + 1}/{repeat}...", file=sys.stderr)
+        runs.append(profile_cold_start(reruns, data_dir))
+
+    packages = sorted({package for run in runs for package in run["packages_ms"]})
+    modules = list(runs[0]["app_modules_ms"])
+    return {
+        "meta": {
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "streamlit": runs[0]["streamlit_version"],
+            "repeat": repeat,
+            "reruns": reruns,
+            "data_dir": data_dir,
+        },
+        "summary": {
+            "phases": {
+                phase: _summary([value for run in runs for value in _values(run[phase])]) for phase in PHASES
+            },
+            "packages_ms": dict(sorted(
+                ((package, _summary([run["packages_ms"].get(package, 0.0) for run in runs])) for package in packages),
+                key=lambda item: -item[1]["median"]
+            )),
+            "app_modules_ms": {
+                module: _summary([run["app_modules_ms"].get(module, 0.0) for run in runs]) for module in modules
+            },
+        },
+        "exceptions": sorted({e for run in runs for e in run["exceptions"]}),
+        "runs": runs,
+    }
+
+
+def print_report(report, top=DEFAULT_TOP):
+    summary = report["summary"]
+    print(f"\n{'phase':<28}{'median ms':>12}{'min ms':>12}{'max ms':>12}")
+    for phase, stats in summary["phases"].items():
+        print(f"{phase:<28}{stats['median']:>12.2f}{stats['min']:>12.2f}{stats['max']:>12.2f}")
+
+    print(f"\n{'app import (incremental)':<44}{'median ms':>12}")
+    for module, stats in summary["app_modules_ms"].items():
+        print(f"{module:<44}{stats['median']:>12.2f}")
+
+    print(f"\n{'package (import self time)':<44}{'median ms':>12}")
+    for package, stats in list(summary["packages_ms"].items())[:top]:
+        print(f"{package:<44}{stats['median']:>12.2f}")
+
+    for exception in report["exceptions"]:
+        print(f"\nThe app raised: {exception}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Profile app cold start: interpreter and import costs, first paint and warm reruns"
+    )
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Cold starts to profile")
+    parser.add_argument("--reruns", type=int, default=DEFAULT_RERUNS, help="Warm reruns timed after each first paint")
+    parser.add_argument("--data-dir", help="Start against a copy of this data directory "
+                                           "(e.g. a dataset cached by run_benchmarks --dataset-dir)")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Packages listed by import time")
+    parser.add_argument("--output", help="Write the report to this JSON file "
+                                         "(default: benchmarks/results/startup-<timestamp>.json)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.reruns, args.result_file)
+        return
+
+    report = profile(args.repeat, args.reruns, args.data_dir)
+    print_report(report, args.top)
+
+    output = args.output or os.path.join(
+        REPO_ROOT, "benchmarks", RESULTS_DIRNAME, datetime.now().strftime("startup-%Y%m%d-%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {output}")
+
+
+if __name__ == "__main__":
+    main()
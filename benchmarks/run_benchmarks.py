@@ -0,0 +1,337 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = (10, 1000, 100000)
+DEFAULT_REPEAT = 20
+# Full script reruns take far longer than a library call, so they get fewer repetitions
+APP_REPEAT = 5
+DEFAULT_TOLERANCE = 0.25
+RESULTS_DIRNAME = "results"
+# Stats compared against a baseline, with the absolute change below which a difference is noise
+COMPARED_STATS = {"p50_ms": 1.0, "p95_ms": 1.0, "peak_kib": 64.0}
+
+
+def _stats(timings, peak_bytes, cold):
+    timings_ms = np.array(timings) * 1000
+    return {
+        "runs": len(timings),
+        "cold_ms": round(cold * 1000, 3),
+        "mean_ms": round(float(timings_ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(timings_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(timings_ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(timings_ms, 99)), 3),
+        "max_ms": round(float(timings_ms.max()), 3),
+        "peak_kib": round(peak_bytes / 1024, 1),
+    }
+
+
+def measure(func, repeat, setup=None):
+    """
+    Time a benchmark case and measure its peak Python heap use
+
+    The first call is reported separately as the cold run. Peak memory comes
+    from one extra call under tracemalloc, which would distort the timings.
+
+    Args:
+        func (callable): Zero-argument function to measure
+        repeat (int): Number of timed calls after the cold run
+        setup (callable, optional): Called untimed before every call
+
+    Returns:
+        dict: Run count, cold/mean/p50/p95/p99/max latency in ms and peak_kib
+    """
+    def run():
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started
+
+    cold = run()
+    timings = [run() for _ in range(repeat)]
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return _stats(timings, peak, cold)
+
+
+def _benchmark_cases(repeat):
+    # Imported here: the worker process points CREATIVEFLOW_DATA_DIR at its dataset first
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    from benchmarks.synthetic_data import IMAGE_POOL_SIZE
+    from utils.blob_store.blob_store import get_blob_store
+    from utils.asset_management.asset_management import (
+        save_to_project, get_all_assets, get_project_assets, count_assets, search_assets,
+        get_recent_history, count_history, find_duplicate_images
+    )
+    from utils.project_management.project_management import list_projects, count_projects, export_project
+    from utils.project_management.project_archive import export_project_archive, clear_export_cache
+
+    projects = list_projects()
+    project = max(projects, key=lambda p: count_assets(project_id=p["id"]))
+    image_pool = list(get_blob_store().iter_digests())[:IMAGE_POOL_SIZE]
+    st.session_state.current_project = project["id"]
+    counter = iter(range(10 ** 9))
+
+    def save_text():
+        save_to_project("text", f"Benchmark copy {next(counter)}", "Benchmark text")
+
+    def save_image():
+        save_to_project("image", image_pool[next(counter) % len(image_pool)], "Benchmark image")
+
+    def dashboard():
+        # The aggregations the Dashboard tab renders on every rerun
+        count_projects()
+        count_assets()
+        count_history()
+        for recent in list_projects(limit=3, newest_first=True):
+            count_assets(project_id=recent["id"])
+        get_recent_history(limit=5)
+
+    def library_last_page():
+        total = count_assets(project_id=project["id"], asset_type="text")
+        get_all_assets(project_id=project["id"], asset_type="text", offset=max(0, total - 24), limit=24,
+                       newest_first=True)
+
+    def new_app():
+        at = AppTest.from_file(os.path.join(REPO_ROOT, "app.py"), default_timeout=600)
+        at.session_state["api_key"] = "benchmark"
+        return at
+
+    def app_first_run():
+        new_app().run()
+
+    library_app = new_app()
+    library_app.run()
+
+    def library_next_page():
+        buttons = [b for b in library_app.button if b.label in ("Next ▶", "◀ Previous") and not b.disabled]
+        if buttons:
+            buttons[-1].click()
+        library_app.run()
+
+    filter_types = iter(["image", "text", "All Types"] * (repeat + APP_REPEAT))
+
+    def library_filter():
+        [s for s in library_app.selectbox if s.label == "Filter by Type"][0].set_value(next(filter_types))
+        library_app.run()
+
+    return [
+        ("save_to_project[text]", save_text, None, repeat),
+        ("save_to_project[image]", save_image, None, repeat),
+        ("get_all_assets[first page]", lambda: get_all_assets(offset=0, limit=24, newest_first=True), None, repeat),
+        ("get_all_assets[project text, last page]", library_last_page, None, repeat),
+        ("get_project_assets[largest project]", lambda: get_project_assets(project["id"]), None, repeat),
+        ("search_assets[common term]", lambda: search_assets("brand", limit=24), None, repeat),
+        ("find_duplicate_images", lambda: find_duplicate_images(), None, repeat),
+        ("dashboard aggregations", dashboard, None, repeat),
+        ("export_project[json]", lambda: export_project(project["id"]), None, repeat),
+        ("export_project_archive[zip]", lambda: export_project_archive(project["id"]), clear_export_cache, repeat),
+        ("app first run", app_first_run, None, APP_REPEAT),
+        ("app library next page", library_next_page, None, APP_REPEAT),
+        ("app library type filter", library_filter, None, APP_REPEAT),
+    ]
+
+
+def run_worker(size, repeat, dataset_root, result_path):
+    """
+    Build or copy the dataset for one size and run every case on it (in a child process)
+    """
+    from streamlit import config, logger
+
+    # Deprecation and bare-mode warnings from every call would bury the progress output
+    config.set_option("logger.level", "error")
+    logger.set_log_level("error")
+    work_dir = tempfile.mkdtemp(prefix=f"creativeflow-bench-{size}-")
+    cached = os.path.join(dataset_root, f"assets-{size}") if dataset_root else None
+    os.environ["CREATIVEFLOW_DATA_DIR"] = os.path.join(work_dir, "data")
+    os.chdir(REPO_ROOT)
+    sys.path.insert(0, REPO_ROOT)
+
+    from benchmarks.synthetic_data import build_dataset, dataset_info
+
+    build_seconds = None
+    try:
+        # Cases write to the data, so they always run on a copy of a cached dataset
+        if cached and dataset_info(cached) and dataset_info(cached)["size"] == size:
+            shutil.copytree(cached, os.environ["CREATIVEFLOW_DATA_DIR"])
+            info = dataset_info()
+        else:
+            os.makedirs(os.environ["CREATIVEFLOW_DATA_DIR"])
+            started = time.perf_counter()
+            info = build_dataset(size, progress=lambda n: print(f"  built {n}/{size} assets", file=sys.stderr))
+            build_seconds = round(time.perf_counter() - started, 2)
+            if cached:
+                shutil.rmtree(cached, ignore_errors=True)
+                shutil.copytree(os.environ["CREATIVEFLOW_DATA_DIR"], cached)
+
+        results = {}
+        for name, func, setup, case_repeat in _benchmark_cases(repeat):
+            print(f"  {name}", file=sys.stderr)
+            results[name] = measure(func, case_repeat, setup=setup)
+
+        with open(result_path, "w", encoding="utf-8") as f:
+            json.dump({"dataset": info, "build_seconds": build_seconds, "cases": results}, f)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, repeat, dataset_root=None):
+    """
+    Run the benchmark cases for every dataset size, each in a fresh process
+
+    Stores, indexes and caches are process-wide singletons bound to the data
+    directory, so every size gets its own interpreter.
+
+    Args:
+        sizes (list): Asset counts to benchmark
+        repeat (int): Timed calls per case
+        dataset_root (str, optional): Directory to cache built datasets in
+
+    Returns:
+        dict: Report with "meta" and per-size "sizes" results
+    """
+    report = {
+        "meta": {
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "sizes": {},
+    }
+    for size in sizes:
+        print(f"Benchmarking {size} assets...", file=sys.stderr)
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            result_path = f.name
+        try:
+            command = [sys.executable, "-m", "benchmarks.run_benchmarks", "--worker", str(size),
+                       "--repeat", str(repeat), "--result-file", result_path]
+            if dataset_root:
+                command += ["--dataset-dir", os.path.abspath(dataset_root)]
+            subprocess.run(command, cwd=REPO_ROOT, check=True)
+            with open(result_path, encoding="utf-8") as f:
+                report["sizes"][str(size)] = json.load(f)
+        finally:
+            os.remove(result_path)
+    return report
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare a report with a baseline report
+
+    Args:
+        report (dict): Current results
+        baseline (dict): Earlier results
+        tolerance (float): Relative increase from which a stat counts as a regression,
+            provided it is also larger than the stat's noise floor in COMPARED_STATS
+
+    Returns:
+        list: (size, case, stat, baseline value, current value, relative change, regressed) tuples
+    """
+    rows = []
+    for size, result in report["sizes"].items():
+        baseline_cases = baseline.get("sizes", {}).get(size, {}).get("cases", {})
+        for case, stats in result["cases"].items():
+            if case not in baseline_cases:
+                continue
+            for stat, noise in COMPARED_STATS.items():
+                before, after = baseline_cases[case].get(stat), stats.get(stat)
+                if not before or after is None:
+                    continue
+                change = (after - before) / before
+                rows.append((size, case, stat, before, after, change, change > tolerance and after - before > noise))
+    return rows
+
+
+def print_report(report):
+    for size, result in report["sizes"].items():
+        build = f", built in {result['build_seconds']}s" if result.get("build_seconds") is not None else ""
+        print(f"\n{size} assets ({result['dataset']['projects']} projects{build})")
+        print(f"{'case':<42}{'runs':>6}{'cold ms':>11}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'peak KiB':>12}")
+        for case, stats in result["cases"].items():
+            print(f"{case:<42}{stats['runs']:>6}{stats['cold_ms']:>11.2f}{stats['p50_ms']:>11.2f}"
+                  f"{stats['p95_ms']:>11.2f}{stats['p99_ms']:>11.2f}{stats['peak_kib']:>12.1f}")
+
+
+def print_comparison(rows, tolerance):
+    print(f"\nCompared with baseline (regression threshold +{tolerance:.0%})")
+    for size, case, stat, before, after, change, regressed in rows:
+        marker = "  REGRESSION" if regressed else ""
+        print(f"{size:>7} {case:<42}{stat:<10}{before:>12.2f} -> {after:<12.2f}{change:>+8.1%}{marker}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark storage, library, export and page rendering paths on synthetic datasets"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Asset counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed calls per case")
+    parser.add_argument("--dataset-dir", help="Cache built datasets here and reuse them on later runs")
+    parser.add_argument("--output", help="Write the report to this JSON file "
+                                         "(default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Also write the report as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Compare with a baseline; exit with 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Relative slowdown or memory growth counted as a regression")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        run_worker(args.worker, args.repeat, args.dataset_dir, args.result_file)
+        return
+
+    report = run_suite(args.sizes, args.repeat, args.dataset_dir)
+    print_report(report)
+
+    output = args.output or os.path.join(
+        REPO_ROOT, "benchmarks", RESULTS_DIRNAME, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    for path in filter(None, (output, args.save_baseline)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(f"\nReport written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            rows = compare(report, json.load(f), args.tolerance)
+        print_comparison(rows, args.tolerance)
+        if any(row[-1] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import io
+import json
+import os
+import random
+import uuid
+from datetime import timedelta
+
+from PIL import Image, ImageFilter
+
+from utils.storage.storage import get_storage, get_data_dir, now
+from utils.blob_store.blob_store import get_blob_store
+from utils.renditions.renditions import get_rendition_cache, PREVIEW_NAMES
+from utils.history_log.history_log import get_history_log
+from utils.search_index.search_index import get_search_index
+from utils.image_hash.image_hash import get_image_hash_index
+
+# Bump when the generated data changes so cached datasets are rebuilt
+DATASET_VERSION = 1
+DATASET_MARKER = "dataset.json"
+IMAGE_SHARE = 0.2
+# Distinct source images; assets reuse them since the blob store is content-addressed
+IMAGE_POOL_SIZE = 24
+IMAGE_SIZE = 1024
+ASSETS_PER_PROJECT = 500
+HISTORY_DAYS = 365
+BATCH_SIZE = 1000
+
+WORDS = (
+    "brand launch campaign summer winter organic premium fresh bold vibrant audience social story "
+    "product design quality craft coffee tea skincare running shoes city weekend family adventure "
+    "sustainable local community limited edition discover experience comfort style energy morning "
+    "flavor taste light natural modern classic trusted innovative simple everyday create share"
+).split()
+TEMPLATES = (
+    "Create a compelling marketing copy for {subject}. Key features: {details} Tone: {tone}",
+    "Create an engaging social media post for Instagram about {subject}. {details}",
+    "Craft a compelling brand story for {subject} with the following elements: {details}",
+    "Create a {tone} brand image with the following details: Description: {subject}. {details}",
+)
+TONES = ("Professional", "Casual", "Humorous", "Inspirational", "Urgent")
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _text(rng):
+    # Generated copy is typically a few short paragraphs of 150-400 words
+    paragraphs = []
+    for _ in range(rng.randint(3, 6)):
+        paragraphs.append(" ".join(_sentence(rng, rng.randint(8, 18)) for _ in range(rng.randint(3, 5))))
+    return "\n\n".join(paragraphs)
+
+
+def _prompt(rng):
+    return rng.choice(TEMPLATES).format(
+        subject=" ".join(rng.choice(WORDS) for _ in range(3)),
+        details=_sentence(rng, rng.randint(10, 30)),
+        tone=rng.choice(TONES),
+    )
+
+
+def _image(rng, index):
+    # Smooth gradients plus blurred noise compress about like rendered artwork
+    base = Image.linear_gradient("L").resize((IMAGE_SIZE, IMAGE_SIZE)).rotate(rng.randint(0, 359))
+    noise = Image.effect_noise((IMAGE_SIZE, IMAGE_SIZE), rng.randint(20, 60)).filter(ImageFilter.GaussianBlur(3))
+    image = Image.merge("RGB", (base, noise, Image.blend(base, noise, 0.5)))
+    buffer = io.BytesIO()
+    if index % 2:
+        image.save(buffer, "JPEG", quality=90)
+    else:
+        image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def dataset_info(data_dir=None):
+    """
+    Read the description of the synthetic dataset in a data directory
+
+    Args:
+        data_dir (str, optional): Data directory; defaults to the configured one
+
+    Returns:
+        dict: Dataset parameters, or None if the directory holds no current synthetic dataset
+    """
+    path = os.path.join(data_dir or get_data_dir(), DATASET_MARKER)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        info = json.load(f)
+    return info if info.get("version") == DATASET_VERSION else None
+
+
+def build_dataset(size, seed=0, progress=None):
+    """
+    Fill the configured data directory with a synthetic workload
+
+    Creates about one project per ASSETS_PER_PROJECT assets, text assets with
+    realistic copy lengths and prompts, and 1024x1024 PNG/JPEG image assets,
+    spread over the last HISTORY_DAYS days with matching history entries. Data
+    goes through the bulk storage and index APIs, so 100k assets take minutes
+    rather than hours. Must run in a process whose CREATIVEFLOW_DATA_DIR points
+    at an empty directory.
+
+    Args:
+        size (int): Number of assets
+        seed (int): Random seed; equal seeds give equal datasets
+        progress (callable, optional): Called with the number of assets written so far
+
+    Returns:
+        dict: Dataset parameters, also written to DATASET_MARKER in the data directory
+    """
+    rng = random.Random(seed)
+    storage = get_storage()
+    blob_store = get_blob_store()
+    rendition_cache = get_rendition_cache()
+    history_log = get_history_log()
+    search_index = get_search_index()
+    image_hash_index = get_image_hash_index()
+
+    image_pool = []
+    for i in range(IMAGE_POOL_SIZE):
+        digest = blob_store.put(_image(rng, i))
+        rendition_cache.generate(digest, PREVIEW_NAMES)
+        image_pool.append(digest)
+
+    end = now()
+    start = end - timedelta(days=HISTORY_DAYS)
+    step = (end - start) / max(1, size)
+    project_count = max(1, -(-size // ASSETS_PER_PROJECT))
+    projects = []
+    for i in range(project_count):
+        project = {
+            "id": str(uuid.uuid4()),
+            "name": f"Project {i + 1:04d}",
+            "description": _sentence(rng, rng.randint(10, 40)),
+            "brand_guidelines": _sentence(rng, 20),
+            "target_audience": _sentence(rng, 8),
+            "created_at": start - timedelta(days=1),
+        }
+        storage.create_project(project)
+        projects.append(project)
+
+    written = 0
+    while written < size:
+        batch, prompts = [], []
+        for i in range(written, min(size, written + BATCH_SIZE)):
+            project = rng.choice(projects)
+            is_image = rng.random() < IMAGE_SHARE
+            batch.append({
+                "id": str(uuid.uuid4()),
+                "project_id": project["id"],
+                "type": "image" if is_image else "text",
+                "content": rng.choice(image_pool) if is_image else _text(rng),
+                "description": _sentence(rng, rng.randint(3, 8)),
+                "created_at": (start + step * i).replace(microsecond=0),
+                "project_name": project["name"],
+            })
+            prompts.append(_prompt(rng))
+
+        storage.add_assets([{k: v for k, v in asset.items() if k != "project_name"} for asset in batch])
+        search_index.add_many(batch, prompts)
+        image_hash_index.add_many(batch)
+        for asset in batch:
+            history_log.append({
+                "timestamp": asset["created_at"],
+                "project_id": asset["project_id"],
+                "project_name": asset["project_name"],
+                "asset_id": asset["id"],
+                "asset_type": asset["type"],
+                "description": asset["description"],
+            })
+        written += len(batch)
+        if progress:
+            progress(written)
+
+    info = {
+        "version": DATASET_VERSION,
+        "size": size,
+        "seed": seed,
+        "projects": project_count,
+        "image_share": IMAGE_SHARE,
+        "image_pool": IMAGE_POOL_SIZE,
+        "image_size": IMAGE_SIZE,
+    }
+    with open(os.path.join(get_data_dir(), DATASET_MARKER), "w", encoding="utf-8") as f:
+        json.dump(info, f)
+    return info
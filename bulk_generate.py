@@ -0,0 +1,108 @@
+import argparse
+import os
+import sys
+
+from utils.bulk_generation.bulk_generation import (
+    read_briefs, prepare_brief, brief_keys, get_or_create_project, run_batch, Checkpoint,
+    DEFAULT_CONCURRENCY, CHECKPOINT_SUFFIX, DONE, PARTIAL, FAILED
+)
+from utils.content_generation.content_generation import DEFAULT_TEXT_MODEL, DEFAULT_IMAGE_MODEL
+from utils.prompt_templates.prompt_templates import GENERATION_TYPES
+from utils.storage.storage import lock_data_dir, get_data_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate content for a CSV or JSON Lines file of briefs and save it to a project. "
+                    "Columns are the Content Generator's form fields (e.g. product_name, key_features, tone); "
+                    "'type' picks the template and 'id', 'variants', 'description', 'width' and 'height' are optional."
+    )
+    parser.add_argument("briefs", help="Briefs file (.csv, .jsonl or .ndjson)")
+    parser.add_argument("--project", required=True, help="Name of the project to save results to")
+    parser.add_argument("--create-project", action="store_true", help="Create the project if it does not exist")
+    parser.add_argument("--type", choices=GENERATION_TYPES, help="Content type for briefs without a 'type' column")
+    parser.add_argument("--variants", type=int, default=1, help="Variants per brief without a 'variants' column")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Briefs generated at the same time")
+    parser.add_argument("--text-model", default=DEFAULT_TEXT_MODEL, help="Model for text briefs")
+    parser.add_argument("--image-model", default=DEFAULT_IMAGE_MODEL, help="Model for Visual Content briefs")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the API, even for briefs answered before")
+    parser.add_argument("--checkpoint", help=f"Checkpoint file (default: <briefs>{CHECKPOINT_SUFFIX})")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and generate every brief")
+    parser.add_argument("--dry-run", action="store_true", help="Check the briefs and print the first prompt without generating")
+    parser.add_argument("--api-key", default=os.environ.get("TOGETHER_API_KEY"),
+                        help="Together AI API key (default: $TOGETHER_API_KEY)")
+    args = parser.parse_args()
+
+    try:
+        briefs = read_briefs(args.briefs)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Could not read {args.briefs}: {e}")
+
+    # Check every brief before the first API call, so a typo in row 300 doesn't stop the run halfway
+    source_name = os.path.basename(args.briefs)
+    requests, problems = [], []
+    for row, brief in enumerate(briefs, 1):
+        try:
+            requests.append(prepare_brief(brief, row, args.type, args.variants, source_name))
+        except ValueError as e:
+            problems.append(f"  brief {row}: {e}")
+    if problems:
+        sys.exit("Invalid briefs:\n" + "\n".join(problems))
+    if not requests:
+        sys.exit(f"No briefs found in {args.briefs}")
+
+    checkpoint_path = args.checkpoint or args.briefs + CHECKPOINT_SUFFIX
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = Checkpoint(checkpoint_path)
+    keys = brief_keys(briefs)
+    remaining = sum(1 for key in keys if not checkpoint.is_done(key))
+
+    if args.dry_run:
+        print(f"{len(requests)} briefs, {remaining} still to generate")
+        print(f"\nPrompt for brief 1 ({requests[0]['generation_type']}):\n{requests[0]['prompt']}")
+        return
+
+    if not args.api_key:
+        sys.exit("No API key: pass --api-key or set TOGETHER_API_KEY")
+    if not lock_data_dir():
+        sys.exit(f"The data directory {get_data_dir()} is in use by a running app or another bulk run; "
+                 "stop it first (or set CREATIVEFLOW_DATA_DIR to another directory)")
+    project = get_or_create_project(args.project, create=args.create_project)
+    if project is None:
+        sys.exit(f"Project '{args.project}' not found (pass --create-project to create it)")
+
+    print(f"Generating {remaining} of {len(requests)} briefs into '{project['name']}' "
+          f"({args.concurrency} at a time, checkpoint {checkpoint_path})", file=sys.stderr)
+    finished = 0
+
+    def progress(entry):
+        nonlocal finished
+        finished += 1
+        if entry["state"] == FAILED:
+            status = "FAILED"
+        elif entry["state"] == PARTIAL:
+            status = f"PARTIAL, {len(entry['asset_ids'])} asset(s)"
+        else:
+            status = f"{len(entry['asset_ids'])} asset(s)"
+        print(f"[{finished}/{remaining}] brief {entry['row']} ({entry['type']}): {status}", file=sys.stderr)
+        for message in entry["errors"]:
+            print(f"    {message}", file=sys.stderr)
+
+    try:
+        summary = run_batch(
+            requests, keys, project, args.api_key, checkpoint, concurrency=args.concurrency,
+            text_model=args.text_model, image_model=args.image_model, use_cache=not args.no_cache, progress=progress
+        )
+    except KeyboardInterrupt:
+        sys.exit(f"\nInterrupted; run the same command again to resume from {checkpoint_path}")
+
+    print(f"{summary[DONE]} done, {summary[PARTIAL]} partial, {summary[FAILED]} failed, "
+          f"{summary['skipped']} already done earlier; {summary['assets']} assets saved")
+    if summary[PARTIAL] or summary[FAILED]:
+        print("Run the same command again to retry the failed briefs and missing variants", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
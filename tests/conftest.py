@@ -0,0 +1,58 @@
+import pytest
+
+from utils.storage import storage
+from utils.blob_store import blob_store
+from utils.search_index import search_index
+from utils.image_hash import image_hash
+from utils.history_log import history_log
+from utils.prompt_index import prompt_index
+from utils.renditions import renditions
+from utils.content_generation import response_cache
+from utils.job_queue import job_queue
+
+# Module-level singletons built from the data directory on first use
+SINGLETONS = (
+    (storage, "_storage"),
+    (blob_store, "_blob_store"),
+    (search_index, "_search_index"),
+    (image_hash, "_image_hash_index"),
+    (history_log, "_history_log"),
+    (prompt_index, "_prompt_index"),
+    (renditions, "_rendition_cache"),
+    (response_cache, "_response_cache"),
+    (job_queue, "_job_queue"),
+)
+
+
+def _use_data_dir(monkeypatch, path):
+    monkeypatch.setenv("CREATIVEFLOW_DATA_DIR", str(path))
+    for module, name in SINGLETONS:
+        monkeypatch.setattr(module, name, None)
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """
+    Point CREATIVEFLOW_DATA_DIR at a fresh directory and drop the process-wide stores
+
+    Returns:
+        pathlib.Path: The data directory
+    """
+    path = tmp_path / "data"
+    _use_data_dir(monkeypatch, path)
+    return path
+
+
+@pytest.fixture
+def new_data_dir(tmp_path, monkeypatch):
+    """
+    Switch to another empty data directory mid-test, e.g. to import into a fresh install
+
+    Returns:
+        callable: Takes a directory name and returns its path
+    """
+    def switch(name):
+        path = tmp_path / name
+        _use_data_dir(monkeypatch, path)
+        return path
+    return switch
@@ -0,0 +1,31 @@
+import pytest
+from streamlit import config, logger
+from streamlit.testing.v1 import AppTest
+
+from utils.content_generation import content_generation
+from utils.content_generation.content_generation import GenerationError
+
+APP_PATH = "/root/package/app.py"
+
+
+@pytest.fixture(autouse=True)
+def quiet_streamlit():
+    config.set_option("logger.level", "error")
+    logger.set_log_level("error")
+
+
+def test_streaming_error_is_shown_after_the_placeholder_is_cleared(monkeypatch):
+    def failing_stream(api_key, prompt, model, use_cache=True):
+        yield from ()
+        raise GenerationError("Error code: 401 - invalid api key", status_code=401)
+
+    monkeypatch.setattr(content_generation, "stream_text", failing_stream)
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.session_state["api_key"] = "bad-key"
+    at.run()
+
+    submit = next(b for b in at.button if b.label == "Generate Content")
+    submit.click().run()
+
+    assert not at.exception
+    assert [e.value for e in at.error] == ["An error occurred: Error code: 401 - invalid api key"]
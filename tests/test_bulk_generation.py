@@ -0,0 +1,132 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from utils.bulk_generation import bulk_generation
+from utils.bulk_generation.bulk_generation import (
+    DONE, FAILED, PARTIAL, Checkpoint, brief_keys, get_or_create_project, prepare_brief, run_batch
+)
+from utils.storage import storage
+from utils.storage.storage import get_storage, lock_data_dir
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """
+    Replace text generation with a fake that answers every variant of a brief
+
+    Set api["fail"] to a set of product names whose briefs fail completely, and
+    api["short"] to {product name: variants to leave out}.
+
+    Returns:
+        dict: Settings plus "calls", a (product, count, use_cache) tuple per request
+    """
+    state = {"fail": set(), "short": {}, "calls": []}
+
+    def fake_request_text_variants(api_key, prompt, count, model, use_cache=True):
+        product = next(name for name in ("Kite", "Lamp", "Mug") if name in prompt)
+        state["calls"].append((product, count, use_cache))
+        if product in state["fail"]:
+            return [], [RuntimeError("Error code: 500")]
+        made = count - state["short"].get(product, 0)
+        return [f"{product} copy {len(state['calls'])}.{i}" for i in range(made)], \
+            [RuntimeError("Error code: 503")] * (count - made)
+
+    monkeypatch.setattr(bulk_generation, "request_text_variants", fake_request_text_variants)
+    return state
+
+
+def _briefs(variants=1):
+    briefs = [{"type": "Marketing Copy", "product_name": name, "variants": variants} for name in ("Kite", "Lamp", "Mug")]
+    requests = [prepare_brief(brief, row, source_name="briefs.csv") for row, brief in enumerate(briefs, 1)]
+    return requests, brief_keys(briefs)
+
+
+def _run(tmp_path, requests, keys):
+    project = get_or_create_project("Spring Launch", create=True)
+    checkpoint = Checkpoint(str(tmp_path / "briefs.csv.checkpoint.jsonl"))
+    return run_batch(requests, keys, project, "key", checkpoint, concurrency=2), checkpoint
+
+
+def test_resume_skips_done_briefs_and_retries_failed_ones(tmp_path, api):
+    requests, keys = _briefs()
+    api["fail"] = {"Lamp"}
+
+    summary, checkpoint = _run(tmp_path, requests, keys)
+    assert (summary[DONE], summary[FAILED], summary["assets"]) == (2, 1, 2)
+    assert checkpoint.entries[keys[1]]["errors"] == ["Error code: 500"]
+
+    api["fail"], api["calls"] = set(), []
+    summary, checkpoint = _run(tmp_path, requests, keys)
+
+    assert (summary["skipped"], summary[DONE], summary[FAILED], summary["assets"]) == (2, 1, 0, 1)
+    assert api["calls"] == [("Lamp", 1, True)]
+    assert all(checkpoint.is_done(key) for key in keys)
+    assert get_storage().count_assets() == 3
+
+
+def test_partial_briefs_generate_only_their_missing_variants(tmp_path, api):
+    requests, keys = _briefs(variants=3)
+    api["short"] = {"Mug": 2}
+
+    summary, checkpoint = _run(tmp_path, requests, keys)
+    first_ids = checkpoint.entries[keys[2]]["asset_ids"]
+    assert (summary[DONE], summary[PARTIAL], summary["assets"]) == (2, 1, 7)
+    assert (checkpoint.entries[keys[2]]["state"], len(first_ids)) == (PARTIAL, 1)
+    assert not checkpoint.is_done(keys[2])
+
+    api["short"], api["calls"] = {}, []
+    summary, checkpoint = _run(tmp_path, requests, keys)
+
+    entry = checkpoint.entries[keys[2]]
+    # Without the cache, which would return the variant that was already saved
+    assert api["calls"] == [("Mug", 2, False)]
+    assert (summary["skipped"], summary[DONE], summary["assets"]) == (2, 1, 2)
+    assert (entry["state"], entry["asset_ids"][:1], len(set(entry["asset_ids"]))) == (DONE, first_ids, 3)
+    assert get_storage().count_assets() == 9
+
+
+def test_checkpoint_ignores_a_torn_last_line(tmp_path):
+    path = tmp_path / "briefs.csv.checkpoint.jsonl"
+    done = {"key": "a", "state": DONE, "asset_ids": ["x"]}
+    path.write_text(json.dumps(done) + "\n" + '{"key": "b", "sta', encoding="utf-8")
+
+    checkpoint = Checkpoint(str(path))
+    checkpoint.record({"key": "c", "state": FAILED, "asset_ids": []})
+
+    assert checkpoint.is_done("a") and not checkpoint.is_done("b")
+    assert sorted(Checkpoint(str(path)).entries) == ["a", "c"]
+
+
+@pytest.fixture
+def unlocked(monkeypatch):
+    # lock_data_dir keeps its lock for the life of the process; give this test its own
+    monkeypatch.setattr(storage, "_data_dir_lock", None)
+    yield
+    if storage._data_dir_lock is not None:
+        storage._data_dir_lock.close()
+
+
+def test_data_dir_lock_excludes_other_processes(data_dir, unlocked):
+    holder = subprocess.Popen(
+        [sys.executable, "-c",
+         "import sys\n"
+         "from utils.storage.storage import lock_data_dir\n"
+         "print(lock_data_dir(), flush=True)\n"
+         "sys.stdin.read()\n"],
+        cwd=REPO_ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        assert holder.stdout.readline().strip() == "True"
+        assert lock_data_dir() is False
+    finally:
+        holder.communicate("")
+
+    # The operating system released the lock when the holder exited
+    assert lock_data_dir() is True
+    assert lock_data_dir() is True
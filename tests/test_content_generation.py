@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from utils.content_generation import content_generation
+from utils.content_generation.content_generation import (
+    DEFAULT_IMAGE_MODEL, GenerationError, request_image_variants
+)
+
+SINGLE_IMAGE_MODEL = "black-forest-labs/FLUX.1-schnell"
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """
+    Replace request_images with a fake driven by the returned dict
+
+    Set calls["batch"] or calls["single"] to an exception to make those requests fail.
+
+    Returns:
+        dict: Settings plus "log", the n of every request in call order
+    """
+    state = {"batch": None, "single": None, "log": []}
+    lock = threading.Lock()
+
+    def fake_request_images(api_key, prompt, model, width=1024, height=1024, n=1, seed=None):
+        with lock:
+            state["log"].append(n)
+        error = state["batch"] if n > 1 else state["single"]
+        if error is not None:
+            raise error
+        return [f"digest-{seed}-{i}" for i in range(n)]
+
+    monkeypatch.setattr(content_generation, "request_images", fake_request_images)
+    return state
+
+
+def test_batch_models_use_one_request(calls):
+    digests, errors = request_image_variants("key", "A red kite", 3, DEFAULT_IMAGE_MODEL)
+
+    assert (len(digests), errors) == (3, [])
+    assert calls["log"] == [3]
+
+
+def test_other_models_use_parallel_single_requests(calls):
+    digests, errors = request_image_variants("key", "A red kite", 3, SINGLE_IMAGE_MODEL)
+
+    assert (len(set(digests)), errors) == (3, [])
+    assert calls["log"] == [1, 1, 1]
+
+
+def test_failed_batch_falls_back_to_single_requests(calls):
+    calls["batch"] = GenerationError("Error: 503", status_code=503)
+
+    digests, errors = request_image_variants("key", "A red kite", 3, DEFAULT_IMAGE_MODEL)
+
+    assert (len(set(digests)), errors) == (3, [])
+    assert calls["log"] == [3, 1, 1, 1]
+
+
+def test_batch_error_is_kept_when_the_fallback_fails_too(calls):
+    batch_error = calls["batch"] = GenerationError("Error: 500", status_code=500)
+    single_error = calls["single"] = GenerationError("Error: 500 again", status_code=500)
+
+    digests, errors = request_image_variants("key", "A red kite", 2, DEFAULT_IMAGE_MODEL)
+
+    assert digests == []
+    assert errors == [batch_error, single_error, single_error]
+
+
+def test_rate_limited_batch_does_not_fall_back(calls):
+    batch_error = calls["batch"] = GenerationError("Error: 429", status_code=429, retry_after=5)
+
+    digests, errors = request_image_variants("key", "A red kite", 3, DEFAULT_IMAGE_MODEL)
+
+    assert (digests, errors) == ([], [batch_error])
+    assert calls["log"] == [3]
@@ -0,0 +1,178 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.storage.storage import DATETIME_FORMAT
+from utils.history_log.history_log import INDEX_INTERVAL, MANIFEST_FILENAME, HistoryLog, _encode
+
+# Recent enough that reopened segments are within the default age limit
+START = datetime.now().replace(second=0, microsecond=0) - timedelta(days=1)
+
+
+def _item(i):
+    return {"timestamp": START + timedelta(minutes=i), "project_id": f"p{i % 3}", "project_name": f"Project {i % 3}",
+            "asset_id": f"a{i}", "asset_type": "image" if i % 2 else "text", "description": f"Asset {i} ✓"}
+
+
+def _ids(items):
+    return [item["asset_id"] for item in items]
+
+
+def _segment_paths(root):
+    return sorted(os.path.join(root, n) for n in os.listdir(root) if n.endswith(".jsonl") and n != MANIFEST_FILENAME)
+
+
+def _line_counts(root):
+    counts = []
+    for path in _segment_paths(root):
+        with open(path, "rb") as f:
+            counts.append(sum(1 for _ in f))
+    return counts
+
+
+def _fill(root, count, max_segment_bytes=8 * 1024):
+    log = HistoryLog(str(root), max_segment_bytes=max_segment_bytes, buffer_size=10)
+    for i in range(count):
+        log.append(_item(i))
+    return log
+
+
+def test_segments_rotate_by_size_and_are_listed_in_the_manifest(tmp_path):
+    log = _fill(tmp_path, 300)
+
+    paths = _segment_paths(tmp_path)
+    with open(tmp_path / MANIFEST_FILENAME, encoding="utf-8") as f:
+        manifest = [json.loads(line) for line in f]
+    assert len(paths) > 2
+    assert [entry["name"] for entry in manifest] == [os.path.basename(p) for p in paths[:-1]]
+    assert sum(entry["count"] for entry in manifest) < 300
+    assert all(os.path.getsize(p) <= 8 * 1024 for p in paths)
+    assert log.count() == 300
+    assert _ids(log.read_range()) == [f"a{i}" for i in range(300)]
+
+
+def test_segments_rotate_by_age(tmp_path, monkeypatch):
+    log = HistoryLog(str(tmp_path), max_segment_age=60)
+    clock = [1_000_000.0]
+    monkeypatch.setattr("utils.history_log.history_log.time.time", lambda: clock[0])
+    for i in range(4):
+        log.append(_item(i))
+        clock[0] += 45
+
+    # The first segment is 90 s old when the third entry arrives
+    assert _line_counts(tmp_path) == [2, 2]
+
+
+def test_segment_age_counts_from_its_first_entry_across_restarts(tmp_path):
+    _fill(tmp_path, 3, max_segment_bytes=1024 * 1024)
+
+    # START is a day ago, so the reopened segment is past a one-hour limit
+    log = HistoryLog(str(tmp_path), max_segment_age=3600)
+    log.append(_item(3))
+
+    assert _line_counts(tmp_path) == [3, 1]
+
+
+@pytest.mark.parametrize("start, end", [
+    (None, None), (0, None), (1, 2), (63, 65), (64, 64), (100, 250), (129, None), (None, 7), (299, 400), (-5, 0),
+])
+def test_read_range_matches_a_full_scan(tmp_path, start, end):
+    log = _fill(tmp_path, 300)
+    start_time = None if start is None else START + timedelta(minutes=start)
+    end_time = None if end is None else START + timedelta(minutes=end)
+
+    expected = [
+        f"a{i}" for i in range(300)
+        if (start is None or i >= start) and (end is None or i < end)
+    ]
+    assert _ids(log.read_range(start_time, end_time)) == expected
+
+
+def test_seek_index_skips_earlier_entries(tmp_path):
+    log = _fill(tmp_path, 200, max_segment_bytes=1024 * 1024)
+    segment = log._segments[-1]
+
+    assert segment.index_times == [START + timedelta(minutes=i) for i in range(0, 200, INDEX_INTERVAL)]
+    assert segment.seek_offset(None) == 0
+    assert segment.seek_offset(START + timedelta(minutes=64)) == 0
+    assert segment.seek_offset(START + timedelta(minutes=65)) == sum(len(_encode(_item(i))) for i in range(64))
+
+
+def test_recent_reads_past_the_ring_buffer(tmp_path):
+    log = _fill(tmp_path, 50)
+
+    assert _ids(log.recent(3)) == ["a49", "a48", "a47"]
+    assert _ids(log.recent(25)) == [f"a{i}" for i in range(49, 24, -1)]
+
+
+def test_restart_keeps_counts_buffer_and_numbering(tmp_path):
+    _fill(tmp_path, 300)
+    segments_before = _segment_paths(tmp_path)
+
+    log = HistoryLog(str(tmp_path), max_segment_bytes=8 * 1024, buffer_size=10)
+    for i in range(300, 320):
+        log.append(_item(i))
+
+    assert log.count() == 320
+    assert _ids(log.recent(3)) == ["a319", "a318", "a317"]
+    assert _ids(log.read_range()) == [f"a{i}" for i in range(320)]
+    # Appends continue the active segment instead of starting a new one
+    assert _segment_paths(tmp_path)[:len(segments_before)] == segments_before
+    assert len(_segment_paths(tmp_path)) - len(segments_before) <= 1
+
+
+def test_torn_line_is_dropped_on_restart(tmp_path):
+    _fill(tmp_path, 100, max_segment_bytes=1024 * 1024)
+    path = _segment_paths(tmp_path)[-1]
+    size = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(_encode(_item(100))[:25])
+
+    log = HistoryLog(str(tmp_path), max_segment_bytes=1024 * 1024)
+    assert os.path.getsize(path) == size
+    assert log.count() == 100
+
+    log.append(_item(101))
+    assert _ids(log.read_range(START + timedelta(minutes=99))) == ["a99", "a101"]
+    assert _ids(HistoryLog(str(tmp_path)).read_range(START + timedelta(minutes=99))) == ["a99", "a101"]
+
+
+def test_seek_index_is_repaired_after_a_torn_write(tmp_path):
+    # The crash hit the 129th entry, which gets a seek index record, and the index record itself
+    log = _fill(tmp_path, 2 * INDEX_INTERVAL, max_segment_bytes=1024 * 1024)
+    segment = log._segments[-1]
+    line = _encode(_item(500))
+    with open(segment.path, "ab") as f:
+        f.write(line[:-10])
+    with open(segment.index_path, "a", encoding="utf-8") as f:
+        f.write(f"{_item(500)['timestamp'].strftime(DATETIME_FORMAT)}\t{segment.size}\n")
+        f.write("2024-05-01 1")
+
+    log = HistoryLog(str(tmp_path), max_segment_bytes=1024 * 1024)
+    segment = log._segments[-1]
+    assert segment.index_offsets == [0, sum(len(_encode(_item(i))) for i in range(INDEX_INTERVAL))]
+    assert log.count() == 2 * INDEX_INTERVAL
+
+    for i in range(2 * INDEX_INTERVAL, 3 * INDEX_INTERVAL + 5):
+        log.append(_item(i))
+    reopened = HistoryLog(str(tmp_path), max_segment_bytes=1024 * 1024)
+    for log in (log, reopened):
+        segment = log._segments[-1]
+        assert segment.index_times == [START + timedelta(minutes=i) for i in range(0, 3 * INDEX_INTERVAL + 5, INDEX_INTERVAL)]
+        for start in range(0, 3 * INDEX_INTERVAL + 5, 7):
+            assert _ids(log.read_range(START + timedelta(minutes=start))) == [
+                f"a{i}" for i in range(start, 3 * INDEX_INTERVAL + 5)
+            ]
+
+
+def test_clear_removes_every_segment(tmp_path):
+    log = _fill(tmp_path, 300)
+    log.clear()
+
+    assert os.listdir(tmp_path) == []
+    assert log.count() == 0
+    assert log.recent() == []
+    log.append(_item(0))
+    assert _ids(log.read_range()) == ["a0"]
@@ -0,0 +1,231 @@
+import io
+import random
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from utils.blob_store.blob_store import get_blob_store
+from utils.image_hash.image_hash import (
+    HASH_BITS, HASH_FILENAME, HASH_VERSION, ImageHashIndex, _near_pairs, _to_signed, compute_dhash, get_image_hash_index
+)
+from utils.storage.storage import get_storage
+
+
+def _flip(value, bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+def _brute_force_pairs(hashes, max_distance):
+    return {
+        (i, j) for i in range(len(hashes)) for j in range(i + 1, len(hashes))
+        if bin(hashes[i] ^ hashes[j]).count("1") <= max_distance
+    }
+
+
+def _pair_set(left, right):
+    return {(min(a, b), max(a, b)) for a, b in zip(left.tolist(), right.tolist())}
+
+
+def _index(tmp_path, hashes, project_id="p1"):
+    index = ImageHashIndex(str(tmp_path / "hashes.db"))
+    index._store([
+        (asset_id, project_id, _to_signed(value), f"2024-01-01 00:00:{i:02d}")
+        for i, (asset_id, value) in enumerate(hashes.items())
+    ])
+    return index
+
+
+@pytest.mark.parametrize("max_distance", [0, 1, 3, 5, 8, 12])
+def test_near_pairs_matches_brute_force(max_distance):
+    rng = random.Random(max_distance)
+    hashes = []
+    for _ in range(60):
+        base = rng.getrandbits(HASH_BITS)
+        hashes.append(base)
+        # Near copies at and around the threshold, so both sides of it are exercised
+        for distance in (max_distance, max_distance + 1, rng.randrange(max_distance + 2)):
+            hashes.append(_flip(base, rng.sample(range(HASH_BITS), distance)))
+    hashes = list(dict.fromkeys(hashes))
+
+    left, right = _near_pairs(np.array(hashes, dtype=np.uint64), max_distance)
+
+    assert _pair_set(left, right) == _brute_force_pairs(hashes, max_distance)
+
+
+def test_near_pairs_of_a_large_run_sharing_every_chunk_but_one():
+    # 200 hashes differing only in their lowest byte all share the other chunks
+    hashes = [(0xABCDEF << 8) | i for i in range(200)]
+
+    left, right = _near_pairs(np.array(hashes, dtype=np.uint64), 3)
+
+    assert _pair_set(left, right) == _brute_force_pairs(hashes, 3)
+
+
+def test_near_pairs_without_hashes():
+    left, right = _near_pairs(np.array([], dtype=np.uint64), 5)
+
+    assert len(left) == len(right) == 0
+
+
+def test_grouping_threshold(tmp_path):
+    a = 0x0123456789ABCDEF
+    index = _index(tmp_path, {
+        "a": a,
+        "b": _flip(a, [0, 1, 2]),
+        "c": _flip(a, [60, 61, 62, 63]),
+        "far": ~a & ((1 << HASH_BITS) - 1),
+    })
+
+    assert index.duplicate_groups(max_distance=2) == []
+    assert [sorted(g) for g in index.duplicate_groups(max_distance=3)] == [["a", "b"]]
+    # b and c are 7 bits apart, but a links them
+    assert [sorted(g) for g in index.duplicate_groups(max_distance=4)] == [["a", "b", "c"]]
+
+
+def test_chains_group_transitively(tmp_path):
+    value = 0
+    hashes = {}
+    for i in range(10):
+        value = _flip(value, [i * 4, i * 4 + 1])
+        hashes[f"step{i}"] = value
+    index = _index(tmp_path, hashes)
+
+    # Neighbours are 2 bits apart, the ends 20 bits
+    assert [sorted(g) for g in index.duplicate_groups(max_distance=2)] == [sorted(hashes)]
+    assert index.duplicate_groups(max_distance=1) == []
+
+
+def test_identical_hashes_group_newest_first(tmp_path):
+    index = _index(tmp_path, {"first": 42, "second": 42, "third": 42, "other": 1 << 40})
+
+    assert index.duplicate_groups(max_distance=0) == [["third", "second", "first"]]
+
+
+def test_groups_are_ordered_by_creation_time_not_hash_order(tmp_path):
+    index = ImageHashIndex(str(tmp_path / "hashes.db"))
+    # e.g. an archive import hashing an old image after a newer one
+    index._store([
+        ("new", "p1", 42, "2024-03-01 09:00:00"),
+        ("old", "p1", 42, "2023-12-24 18:30:00"),
+        ("middle", "p1", 42, "2024-02-10 12:00:00"),
+    ])
+
+    assert index.duplicate_groups(max_distance=0) == [["new", "middle", "old"]]
+    assert ImageHashIndex(str(tmp_path / "hashes.db")).duplicate_groups(max_distance=0) == [["new", "middle", "old"]]
+
+
+def test_groups_are_limited_to_a_project(tmp_path):
+    index = _index(tmp_path, {"a": 7, "b": 7})
+    index._store([("c", "p2", 7, "2024-01-02 00:00:00"), ("d", "p2", 1 << 50, "2024-01-02 00:00:00")])
+
+    assert [sorted(g) for g in index.duplicate_groups(project_id="p1", max_distance=0)] == [["a", "b"]]
+    assert index.duplicate_groups(project_id="p2", max_distance=0) == []
+    assert [sorted(g) for g in index.duplicate_groups(max_distance=0)] == [["a", "b", "c"]]
+
+
+def test_groups_are_recomputed_after_new_hashes(tmp_path):
+    index = _index(tmp_path, {"a": 7})
+    assert index.duplicate_groups(max_distance=0) == []
+
+    index._store([("b", "p1", 7, "2024-01-02 00:00:00")])
+
+    assert index.duplicate_groups(max_distance=0) == [["b", "a"]]
+
+
+def test_similar_orders_by_distance(tmp_path):
+    a = 0xFFFF0000FFFF0000
+    index = _index(tmp_path, {
+        "query": a,
+        "two": _flip(a, [1, 2]),
+        "one": _flip(a, [5]),
+        "same": a,
+        "far": _flip(a, range(20)),
+    })
+
+    assert index.similar("query", max_distance=12) == [("same", 0), ("one", 1), ("two", 2)]
+    assert index.similar("query", max_distance=12, limit=1) == [("same", 0)]
+    assert index.similar("missing") == []
+
+
+def test_hashes_survive_a_restart(tmp_path):
+    _index(tmp_path, {"a": (1 << 63) | 5, "b": (1 << 63) | 7})
+
+    reopened = ImageHashIndex(str(tmp_path / "hashes.db"))
+
+    assert reopened.similar("a", max_distance=1) == [("b", 1)]
+
+
+def _picture(size, fmt="PNG"):
+    image = Image.new("RGB", (256, 256), "white")
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((30, 40, 180, 200), fill="navy")
+    draw.rectangle((120, 20, 240, 120), fill="orange")
+    buffer = io.BytesIO()
+    image.resize(size).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def test_dhash_is_stable_across_resizing_and_reencoding():
+    original = compute_dhash(io.BytesIO(_picture((256, 256))))
+    resized = compute_dhash(io.BytesIO(_picture((512, 512), "JPEG")))
+    other = Image.new("RGB", (256, 256), "white")
+    ImageDraw.Draw(other).rectangle((0, 128, 256, 256), fill="black")
+    buffer = io.BytesIO()
+    other.save(buffer, "PNG")
+
+    assert bin(original ^ resized).count("1") <= 3
+    assert bin(original ^ compute_dhash(buffer)).count("1") > 12
+
+
+def test_backfill_hashes_stored_images():
+    blob_store = get_blob_store()
+    storage = get_storage()
+    storage.create_project({"id": "p1", "name": "P", "description": "", "brand_guidelines": "",
+                            "target_audience": "", "created_at": datetime(2024, 1, 1)})
+    storage.add_assets([
+        {"id": "small", "project_id": "p1", "type": "image", "content": blob_store.put(_picture((256, 256))),
+         "description": "", "created_at": datetime(2024, 1, 2)},
+        {"id": "large", "project_id": "p1", "type": "image", "content": blob_store.put(_picture((600, 600), "JPEG")),
+         "description": "", "created_at": datetime(2024, 1, 3)},
+        {"id": "caption", "project_id": "p1", "type": "text", "content": "not an image",
+         "description": "", "created_at": datetime(2024, 1, 4)},
+    ])
+
+    index = get_image_hash_index()
+
+    assert index.size() == 2
+    assert index.duplicate_groups(project_id="p1") == [["large", "small"]]
+
+
+def test_backfill_adds_creation_times_to_hashes_from_earlier_versions(data_dir):
+    blob_store = get_blob_store()
+    storage = get_storage()
+    storage.create_project({"id": "p1", "name": "P", "description": "", "brand_guidelines": "",
+                            "target_audience": "", "created_at": datetime(2024, 1, 1)})
+    newer = blob_store.put(_picture((256, 256)))
+    older = blob_store.put(_picture((300, 300)))
+    storage.add_assets([
+        {"id": "newer", "project_id": "p1", "type": "image", "content": newer,
+         "description": "", "created_at": datetime(2024, 5, 1)},
+        {"id": "older", "project_id": "p1", "type": "image", "content": older,
+         "description": "", "created_at": datetime(2024, 1, 2)},
+    ])
+    data_dir.mkdir(parents=True, exist_ok=True)
+    with sqlite3.connect(data_dir / HASH_FILENAME) as conn:
+        conn.execute("CREATE TABLE image_hash (asset_id TEXT PRIMARY KEY, project_id TEXT NOT NULL, hash INTEGER)")
+        conn.executemany("INSERT INTO image_hash VALUES (?, ?, ?)", [
+            ("newer", "p1", _to_signed(compute_dhash(blob_store.open(newer)))),
+            ("older", "p1", _to_signed(compute_dhash(blob_store.open(older)))),
+        ])
+        conn.execute(f"PRAGMA user_version = {HASH_VERSION}")
+    conn.close()
+
+    index = get_image_hash_index()
+
+    assert index.missing_created_at() == 0
+    assert index.duplicate_groups(project_id="p1") == [["newer", "older"]]
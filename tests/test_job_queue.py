@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from utils.job_queue import job_queue
+from utils.job_queue.job_queue import DONE, FAILED, RUNNING, JobQueue, job_owner
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """
+    Replace the job handlers with fakes that echo the prompt
+
+    A job whose params contain "block" waits until handlers["release"] is set.
+
+    Returns:
+        dict: "release" event and "keys", the API key each job ran with
+    """
+    state = {"release": threading.Event(), "keys": []}
+
+    def fake_handler(api_key, params):
+        state["keys"].append(api_key)
+        if params.get("block"):
+            state["release"].wait(10)
+        if params.get("fail"):
+            return [], [RuntimeError("Error code: 500")]
+        return [f"{params['prompt']} result"], []
+
+    monkeypatch.setitem(job_queue.JOB_HANDLERS, "text", fake_handler)
+    monkeypatch.setitem(job_queue.JOB_HANDLERS, "image", fake_handler)
+    return state
+
+
+@pytest.fixture
+def queue(tmp_path, handlers):
+    queue = JobQueue(str(tmp_path / "jobs.db"), workers=2)
+    yield queue
+    handlers["release"].set()
+    queue._executor.shutdown(wait=True)
+
+
+def _wait(queue):
+    queue._executor.shutdown(wait=True)
+
+
+def test_jobs_run_and_store_their_results(queue, handlers):
+    done_id = queue.submit("text", {"prompt": "Tagline"}, "key-a")
+    failed_id = queue.submit("image", {"prompt": "Kite", "fail": True}, "key-a")
+    _wait(queue)
+
+    done, failed = queue.get(done_id), queue.get(failed_id)
+    assert (done["state"], done["result"], done["error"]) == (DONE, {"variants": ["Tagline result"]}, None)
+    assert (failed["state"], failed["result"], failed["error"]) == (FAILED, None, "Error code: 500")
+    assert handlers["keys"] == ["key-a", "key-a"]
+    assert queue._api_keys == {}
+
+
+def test_jobs_are_listed_only_to_their_owner(queue):
+    own_ids = [queue.submit("text", {"prompt": f"Mine {i}"}, "key-a") for i in range(3)]
+    other_id = queue.submit("text", {"prompt": "Theirs"}, "key-b")
+    _wait(queue)
+
+    assert [job["id"] for job in queue.list_jobs(job_owner("key-a"))] == own_ids[::-1]
+    assert [job["id"] for job in queue.list_jobs(job_owner("key-b"))] == [other_id]
+    assert queue.list_jobs(job_owner("key-c")) == []
+    assert len(queue.list_jobs(job_owner("key-a"), limit=2)) == 2
+
+
+def test_api_keys_are_not_written_to_disk(tmp_path, queue):
+    queue.submit("text", {"prompt": "Tagline"}, "secret-key-123")
+    _wait(queue)
+
+    for path in tmp_path.iterdir():
+        assert b"secret-key-123" not in path.read_bytes()
+
+
+def test_project_filter_and_dismissed_jobs(queue):
+    owner = job_owner("key-a")
+    first = queue.submit("text", {"prompt": "One"}, "key-a", project_id="p1")
+    second = queue.submit("text", {"prompt": "Two"}, "key-a", project_id="p2")
+    third = queue.submit("text", {"prompt": "Three"}, "key-a", project_id="p1")
+    _wait(queue)
+
+    assert [job["id"] for job in queue.list_jobs(owner, project_id="p1")] == [third, first]
+    assert [job["id"] for job in queue.list_jobs(owner, project_id="p2")] == [second]
+
+    queue.dismiss(third)
+    assert [job["id"] for job in queue.list_jobs(owner, project_id="p1")] == [first]
+    assert [job["id"] for job in queue.list_jobs(owner, project_id="p1", include_dismissed=True)] == [third, first]
+
+
+def test_restart_marks_pending_jobs_failed(tmp_path, queue, handlers):
+    owner = job_owner("key-a")
+    finished = queue.submit("text", {"prompt": "Done"}, "key-a")
+    blocked = [queue.submit("text", {"prompt": f"Slow {i}", "block": True}, "key-a") for i in range(3)]
+    while queue.get(finished)["state"] != DONE or queue.count_active(owner) != 3:
+        time.sleep(0.01)
+    assert {queue.get(job_id)["state"] for job_id in blocked} >= {RUNNING}
+
+    # A new process opens the same database while the old workers are still busy
+    restarted = JobQueue(str(tmp_path / "jobs.db"), workers=1)
+
+    assert restarted.get(finished)["state"] == DONE
+    for job_id in blocked:
+        job = restarted.get(job_id)
+        assert (job["state"], job["error"]) == (FAILED, "Interrupted by an application restart")
+    assert restarted.count_active(owner) == 0
+    assert len(restarted.list_jobs(owner)) == 4
+    restarted._executor.shutdown(wait=True)
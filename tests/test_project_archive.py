@@ -0,0 +1,194 @@
+import io
+import json
+import shutil
+from datetime import datetime
+
+import pytest
+from PIL import Image
+
+from utils.storage.storage import get_storage
+from utils.blob_store.blob_store import get_blob_store
+from utils.project_management import project_archive
+from utils.project_management.project_archive import (
+    _JSONStream, _iter_document, export_project_archive, import_project_archive
+)
+from utils.project_management.project_management import export_project
+
+DOCUMENT = {
+    "id": "p1",
+    "name": "Spring \"Launch\" ☀",
+    "description": "Line one\nline two",
+    "assets": [
+        {"id": "a1", "type": "text", "content": "x" * 50, "tags": [1, 2.5, None, True]},
+        {"id": "a2", "type": "text", "content": "{not: [json]}", "nested": {"a": {"b": []}}},
+        {"id": "a3", "type": "text", "content": ""},
+    ],
+    "target_audience": "after the assets",
+}
+
+
+def _png(color, size=(64, 64)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _make_project(name="Spring Launch"):
+    storage = get_storage()
+    project = {"id": "project-1", "name": name, "description": "Launch assets", "brand_guidelines": "Bold",
+               "target_audience": "Runners", "created_at": datetime(2024, 3, 1, 9, 30)}
+    storage.create_project(project)
+    digest = get_blob_store().put(_png("red"))
+    storage.add_assets([
+        {"id": "text-1", "project_id": project["id"], "type": "text", "content": "Run further.",
+         "description": "Tagline", "created_at": datetime(2024, 3, 1, 10, 0)},
+        {"id": "text-2", "project_id": project["id"], "type": "text", "content": "Ünïcode ✓\nsecond line",
+         "description": "Body copy", "created_at": datetime(2024, 3, 1, 10, 5)},
+        {"id": "image-1", "project_id": project["id"], "type": "image", "content": digest,
+         "description": "Hero", "created_at": datetime(2024, 3, 1, 10, 10)},
+    ])
+    return project
+
+
+def _asset_rows(project_id):
+    return sorted(
+        (asset["id"], asset["type"], asset["content"], asset["description"], asset["created_at"])
+        for asset in get_storage().get_assets(project_id=project_id)
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 1024 * 1024])
+def test_json_stream_reads_values_split_across_chunks(monkeypatch, chunk_size):
+    monkeypatch.setattr(project_archive, "READ_CHUNK_SIZE", chunk_size)
+    text = json.dumps(DOCUMENT, indent=2)
+
+    items = list(_iter_document(_JSONStream(io.StringIO(text))))
+
+    assert items[0] == ("project", {k: v for k, v in DOCUMENT.items() if k not in ("assets", "target_audience")})
+    assert items[1:] == [("asset", asset) for asset in DOCUMENT["assets"]]
+
+
+def test_json_stream_reads_archive_manifests(monkeypatch):
+    monkeypatch.setattr(project_archive, "READ_CHUNK_SIZE", 5)
+    manifest = {"format_version": 1, "project": {"id": "p1", "name": "Launch"}, "assets": []}
+
+    items = list(_iter_document(_JSONStream(io.StringIO(json.dumps(manifest)))))
+
+    assert items == [("project", {"format_version": 1, "id": "p1", "name": "Launch"})]
+
+
+def test_json_stream_numbers_at_chunk_boundaries_are_not_cut(monkeypatch):
+    monkeypatch.setattr(project_archive, "READ_CHUNK_SIZE", 4)
+    stream = _JSONStream(io.StringIO("[12345678, 9.875e3, -1]"))
+
+    assert list(stream.iter_array()) == [12345678, 9875.0, -1]
+
+
+@pytest.mark.parametrize("text", ['{"id": "p1", "assets": [{"id": "a1"', '{"id": "p1" "name": "x"}', '[]'])
+def test_json_stream_rejects_truncated_or_malformed_documents(monkeypatch, text):
+    monkeypatch.setattr(project_archive, "READ_CHUNK_SIZE", 3)
+
+    with pytest.raises(ValueError):
+        list(_iter_document(_JSONStream(io.StringIO(text))))
+
+
+def test_archive_round_trip_into_an_empty_data_dir(tmp_path, new_data_dir):
+    project = _make_project()
+    expected = _asset_rows(project["id"])
+    image_bytes = _png("red")
+    archive_path = tmp_path / "export.zip"
+    shutil.copy(export_project_archive(project["id"]), archive_path)
+
+    new_data_dir("restored")
+    summary = import_project_archive(str(archive_path))
+
+    assert summary["project_id"] == project["id"]
+    assert summary["new_project"] is True
+    assert (summary["total"], summary["imported"], summary["duplicates"]) == (3, 3, 0)
+    assert (summary["text"], summary["image"]) == (2, 1)
+    restored = get_storage().get_project(project["id"])
+    assert {k: restored[k] for k in project} == project
+    assert _asset_rows(project["id"]) == expected
+    with get_blob_store().open(get_storage().get_assets_by_ids(["image-1"])[0]["content"]) as blob:
+        assert blob[:] == image_bytes
+
+
+def test_reimporting_an_archive_skips_every_asset(tmp_path):
+    project = _make_project()
+    expected = _asset_rows(project["id"])
+    archive_path = tmp_path / "export.zip"
+    shutil.copy(export_project_archive(project["id"]), archive_path)
+
+    summary = import_project_archive(str(archive_path))
+
+    assert summary["new_project"] is False
+    assert (summary["total"], summary["imported"], summary["duplicates"]) == (3, 0, 3)
+    assert _asset_rows(project["id"]) == expected
+
+
+def test_reimport_adds_only_assets_missing_from_the_project(tmp_path):
+    project = _make_project()
+    archive_path = tmp_path / "export.zip"
+    shutil.copy(export_project_archive(project["id"]), archive_path)
+    get_storage().add_asset({"id": "text-3", "project_id": project["id"], "type": "text",
+                             "content": "Only here", "description": "", "created_at": datetime(2024, 3, 2)})
+    newer_path = tmp_path / "newer.zip"
+    shutil.copy(export_project_archive(project["id"]), newer_path)
+
+    # Drop text-3 again, then bring it back from the newer archive
+    get_storage().clear()
+    _make_project()
+    import_project_archive(str(archive_path))
+    summary = import_project_archive(str(newer_path))
+
+    assert (summary["imported"], summary["duplicates"]) == (1, 3)
+    assert [a["content"] for a in get_storage().get_assets(project_id=project["id"], asset_type="text")] == [
+        "Run further.", "Ünïcode ✓\nsecond line", "Only here"
+    ]
+
+
+def test_json_export_round_trip_moves_inline_images_into_the_blob_store(tmp_path, new_data_dir):
+    project = _make_project()
+    export_path = tmp_path / "export.json"
+    export_path.write_text(export_project(project["id"]), encoding="utf-8")
+
+    new_data_dir("restored")
+    summary = import_project_archive(str(export_path))
+    again = import_project_archive(str(export_path))
+
+    assert (summary["imported"], summary["duplicates"]) == (3, 0)
+    assert (again["imported"], again["duplicates"]) == (0, 3)
+    image = get_storage().get_assets(project_id=project["id"], asset_type="image")[0]
+    assert get_blob_store().exists(image["content"])
+    with get_blob_store().open(image["content"]) as blob:
+        assert blob[:] == _png("red")
+
+
+def test_duplicates_within_one_file_are_imported_once(tmp_path):
+    document = {"id": "p2", "name": "Dupes", "assets": [
+        {"id": "a1", "type": "text", "content": "Same copy"},
+        {"id": "a2", "type": "text", "content": "Same copy"},
+        {"id": "a3", "type": "image", "content": "https://example.com/a.png"},
+        {"id": "a4", "type": "image", "content": "https://example.com/a.png"},
+    ]}
+    path = tmp_path / "dupes.json"
+    path.write_text(json.dumps(document), encoding="utf-8")
+
+    summary = import_project_archive(str(path))
+
+    assert (summary["total"], summary["imported"], summary["duplicates"]) == (4, 2, 2)
+    assert get_storage().count_assets(project_id="p2") == 2
+
+
+def test_dry_run_writes_nothing(tmp_path, new_data_dir):
+    project = _make_project()
+    archive_path = tmp_path / "export.zip"
+    shutil.copy(export_project_archive(project["id"]), archive_path)
+
+    new_data_dir("dry")
+    summary = import_project_archive(str(archive_path), dry_run=True)
+
+    assert summary["dry_run"] is True
+    assert (summary["new_project"], summary["imported"]) == (True, 3)
+    assert get_storage().get_project(project["id"]) is None
+    assert get_storage().count_assets() == 0
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from utils.prompt_index.prompt_index import (
+    NUM_PERMUTATIONS, PromptIndex, lsh_layout, minhash, shingles
+)
+
+BRIEF = ("Write a playful Instagram caption for our new trail running shoe, highlighting the grippy sole, "
+         "the recycled upper and the launch discount for newsletter subscribers")
+
+
+def _jaccard(a, b):
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b)
+
+
+def _estimate(a, b):
+    return np.count_nonzero(minhash(a) == minhash(b)) / NUM_PERMUTATIONS
+
+
+def _variant(words, changed):
+    # Replace every changed-th word, spreading the edits over the whole text
+    return " ".join(f"other{i}" if changed and i % changed == 0 else word for i, word in enumerate(words))
+
+
+def test_shingles_ignore_case_punctuation_and_spacing():
+    assert shingles("Bold,  RED   shoes!\nFor runners") == shingles("bold red shoes for runners")
+    assert shingles("bold red shoes for runners") == {"bold red shoes", "red shoes for", "shoes for runners"}
+    assert shingles("Two words") == {"two words"}
+
+
+def test_signatures_are_stable():
+    signature = minhash(BRIEF)
+
+    assert signature.dtype == np.uint32
+    assert signature.shape == (NUM_PERMUTATIONS,)
+    assert np.array_equal(signature, minhash(BRIEF.upper()))
+
+
+@pytest.mark.parametrize("changed", [0, 40, 20, 10, 5, 3, 2, 1])
+def test_minhash_estimates_jaccard_similarity(changed):
+    words = [f"word{i}" for i in range(200)]
+    a, b = " ".join(words), _variant(words, changed)
+
+    assert abs(_estimate(a, b) - _jaccard(a, b)) <= 0.12
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.7, 0.8, 0.9])
+def test_lsh_layout_separates_at_the_threshold(threshold):
+    bands, rows = lsh_layout(threshold)
+
+    def candidate_probability(similarity):
+        return 1 - (1 - similarity ** rows) ** bands
+
+    assert bands * rows <= NUM_PERMUTATIONS
+    assert candidate_probability(min(1.0, threshold + 0.1)) > 0.9
+    assert candidate_probability(threshold - 0.3) < 0.1
+    # Misses weigh more than extra candidates, so the curve's midpoint sits below the threshold
+    assert candidate_probability(threshold) > 0.5
+
+
+@pytest.fixture
+def index(tmp_path):
+    return PromptIndex(str(tmp_path / "prompts.db"), threshold=0.8)
+
+
+def test_find_matches_reworded_prompts(index):
+    index.add("text", BRIEF, "model-a", ["Caption one"])
+
+    matches = index.find("text", BRIEF.replace(",", "").upper() + "!", "model-a")
+
+    assert [m["outputs"] for m in matches] == [["Caption one"]]
+    assert matches[0]["similarity"] == 1.0
+    assert matches[0]["prompt"] == BRIEF
+
+
+def test_find_ranks_by_similarity_and_drops_weak_matches(tmp_path):
+    words = [f"word{i}" for i in range(200)]
+    index = PromptIndex(str(tmp_path / "prompts.db"), threshold=0.5)
+    # Jaccard similarities of about 1.0, 0.88, 0.75 and 0.25
+    for changed in (0, 40, 20, 5):
+        index.add("text", _variant(words, changed), "model-a", [f"changed every {changed}"])
+
+    matches = index.find("text", " ".join(words), "model-a", limit=5)
+
+    assert [m["outputs"][0] for m in matches] == ["changed every 0", "changed every 40", "changed every 20"]
+    assert [m["similarity"] for m in matches] == sorted((m["similarity"] for m in matches), reverse=True)
+    assert len(index.find("text", " ".join(words), "model-a", limit=1)) == 1
+
+
+def test_find_is_limited_to_kind_and_model(index):
+    index.add("text", BRIEF, "model-a", ["Text from a"])
+    index.add("image", BRIEF, "model-a", ["digest"])
+    index.add("text", BRIEF, "model-b", ["Text from b"])
+
+    assert [m["outputs"] for m in index.find("text", BRIEF, "model-a")] == [["Text from a"]]
+    assert [m["outputs"] for m in index.find("image", BRIEF, "model-a")] == [["digest"]]
+    assert index.find("image", BRIEF, "model-b") == []
+
+
+def test_unrelated_prompts_do_not_match(index):
+    index.add("text", BRIEF, "model-a", ["Caption"])
+
+    assert index.find("text", "A formal LinkedIn announcement of our quarterly results", "model-a") == []
+
+
+def test_repeating_a_prompt_replaces_its_outputs(index):
+    index.add("text", BRIEF, "model-a", ["First"])
+    index.add("text", "  " + BRIEF.upper(), "model-a", ["Second"])
+    index.add("text", BRIEF, "model-a", [])
+
+    assert index.count() == 1
+    assert [m["outputs"] for m in index.find("text", BRIEF, "model-a")] == [["Second"]]
+
+
+def test_index_survives_a_restart(tmp_path, index):
+    index.add("text", BRIEF, "model-a", ["Caption"])
+
+    reopened = PromptIndex(str(tmp_path / "prompts.db"), threshold=0.8)
+
+    assert reopened.count() == 1
+    assert [m["outputs"] for m in reopened.find("text", BRIEF, "model-a")] == [["Caption"]]
+
+
+def test_clear(index):
+    index.add("text", BRIEF, "model-a", ["Caption"])
+    index.clear()
+
+    assert index.count() == 0
+    assert index.find("text", BRIEF, "model-a") == []
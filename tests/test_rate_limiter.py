@@ -0,0 +1,140 @@
+import pytest
+
+from utils.content_generation import rate_limiter
+from utils.content_generation.rate_limiter import (
+    BASE_RETRY_DELAY, MAX_RETRY_DELAY, AdaptiveLimiter, call_with_retry, classify_error
+)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """
+    Record retry delays instead of sleeping; jitter always picks its upper bound
+
+    Returns:
+        list: Seconds passed to time.sleep
+    """
+    delays = []
+    monkeypatch.setattr(rate_limiter.time, "sleep", delays.append)
+    monkeypatch.setattr(rate_limiter.random, "uniform", lambda low, high: high)
+    return delays
+
+
+def _failing(*errors, result="ok"):
+    remaining = list(errors)
+
+    def func():
+        if remaining:
+            raise remaining.pop(0)
+        return result
+    return func
+
+
+def test_classify_error():
+    assert classify_error(StatusError(429, retry_after=3)) == (True, 429, 3)
+    assert classify_error(StatusError(503)) == (True, 503, None)
+    assert classify_error(StatusError(401)) == (False, 401, None)
+    assert classify_error(ValueError("bad")) == (False, None, None)
+
+
+def test_throttling_halves_the_limit_and_successes_grow_it_back():
+    limiter = AdaptiveLimiter(max_concurrency=8)
+    for expected in (4, 2, 1, 1):
+        limiter.acquire()
+        limiter.release(success=False, throttled=True, retry_after=0)
+        assert limiter.limit == expected
+
+    limiter.acquire()
+    limiter.release()
+    assert limiter.limit == 2
+    limiter.acquire()
+    limiter.release()
+    assert limiter.limit == 2.5
+    assert (limiter.in_flight, limiter.counters["throttled"]) == (0, 4)
+
+
+def test_other_failures_leave_the_limit_unchanged():
+    limiter = AdaptiveLimiter(max_concurrency=8)
+    limiter.acquire()
+    limiter.release(success=False, throttled=True, retry_after=0)
+    limiter.acquire()
+    limiter.release(success=False)
+
+    assert limiter.limit == 4
+    assert limiter.blocked_until <= rate_limiter.time.monotonic()
+
+
+def test_limit_never_exceeds_max_concurrency():
+    limiter = AdaptiveLimiter(max_concurrency=3)
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release()
+
+    assert limiter.limit == 3
+
+
+def test_retry_after_pauses_every_caller(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: clock[0])
+    limiter = AdaptiveLimiter()
+    waits = []
+
+    def fake_wait(timeout=None):
+        waits.append(timeout)
+        clock[0] += timeout
+    monkeypatch.setattr(limiter._cond, "wait", fake_wait)
+
+    limiter.acquire()
+    limiter.release(success=False, throttled=True, retry_after=7)
+    assert limiter.state()["paused_for"] == 7
+
+    limiter.acquire()
+    assert waits == [7]
+    assert limiter.in_flight == 1
+
+
+def test_retries_back_off_exponentially_up_to_the_cap(sleeps):
+    errors = [StatusError(503) for _ in range(8)]
+
+    assert call_with_retry(_failing(*errors), max_retries=8) == "ok"
+    assert sleeps == [min(MAX_RETRY_DELAY, BASE_RETRY_DELAY * 2 ** attempt) for attempt in range(8)]
+    assert max(sleeps) == MAX_RETRY_DELAY
+
+
+def test_retries_wait_for_retry_after(sleeps):
+    assert call_with_retry(_failing(StatusError(429, retry_after=2))) == "ok"
+    assert sleeps == [2]
+
+
+def test_throttled_then_successful_call_adjusts_the_limit(sleeps):
+    limiter = AdaptiveLimiter(max_concurrency=8)
+
+    assert call_with_retry(_failing(StatusError(429, retry_after=0)), limiter) == "ok"
+    # Halved by the 429, then one additive step from the success
+    assert limiter.limit == 4.25
+    assert (limiter.counters["retries"], limiter.counters["throttled"]) == (1, 1)
+
+
+def test_failed_requests_do_not_raise_the_limit(sleeps):
+    limiter = AdaptiveLimiter(max_concurrency=8)
+    limiter.limit = 2.0
+
+    with pytest.raises(StatusError):
+        call_with_retry(_failing(StatusError(503), StatusError(503), StatusError(500)), limiter)
+
+    assert limiter.limit == 2.0
+    assert (limiter.counters["retries"], limiter.counters["failures"]) == (2, 1)
+
+
+def test_non_retryable_errors_are_raised_at_once(sleeps):
+    with pytest.raises(StatusError):
+        call_with_retry(_failing(StatusError(401)), max_retries=3)
+
+    assert sleeps == []
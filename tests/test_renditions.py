@@ -0,0 +1,95 @@
+import io
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from PIL import Image
+
+from utils.blob_store.blob_store import get_blob_store
+from utils.renditions.renditions import PLATFORM_RENDITIONS, PREVIEW_NAMES, RenditionCache, pick_preview
+
+
+class FakePool:
+    """Executor that records submitted renders and leaves their futures for the test to resolve"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, func, source_path, targets, image_format):
+        future = Future()
+        self.submitted.append(([name for name, _ in targets], future))
+        return future
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return RenditionCache(str(tmp_path / "renditions"), workers=1)
+
+
+@pytest.fixture
+def pool(cache, monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(cache, "_pool", lambda: pool)
+    return pool
+
+
+@pytest.fixture
+def digest():
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 600), "teal").save(buffer, "PNG")
+    return get_blob_store().put(buffer.getvalue())
+
+
+def test_pick_preview():
+    assert [pick_preview(w) for w in (100, 160, 161, 640, 5000)] == ["w160", "w160", "w320", "w640", "w1280"]
+
+
+def test_generate_writes_previews_without_upscaling(cache, digest):
+    sizes = cache.generate(digest, PREVIEW_NAMES + ["linkedin"])
+
+    assert sorted(sizes) == sorted(PREVIEW_NAMES + ["linkedin"])
+    with Image.open(cache.ready_path(digest, "w320")) as image:
+        assert image.size == (320, 240)
+    with Image.open(cache.ready_path(digest, "w1280")) as image:
+        assert image.size == (800, 600)
+    with Image.open(cache.path(digest, "linkedin")) as image:
+        assert image.size == PLATFORM_RENDITIONS["linkedin"]["size"]
+
+
+def test_missing_preview_queues_only_the_previews(cache, pool, digest):
+    assert cache.ready_path(digest, "w320") is None
+    assert cache.ready_path(digest, "w640") is None
+    assert cache.get(digest, "w160", render=False) is None
+
+    assert [names for names, _ in pool.submitted] == [PREVIEW_NAMES]
+
+
+def test_failed_renders_are_not_queued_again(cache, pool, digest):
+    cache.ready_path(digest, "w320")
+    pool.submitted[0][1].set_exception(OSError("cannot identify image file"))
+
+    assert cache.ready_path(digest, "w320") is None
+    assert len(pool.submitted) == 1
+
+    # Discarded with its blob, e.g. by garbage collection
+    cache.discard(digest)
+    cache.ready_path(digest, "w320")
+    assert len(pool.submitted) == 2
+
+
+def test_renders_lost_with_a_broken_pool_are_queued_again(cache, pool, digest):
+    cache.ready_path(digest, "w320")
+    pool.submitted[0][1].set_exception(BrokenProcessPool("A worker died"))
+
+    cache.ready_path(digest, "w320")
+
+    assert len(pool.submitted) == 2
+
+
+def test_get_keeps_recent_renditions_in_memory(cache, digest):
+    cache.max_bytes = 10 ** 9
+    data = cache.get(digest, "w160")
+
+    assert data[:4] == b"RIFF"
+    assert cache.get(digest, "w160") is data
+    assert cache._size == len(data)
@@ -0,0 +1,137 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils.content_generation import content_generation, response_cache
+from utils.content_generation.content_generation import GenerationError, request_text
+from utils.content_generation.response_cache import ResponseCache, cache_key, get_response_cache
+
+MESSAGES = [{"role": "user", "content": "Write a tagline for a trail running shoe"}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Freeze the cache's clock; advance it by assigning to clock["now"]
+
+    Returns:
+        dict: The current time under "now"
+    """
+    state = {"now": 1_000_000.0}
+    monkeypatch.setattr(response_cache.time, "time", lambda: state["now"])
+    return state
+
+
+def _disk_sum(cache):
+    return cache._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+
+def _disk_keys(cache):
+    return {row[0] for row in cache._conn.execute("SELECT key FROM responses")}
+
+
+def test_key_ignores_whitespace_but_not_parameters():
+    key = cache_key("model-a", MESSAGES, 1000, 0.7)
+    reflowed = [{"role": "user", "content": "  Write a tagline\n for a trail   running shoe "}]
+
+    assert cache_key("model-a", reflowed, 1000, 0.7) == key
+    assert cache_key("model-b", MESSAGES, 1000, 0.7) != key
+    assert cache_key("model-a", MESSAGES, 500, 0.7) != key
+    assert cache_key("model-a", MESSAGES, 1000, 0.9) != key
+    assert cache_key("model-a", MESSAGES, 1000, 0.7, variant=0) == key
+    assert len({cache_key("model-a", MESSAGES, 1000, 0.7, variant=i) for i in range(4)}) == 4
+
+
+def test_entries_expire_after_their_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.db"), ttl=60)
+    cache.put("default", "lives a minute")
+    cache.put("short", "lives ten seconds", ttl=10)
+
+    clock["now"] += 30
+    assert (cache.get("default"), cache.get("short")) == ("lives a minute", None)
+
+    # Evicted from memory, the disk tier must expire it as well
+    cache._memory.clear()
+    clock["now"] += 31
+    assert cache.get("default") is None
+    assert _disk_keys(cache) == set()
+    assert cache.stats()["disk_bytes"] == 0
+
+
+def test_disk_tier_evicts_least_recently_used_bytes(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_memory_bytes=0, max_disk_bytes=100)
+    for name in ("a", "b", "c"):
+        cache.put(name, name * 30)
+        clock["now"] += 1
+    cache.get("a")
+    clock["now"] += 1
+
+    cache.put("d", "d" * 30)
+
+    assert _disk_keys(cache) == {"a", "c", "d"}
+    assert cache.stats()["disk_bytes"] == _disk_sum(cache) == 90
+
+    cache.put("big", "x" * 80)
+    assert _disk_keys(cache) == {"big"}
+    assert cache.stats()["disk_bytes"] == _disk_sum(cache) == 80
+
+
+def test_memory_tier_is_bounded_and_falls_back_to_disk(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_memory_bytes=50)
+    cache.put("a", "a" * 30)
+    cache.put("b", "b" * 30)
+
+    assert list(cache._memory) == ["b"]
+    assert cache.get("a") == "a" * 30
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.get("a") == "a" * 30
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_running_disk_size_matches_the_table(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path, ttl=50, max_disk_bytes=500)
+    for i in range(40):
+        cache.put(f"k{i % 15}", "é" * (i % 7 + 1), ttl=None if i % 3 else 5)
+        clock["now"] += 2
+        if i % 5 == 0:
+            cache.get(f"k{i % 4}")
+        assert cache.stats()["disk_bytes"] == _disk_sum(cache)
+
+    assert ResponseCache(path).stats()["disk_bytes"] == _disk_sum(cache)
+    cache.clear()
+    assert cache.stats()["disk_bytes"] == 0
+
+
+def _fake_pool(content, finish_reason="stop"):
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=finish_reason)])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return SimpleNamespace(together=lambda api_key: client), calls
+
+
+def test_completions_are_cached_per_variant(monkeypatch):
+    pool, calls = _fake_pool("Run further.")
+    monkeypatch.setattr(content_generation, "get_client_pool", lambda: pool)
+
+    assert request_text("key", "Tagline please", "model-a") == "Run further."
+    assert request_text("key", "Tagline  please", "model-a") == "Run further."
+    assert request_text("key", "Tagline please", "model-a", variant=1) == "Run further."
+    assert len(calls) == 2
+
+
+def test_empty_completions_raise_and_are_not_cached(monkeypatch):
+    pool, calls = _fake_pool(None, finish_reason="content_filter")
+    monkeypatch.setattr(content_generation, "get_client_pool", lambda: pool)
+
+    for _ in range(2):
+        with pytest.raises(GenerationError, match="content_filter"):
+            request_text("key", "Tagline please", "model-a")
+
+    assert len(calls) == 2
+    assert get_response_cache().stats()["disk_entries"] == 0
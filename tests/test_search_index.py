@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pytest
+
+from utils.search_index.search_index import SearchIndex, build_match_query
+from utils.storage.storage import get_storage
+
+
+def _asset(asset_id, content, description="", project_id="p1", asset_type="text"):
+    return {"id": asset_id, "project_id": project_id, "type": asset_type, "content": content,
+            "description": description, "created_at": datetime(2024, 1, 1)}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    index.add_many([
+        _asset("a1", "Lace up for the longest run of your life", "Running shoe tagline"),
+        _asset("a2", "Our coffee is roasted in small batches", "Coffee story", project_id="p2"),
+        _asset("a3", "4f1c" * 16, "Runner on a mountain trail", asset_type="image"),
+    ], ["Write a tagline for a running shoe", None, "A runner at sunrise, photorealistic"])
+    return index
+
+
+def test_match_query_quotes_words_and_prefixes_the_last():
+    assert build_match_query("trail runn") == '"trail" "runn"*'
+    assert build_match_query('NEAR(a b) OR "x" -y') == '"NEAR" "a" "b" "OR" "x" "y"*'
+    assert build_match_query("  ?!  ") is None
+
+
+def test_search_stems_and_matches_prefixes(index):
+    assert sorted(r["asset_id"] for r in index.search("running")) == ["a1", "a3"]
+    assert [r["asset_id"] for r in index.search("roast")] == ["a2"]
+    assert [r["asset_id"] for r in index.search("moun")] == ["a3"]
+
+
+def test_search_highlights_matches(index):
+    result = index.search("coffee")[0]
+
+    assert result["content_highlight"] == "Our <mark>coffee</mark> is roasted in small batches"
+    assert result["description_highlight"] == "<mark>Coffee</mark> story"
+
+
+def test_image_content_is_not_indexed(index):
+    assert index.search("4f1c") == []
+    assert [r["asset_id"] for r in index.search("sunrise")] == ["a3"]
+
+
+def test_filters_and_counts(index):
+    assert [r["asset_id"] for r in index.search("run", asset_type="text")] == ["a1"]
+    assert index.search("coffee", project_id="p1") == []
+    assert index.count("run") == 2
+    assert index.count("run", project_id="p1", asset_type="image") == 1
+    assert index.count("") == 0
+    assert len(index.search("run", limit=1)) == 1
+    assert len(index.search("run", offset=1)) == 1
+
+
+def test_rebuild_from_storage(index):
+    storage = get_storage()
+    storage.create_project({"id": "p9", "name": "P", "description": "", "brand_guidelines": "",
+                            "target_audience": "", "created_at": datetime(2024, 1, 1)})
+    storage.add_assets([_asset(f"s{i}", f"stored copy number {i}", project_id="p9") for i in range(5)])
+
+    index.rebuild(storage)
+
+    assert index.size() == 5
+    assert index.count("stored") == 5
+    assert index.search("coffee") == []
+
+
+def test_highlights_escape_the_stored_text(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    index.add_many([
+        _asset("a1", 'Save <b>50%</b> on "trail" shoes & more <script>alert(1)</script>', "<img src=x> trail"),
+    ], ["trail <i>runners</i>"])
+
+    result = index.search("trail")[0]
+
+    assert result["content_highlight"] == (
+        "Save &lt;b&gt;50%&lt;/b&gt; on &quot;<mark>trail</mark>&quot; shoes &amp; more "
+        "&lt;script&gt;alert(1)&lt;/script&gt;"
+    )
+    assert result["description_highlight"] == "&lt;img src=x&gt; <mark>trail</mark>"
+    assert result["prompt_snippet"] == "<mark>trail</mark> &lt;i&gt;runners&lt;/i&gt;"
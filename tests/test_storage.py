@@ -0,0 +1,103 @@
+import itertools
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.storage.storage import IndexedStorage, SQLiteStorage
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def stores(tmp_path):
+    """
+    An IndexedStorage and the SQLiteStorage it wraps, filled with shuffled test data
+
+    Assets are added in random order with repeated timestamps, the way an
+    import of older assets lands after newer ones.
+
+    Returns:
+        tuple: (IndexedStorage, SQLiteStorage, path of the database)
+    """
+    path = str(tmp_path / "store.db")
+    backend = SQLiteStorage(path)
+    indexed = IndexedStorage(backend)
+    for i, name in enumerate(["Gamma", "Alpha", "Beta", "Alpha"]):
+        indexed.create_project({"id": f"p{i}", "name": name, "description": "", "brand_guidelines": "",
+                                "target_audience": "", "created_at": START + timedelta(days=(i * 5) % 3)})
+    rng = random.Random(7)
+    assets = [
+        {"id": f"a{i}", "project_id": f"p{rng.randrange(4)}", "type": rng.choice(["text", "image"]),
+         "content": f"content {i}", "description": "", "created_at": START + timedelta(hours=rng.randrange(20))}
+        for i in range(120)
+    ]
+    indexed.add_assets(assets[:40])
+    for asset in assets[40:80]:
+        indexed.add_asset(asset)
+    indexed.add_assets(assets[80:])
+    return indexed, backend, path
+
+
+FILTERS = list(itertools.product([None, "p0", "p1", "p3", "missing"], [None, "text", "image"]))
+
+
+@pytest.mark.parametrize("project_id, asset_type", FILTERS)
+def test_index_pages_match_the_backend(stores, project_id, asset_type):
+    indexed, backend, _ = stores
+    for newest_first in (False, True):
+        for offset, limit in [(0, None), (0, 7), (5, 7), (30, 50), (200, 10)]:
+            expected = backend.get_assets(project_id, asset_type, offset=offset, limit=limit, newest_first=newest_first)
+            actual = indexed.get_assets(project_id, asset_type, offset=offset, limit=limit, newest_first=newest_first)
+            assert [a["id"] for a in actual] == [a["id"] for a in expected]
+    assert indexed.count_assets(project_id, asset_type) == backend.count_assets(project_id, asset_type)
+
+
+@pytest.mark.parametrize("newest_first", [False, True])
+def test_excluded_ids_are_skipped_before_paging(stores, newest_first):
+    indexed, backend, _ = stores
+    everything = [a["id"] for a in backend.get_assets(newest_first=newest_first)]
+    excluded = set(everything[::3])
+    shown = [asset_id for asset_id in everything if asset_id not in excluded]
+
+    for offset, limit in [(0, None), (0, 10), (10, 10), (75, 10), (80, 10)]:
+        page = indexed.asset_ids(offset=offset, limit=limit, newest_first=newest_first, exclude_ids=excluded)
+        assert page == shown[offset:None if limit is None else offset + limit]
+
+
+def test_index_is_rebuilt_from_the_backend(stores):
+    indexed, _, path = stores
+    reopened = IndexedStorage(SQLiteStorage(path))
+
+    for project_id, asset_type in FILTERS:
+        assert reopened.asset_ids(project_id, asset_type) == indexed.asset_ids(project_id, asset_type)
+    assert reopened.list_projects() == indexed.list_projects()
+
+
+def test_project_lookups(stores):
+    indexed, backend, _ = stores
+
+    assert indexed.count_projects() == 4
+    assert [p["id"] for p in indexed.list_projects()] == [p["id"] for p in backend.list_projects()]
+    assert [p["id"] for p in indexed.list_projects(limit=2, newest_first=True)] == [
+        p["id"] for p in backend.list_projects(limit=2, newest_first=True)
+    ]
+    # Two projects are named Alpha; the older one wins, as in the backend
+    assert indexed.get_project_by_name("Alpha") == backend.get_project_by_name("Alpha")
+    assert indexed.get_project("missing") is None
+
+
+def test_returned_projects_are_copies(stores):
+    indexed, _, _ = stores
+    indexed.get_project("p0")["name"] = "Changed"
+
+    assert indexed.get_project("p0")["name"] == "Gamma"
+
+
+def test_clear_empties_the_index(stores):
+    indexed, _, _ = stores
+    indexed.clear()
+
+    assert indexed.count_projects() == 0
+    assert indexed.count_assets() == 0
+    assert indexed.get_assets() == []
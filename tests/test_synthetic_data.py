@@ -0,0 +1,25 @@
+from benchmarks import synthetic_data
+from benchmarks.synthetic_data import build_dataset, dataset_info
+from utils.history_log.history_log import get_history_log
+from utils.image_hash.image_hash import get_image_hash_index
+from utils.search_index.search_index import get_search_index
+from utils.storage.storage import get_storage
+
+
+def test_dataset_fills_every_store(monkeypatch):
+    monkeypatch.setattr(synthetic_data, "IMAGE_POOL_SIZE", 2)
+    monkeypatch.setattr(synthetic_data, "ASSETS_PER_PROJECT", 40)
+    monkeypatch.setattr(synthetic_data, "BATCH_SIZE", 30)
+
+    info = build_dataset(100, seed=3)
+
+    storage = get_storage()
+    images = storage.count_assets(asset_type="image")
+    assert info["projects"] == storage.count_projects() == 3
+    assert storage.count_assets() == get_search_index().size() == get_history_log().count() == 100
+    assert 0 < images < 100
+    assert get_image_hash_index().size() == images
+    assert dataset_info() == info
+    # Assets and history are spread over time, oldest first
+    history = get_history_log().read_range()
+    assert [item["asset_id"] for item in history] == [a["id"] for a in storage.get_assets()]
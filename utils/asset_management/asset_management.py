@@ -1,83 +1,324 @@
 import streamlit as st
-from datetime import datetime
+import base64
+import time
 import uuid
 
-def save_to_project(content_type, content, description):
+from utils.storage.storage import get_storage, now
+from utils.history_log.history_log import get_history_log
+from utils.search_index.search_index import get_search_index
+from utils.image_hash.image_hash import get_image_hash_index
+from utils.blob_store.blob_store import get_blob_store, is_blob_ref
+from utils.renditions.renditions import get_rendition_cache, pick_preview
+from utils.metrics.metrics import get_metrics
+
+def add_asset(project, content_type, content, description, prompt=None):
     """
-    Save content to the current project
-    
+    Store an asset in a project without touching Streamlit state
+
+    Safe to call from worker threads and command-line tools.
+
     Args:
+        project (dict): The project to add the asset to
         content_type (str): Type of content ('text' or 'image')
         content (str): The content to save
         description (str): Description of the content
-    
+        prompt (str, optional): Prompt the content was generated from, made searchable
+
     Returns:
-        bool: True if saved successfully, False otherwise
+        tuple: (asset ID, list of warnings from preview rendering or image indexing)
     """
-    if not st.session_state.current_project:
-        st.error("No active project. Please create or select a project first.")
-        return False
-    
-    project_idx = next((i for i, p in enumerate(st.session_state.projects) 
-                        if p["id"] == st.session_state.current_project), None)
-    
-    if project_idx is None:
-        st.error("Project not found.")
-        return False
-    
+    started = time.perf_counter()
     asset_id = str(uuid.uuid4())
+    created_at = now()
     asset = {
         "id": asset_id,
+        "project_id": project["id"],
         "type": content_type,
         "content": content,
         "description": description,
-        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        "created_at": created_at
     }
-    
-    st.session_state.projects[project_idx]["assets"].append(asset)
-    
+
+    get_storage().add_asset(asset)
+    get_search_index().add(asset, prompt=prompt)
+
+    # Queue previews and platform renditions so views never decode the full image
+    warnings = []
+    if content_type == "image" and is_blob_ref(content):
+        try:
+            get_rendition_cache().submit(content)
+        except Exception as e:
+            warnings.append(f"Could not create image renditions: {str(e)}")
+        try:
+            get_image_hash_index().add(asset)
+        except Exception as e:
+            warnings.append(f"Could not index image for duplicate detection: {str(e)}")
+
     # Add to history
     history_item = {
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "project_id": st.session_state.current_project,
-        "project_name": st.session_state.projects[project_idx]["name"],
+        "timestamp": created_at,
+        "project_id": project["id"],
+        "project_name": project["name"],
         "asset_id": asset_id,
         "asset_type": content_type,
         "description": description
     }
-    st.session_state.history.append(history_item)
-    
+    get_history_log().append(history_item)
+
+    get_metrics().observe("asset_save", time.perf_counter() - started, type=content_type)
+    return asset_id, warnings
+
+def save_to_project(content_type, content, description, prompt=None):
+    """
+    Save content to the current project
+
+    Args:
+        content_type (str): Type of content ('text' or 'image')
+        content (str): The content to save
+        description (str): Description of the content
+        prompt (str, optional): Prompt the content was generated from, made searchable
+
+    Returns:
+        bool: True if saved successfully, False otherwise
+    """
+    if not st.session_state.current_project:
+        st.error("No active project. Please create or select a project first.")
+        return False
+
+    project = get_storage().get_project(st.session_state.current_project)
+
+    if project is None:
+        st.error("Project not found.")
+        return False
+
+    _, warnings = add_asset(project, content_type, content, description, prompt=prompt)
+    for warning in warnings:
+        st.warning(warning)
     return True
 
-def get_all_assets():
+def get_all_assets(project_id=None, asset_type=None, offset=0, limit=None, newest_first=False, exclude_ids=None):
     """
-    Get all assets from all projects with project information attached
-    
+    Get assets from all projects with project information attached, one page at a time
+
+    Assets are ordered by creation time with ties kept in insertion order,
+    so consecutive pages never overlap or skip an asset.
+
+    Args:
+        project_id (str, optional): Only return assets of this project
+        asset_type (str, optional): Only return assets of this type ('text' or 'image')
+        offset (int): Number of matching assets to skip
+        limit (int, optional): Maximum number of assets to return
+        newest_first (bool): Return the most recently created assets first
+        exclude_ids (set, optional): Leave these assets out, e.g. collapsed duplicates
+
     Returns:
         list: List of assets with project information
     """
-    all_assets = []
-    for project in st.session_state.projects:
-        for asset in project["assets"]:
-            asset_with_project = asset.copy()
-            asset_with_project["project_name"] = project["name"]
-            asset_with_project["project_id"] = project["id"]
-            all_assets.append(asset_with_project)
-    
-    return all_assets
+    # With exclude_ids, offsets count only the assets that are shown, so pages stay full
+    return get_storage().get_assets(
+        project_id=project_id, asset_type=asset_type, offset=offset, limit=limit, newest_first=newest_first,
+        exclude_ids=exclude_ids
+    )
 
-def get_project_assets(project_id):
+def get_project_assets(project_id, asset_type=None):
     """
     Get all assets for a specific project
-    
+
     Args:
         project_id (str): ID of the project
-    
+        asset_type (str, optional): Only return assets of this type ('text' or 'image')
+
     Returns:
         list: List of assets for the specified project or empty list if project not found
     """
-    project = next((p for p in st.session_state.projects if p["id"] == project_id), None)
-    if not project:
-        return []
-    
-    return project["assets"]
\ No newline at end of file
+    return get_storage().get_assets(project_id=project_id, asset_type=asset_type)
+
+def search_assets(query, project_id=None, asset_type=None, offset=0, limit=20):
+    """
+    Full-text search over asset content, descriptions and prompts
+
+    Args:
+        query (str): Free-text query
+        project_id (str, optional): Only search assets of this project
+        asset_type (str, optional): Only search assets of this type ('text' or 'image')
+        offset (int): Number of results to skip
+        limit (int): Maximum number of results
+
+    Returns:
+        list: Matching assets, best first, with project information and the
+            content_highlight, description_highlight and prompt_snippet keys (escaped HTML)
+    """
+    hits = get_search_index().search(query, project_id=project_id, asset_type=asset_type, offset=offset, limit=limit)
+    assets = {a["id"]: a for a in get_storage().get_assets_by_ids([hit["asset_id"] for hit in hits])}
+    results = []
+    for hit in hits:
+        asset = assets.get(hit["asset_id"])
+        if asset is not None:
+            asset.update(
+                content_highlight=hit["content_highlight"],
+                description_highlight=hit["description_highlight"],
+                prompt_snippet=hit["prompt_snippet"]
+            )
+            results.append(asset)
+    return results
+
+def count_search_results(query, project_id=None, asset_type=None):
+    """
+    Count the assets matching a full-text query
+
+    Args:
+        query (str): Free-text query
+        project_id (str, optional): Only count assets of this project
+        asset_type (str, optional): Only count assets of this type ('text' or 'image')
+
+    Returns:
+        int: Number of matching assets
+    """
+    return get_search_index().count(query, project_id=project_id, asset_type=asset_type)
+
+def count_assets(project_id=None, asset_type=None):
+    """
+    Count assets without loading them
+
+    Args:
+        project_id (str, optional): Only count assets of this project
+        asset_type (str, optional): Only count assets of this type ('text' or 'image')
+
+    Returns:
+        int: Number of matching assets
+    """
+    return get_storage().count_assets(project_id=project_id, asset_type=asset_type)
+
+def find_duplicate_images(project_id=None):
+    """
+    Find groups of near-identical images by perceptual hash
+
+    Args:
+        project_id (str, optional): Only look at images of this project
+
+    Returns:
+        list: Groups (lists) of two or more asset ids, most recently created first
+    """
+    return get_image_hash_index().duplicate_groups(project_id=project_id)
+
+def find_similar_images(asset_id, limit=12):
+    """
+    Find the images that look most like an image asset
+
+    Args:
+        asset_id (str): ID of the image asset
+        limit (int): Maximum number of results
+
+    Returns:
+        list: Image assets with project information and a "distance" key
+            (differing hash bits, 0 = visually identical), closest first
+    """
+    matches = get_image_hash_index().similar(asset_id, limit=limit)
+    assets = get_storage().get_assets_by_ids([match_id for match_id, _ in matches])
+    distances = dict(matches)
+    for asset in assets:
+        asset["distance"] = distances[asset["id"]]
+    return assets
+
+def get_recent_history(limit=5):
+    """
+    Get the most recent history items
+
+    Args:
+        limit (int): Maximum number of items to return
+
+    Returns:
+        list: History items, newest first
+    """
+    return get_history_log().recent(limit=limit)
+
+def get_history_range(start=None, end=None):
+    """
+    Get the history items logged in a time range
+
+    Args:
+        start (datetime, optional): Include items at or after this time
+        end (datetime, optional): Include items before this time
+
+    Returns:
+        list: History items, oldest first
+    """
+    return get_history_log().read_range(start=start, end=end)
+
+def count_history():
+    """
+    Count all history items
+
+    Returns:
+        int: Number of history items
+    """
+    return get_history_log().count()
+
+def get_image_source(content):
+    """
+    Resolve an image asset's content to something st.image can display
+
+    Args:
+        content (str): Image asset content: a blob digest, a URL, or legacy base64 data
+
+    Returns:
+        str or bytes: Blob file path or URL (served without loading it here), or decoded bytes
+    """
+    if is_blob_ref(content):
+        return get_blob_store().path(content)
+    if content.startswith('http'):
+        return content
+    with get_metrics().span("image_decode", source="legacy"):
+        return base64.b64decode(content)
+
+def get_image_preview(content, width):
+    """
+    Get the smallest preview of an image asset that fills a display width
+
+    Args:
+        content (str): Image asset content
+        width (int): Display width in pixels
+
+    Returns:
+        str or bytes: Path of a WebP/AVIF preview for stored images, otherwise the full image
+            source (also while a stored image's previews are still being encoded)
+    """
+    # st.image serves files under a URL derived from their contents, so the browser
+    # fetches a preview once and caches it, instead of receiving it with every rerun
+    if is_blob_ref(content):
+        with get_metrics().span("image_preview"):
+            preview = get_rendition_cache().ready_path(content, pick_preview(width))
+        if preview is not None:
+            return preview
+    return get_image_source(content)
+
+def get_image_rendition(content, name):
+    """
+    Get a platform-sized rendition of a stored image for download
+
+    Args:
+        content (str): Image asset content (a blob digest)
+        name (str): Rendition name, one of PLATFORM_RENDITIONS
+
+    Returns:
+        bytes: The encoded rendition
+    """
+    with get_metrics().span("image_rendition", rendition=name):
+        return get_rendition_cache().get(content, name)
+
+def collect_garbage(min_age=3600):
+    """
+    Delete stored images that no asset references anymore
+
+    Args:
+        min_age (int): Keep orphaned blobs younger than this many seconds (unsaved generations)
+
+    Returns:
+        int: Number of blobs deleted
+    """
+    referenced = {c for c in get_storage().iter_asset_contents(asset_type="image") if is_blob_ref(c)}
+    removed = get_blob_store().gc(referenced, min_age=min_age)
+    rendition_cache = get_rendition_cache()
+    for digest in removed:
+        rendition_cache.discard(digest)
+    return len(removed)
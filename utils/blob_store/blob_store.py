@@ -0,0 +1,191 @@
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+import time
+
+from utils.storage.storage import get_data_dir
+
+BLOB_DIRNAME = "blobs"
+TMP_DIRNAME = "tmp"
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_blob_ref(value):
+    """
+    Check whether a value is a blob store reference (a SHA-256 hex digest)
+
+    Args:
+        value: Value to check, usually an asset's content
+
+    Returns:
+        bool: True if the value references a blob
+    """
+    return isinstance(value, str) and DIGEST_RE.match(value) is not None
+
+
+class BlobStore:
+    """
+    Content-addressed store for binary assets such as generated images
+
+    Blobs are named by the SHA-256 digest of their bytes and sharded into
+    two levels of directories (ab/cd/abcd...), so identical images are stored
+    once and no directory grows past a few hundred entries.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest):
+        """
+        Get the on-disk path of a blob
+
+        Args:
+            digest (str): SHA-256 hex digest of the blob
+
+        Returns:
+            str: Path of the blob file
+        """
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put(self, data):
+        """
+        Store bytes and return their digest; storing existing content is a no-op
+
+        Args:
+            data (bytes): Blob contents
+
+        Returns:
+            str: SHA-256 hex digest of the stored blob
+        """
+        return self.put_stream([data])
+
+    def put_stream(self, chunks):
+        """
+        Store a blob from an iterable of byte chunks without holding it in memory
+
+        Chunks are hashed while they are written to a temporary file, which is
+        then renamed to its content address (or dropped if the blob exists).
+
+        Args:
+            chunks (iterable): Byte strings making up the blob, in order
+
+        Returns:
+            str: SHA-256 hex digest of the stored blob
+        """
+        tmp_dir = os.path.join(self.root, TMP_DIRNAME)
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, prefix=".tmp-")
+        try:
+            hasher = hashlib.sha256()
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    if chunk:
+                        hasher.update(chunk)
+                        f.write(chunk)
+            digest = hasher.hexdigest()
+            path = self.path(digest)
+            if os.path.exists(path):
+                # Refresh the mtime so a re-generated image isn't collected before it's saved
+                os.utime(path)
+                os.remove(tmp_path)
+                return digest
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return digest
+
+    def open(self, digest):
+        """
+        Memory-map a blob for reading without copying it into the Python heap
+
+        The returned mmap supports the buffer protocol as well as read()/seek(),
+        so it can be hashed, written out or passed to PIL.Image.open directly.
+        Close it (or use it as a context manager) when done.
+
+        Args:
+            digest (str): SHA-256 hex digest of the blob
+
+        Returns:
+            mmap.mmap: Read-only memory map of the blob
+        """
+        with open(self.path(digest), "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def size(self, digest):
+        return os.path.getsize(self.path(digest))
+
+    def delete(self, digest):
+        try:
+            os.remove(self.path(digest))
+        except FileNotFoundError:
+            pass
+
+    def iter_digests(self):
+        """
+        Iterate over the digests of all stored blobs
+
+        Yields:
+            str: SHA-256 hex digest
+        """
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if is_blob_ref(name):
+                    yield name
+
+    def gc(self, referenced, min_age=3600):
+        """
+        Delete blobs that are no longer referenced by any asset
+
+        Blobs younger than min_age seconds are kept, since a freshly generated
+        image may not have been saved to a project yet.
+
+        Args:
+            referenced (set): Digests that are still in use
+            min_age (int): Minimum age in seconds before an orphan is removed
+
+        Returns:
+            list: Digests of the deleted blobs
+        """
+        cutoff = time.time() - min_age
+        removed = []
+        for digest in list(self.iter_digests()):
+            if digest in referenced:
+                continue
+            path = self.path(digest)
+            try:
+                if os.path.getmtime(path) > cutoff:
+                    continue
+                os.remove(path)
+                removed.append(digest)
+            except FileNotFoundError:
+                continue
+        return removed
+
+
+_blob_store = None
+_blob_store_lock = threading.Lock()
+
+
+def get_blob_store():
+    """
+    Get the process-wide blob store kept in the data directory
+
+    Returns:
+        BlobStore: The shared blob store
+    """
+    global _blob_store
+    if _blob_store is None:
+        with _blob_store_lock:
+            if _blob_store is None:
+                _blob_store = BlobStore(os.path.join(get_data_dir(), BLOB_DIRNAME))
+    return _blob_store
@@ -0,0 +1,341 @@
+import csv
+import hashlib
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from utils.storage.storage import get_storage, now
+from utils.content_generation.content_generation import (
+    request_text_variants, request_image_variants, DEFAULT_TEXT_MODEL, DEFAULT_IMAGE_MODEL
+)
+from utils.asset_management.asset_management import add_asset
+from utils.prompt_templates.prompt_templates import IMAGE, build_prompt, get_template
+
+DEFAULT_CONCURRENCY = int(os.environ.get("CREATIVEFLOW_BULK_CONCURRENCY", "4"))
+JSONL_EXTENSIONS = (".jsonl", ".ndjson")
+CHECKPOINT_SUFFIX = ".checkpoint.jsonl"
+TRUE_VALUES = {"1", "true", "yes", "y", "x"}
+
+DONE = "done"
+# Some variants were saved; a resumed run generates the missing ones
+PARTIAL = "partial"
+FAILED = "failed"
+
+
+def read_briefs(path):
+    """
+    Read briefs from a CSV file (with a header row) or a JSON Lines file
+
+    Args:
+        path (str): .csv, .jsonl or .ndjson file
+
+    Returns:
+        list: One dict of column values per brief, in file order
+
+    Raises:
+        ValueError: If a JSON Lines row is not a JSON object
+    """
+    if path.lower().endswith(JSONL_EXTENSIONS):
+        briefs = []
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    brief = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Line {line_number}: invalid JSON ({e})")
+                if not isinstance(brief, dict):
+                    raise ValueError(f"Line {line_number}: expected a JSON object")
+                briefs.append(brief)
+        return briefs
+
+    # utf-8-sig drops the byte order mark spreadsheet programs put in front of exported CSVs
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return [
+            {name.strip(): value for name, value in row.items() if name}
+            for row in csv.DictReader(f)
+            if any((value or "").strip() for value in row.values() if isinstance(value, str))
+        ]
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    return bool(value)
+
+
+def _number(brief, name, default):
+    value = brief.get(name)
+    if value is None or str(value).strip() == "":
+        return default
+    return int(value)
+
+
+def prepare_brief(brief, row, default_type=None, default_variants=1, source_name=""):
+    """
+    Turn a brief into a generation request using the Content Generator's prompt templates
+
+    Args:
+        brief (dict): Column values; 'type' selects the template, other template fields
+            fill it, and 'variants', 'description', 'width' and 'height' are optional
+        row (int): 1-based position of the brief in its file
+        default_type (str, optional): Template for briefs without a 'type' column
+        default_variants (int): Variants for briefs without a 'variants' column
+        source_name (str): File name used in the default asset description
+
+    Returns:
+        dict: row, generation_type, kind, prompt, count, description, width and height
+
+    Raises:
+        ValueError: If the template is unknown or a number column is not a number
+    """
+    generation_type = str(brief.get("type") or default_type or "").strip()
+    if not generation_type:
+        raise ValueError("no content type (add a 'type' column or pass --type)")
+    template = get_template(generation_type)
+
+    fields = {}
+    for name, default in template["fields"].items():
+        value = brief.get(name)
+        if value is None:
+            continue
+        fields[name] = _flag(value) if isinstance(default, bool) else str(value).strip()
+
+    count = _number(brief, "variants", default_variants)
+    if count < 1:
+        raise ValueError("variants must be at least 1")
+    return {
+        "row": row,
+        "generation_type": generation_type,
+        "kind": template["kind"],
+        "prompt": build_prompt(generation_type, **fields),
+        "count": count,
+        "description": str(brief.get("description") or "").strip() or f"{generation_type} ({source_name} #{row})",
+        "width": _number(brief, "width", 1024),
+        "height": _number(brief, "height", 1024),
+    }
+
+
+def brief_keys(briefs):
+    """
+    Derive a stable checkpoint key for every brief
+
+    A brief's 'id' column is used when present. Otherwise the key is a hash
+    of its contents, numbered for repeated rows, so a resumed run matches
+    briefs even if rows were inserted or reordered in the meantime.
+
+    Args:
+        briefs (list): Briefs as returned by read_briefs
+
+    Returns:
+        list: Keys, in brief order
+    """
+    keys, seen = [], {}
+    for brief in briefs:
+        if str(brief.get("id") or "").strip():
+            key = f"id:{str(brief['id']).strip()}"
+        else:
+            canonical = json.dumps(brief, sort_keys=True, ensure_ascii=False, default=str)
+            key = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key}#{seen[key]}")
+    return keys
+
+
+class Checkpoint:
+    """
+    Append-only JSON Lines record of finished briefs
+
+    Every brief is appended and fsynced as soon as its assets are saved, so a
+    run that crashes or is interrupted loses at most the briefs that were in
+    flight. Briefs recorded as done are skipped when the run is resumed;
+    failed ones are tried again, and partial ones generate their missing
+    variants.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            data = f.read()
+        for line in data.splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line is cut short if the process died while writing it
+                continue
+            self.entries[entry["key"]] = entry
+        if data and not data.endswith(b"\n"):
+            # Terminate the partial line so the next entry is not appended to it
+            with open(path, "ab") as f:
+                f.write(b"\n")
+
+    def is_done(self, key):
+        entry = self.entries.get(key)
+        return entry is not None and entry["state"] == DONE
+
+    def saved_asset_ids(self, key):
+        """
+        Get the assets already saved for a brief that is not done yet
+
+        Args:
+            key (str): Checkpoint key
+
+        Returns:
+            list: Asset IDs recorded for the brief, empty unless it is partial
+        """
+        entry = self.entries.get(key)
+        return list(entry["asset_ids"]) if entry is not None and entry["state"] == PARTIAL else []
+
+    def record(self, entry):
+        """
+        Append a finished brief to the checkpoint file
+
+        Args:
+            entry (dict): JSON-serializable result with at least 'key' and 'state'
+        """
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.entries[entry["key"]] = entry
+
+
+def get_or_create_project(name, create=False):
+    """
+    Find the target project by name, optionally creating it
+
+    Args:
+        name (str): Project name
+        create (bool): Create the project if it does not exist
+
+    Returns:
+        dict: The project, or None if it does not exist and create is False
+    """
+    storage = get_storage()
+    project = storage.get_project_by_name(name)
+    if project is None and create:
+        project = {
+            "id": str(uuid.uuid4()),
+            "name": name,
+            "description": "",
+            "brand_guidelines": "",
+            "target_audience": "",
+            "created_at": now()
+        }
+        storage.create_project(project)
+    return project
+
+
+def generate_brief(api_key, project, request, text_model=DEFAULT_TEXT_MODEL, image_model=DEFAULT_IMAGE_MODEL,
+                   use_cache=True):
+    """
+    Generate one brief's variants and save them to the project without touching Streamlit state
+
+    Args:
+        api_key (str): Together AI API key
+        project (dict): Target project
+        request (dict): Prepared brief from prepare_brief
+        text_model (str): Model for text briefs
+        image_model (str): Model for image briefs
+        use_cache (bool): Answer repeated text briefs from the response cache
+
+    Returns:
+        tuple: (list of saved asset IDs, list of error messages)
+    """
+    if request["kind"] == IMAGE:
+        results, errors = request_image_variants(
+            api_key, request["prompt"], request["count"], image_model, request["width"], request["height"]
+        )
+    else:
+        results, errors = request_text_variants(
+            api_key, request["prompt"], request["count"], text_model, use_cache=use_cache
+        )
+
+    asset_ids, messages = [], [str(e) for e in errors]
+    for content in results:
+        asset_id, warnings = add_asset(project, request["kind"], content, request["description"],
+                                       prompt=request["prompt"])
+        asset_ids.append(asset_id)
+        messages.extend(warnings)
+    return asset_ids, messages
+
+
+def run_batch(requests, keys, project, api_key, checkpoint, concurrency=DEFAULT_CONCURRENCY,
+              text_model=DEFAULT_TEXT_MODEL, image_model=DEFAULT_IMAGE_MODEL, use_cache=True, progress=None):
+    """
+    Generate every brief not yet done according to the checkpoint, a bounded number at a time
+
+    Briefs run on a thread pool because generation waits on the API; the
+    shared rate limiters still cap the request rate across all threads. A
+    brief is done once all its variants were saved and partial if only some
+    were; a partial brief only generates its missing variants when resumed.
+
+    Args:
+        requests (list): Prepared briefs from prepare_brief
+        keys (list): Checkpoint keys from brief_keys, one per brief
+        project (dict): Target project
+        api_key (str): Together AI API key
+        checkpoint (Checkpoint): Record of finished briefs
+        concurrency (int): Briefs generated at the same time
+        text_model (str): Model for text briefs
+        image_model (str): Model for image briefs
+        use_cache (bool): Answer repeated text briefs from the response cache
+        progress (callable, optional): Called with each checkpoint entry as its brief finishes
+
+    Returns:
+        dict: Counts of briefs skipped (already done), done, partial and failed, and assets saved
+    """
+    pending = [(key, request) for key, request in zip(keys, requests) if not checkpoint.is_done(key)]
+    summary = {"total": len(requests), "skipped": len(requests) - len(pending), DONE: 0, PARTIAL: 0, FAILED: 0,
+               "assets": 0}
+
+    def run(key, request):
+        saved = checkpoint.saved_asset_ids(key)
+        missing = dict(request, count=max(0, request["count"] - len(saved)))
+        # The cache would answer with the variants that were already saved
+        cached = use_cache and not saved
+        try:
+            asset_ids, messages = generate_brief(api_key, project, missing, text_model, image_model, cached)
+        except Exception as e:
+            asset_ids, messages = [], [str(e)]
+        all_ids = saved + asset_ids
+        if len(all_ids) >= request["count"]:
+            state = DONE
+        else:
+            state = PARTIAL if all_ids else FAILED
+        entry = {
+            "key": key,
+            "row": request["row"],
+            "type": request["generation_type"],
+            "state": state,
+            "project_id": project["id"],
+            "asset_ids": all_ids,
+            "errors": messages,
+            "finished_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        checkpoint.record(entry)
+        return entry, len(asset_ids)
+
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="creativeflow-bulk")
+    try:
+        futures = [executor.submit(run, key, request) for key, request in pending]
+        for future in as_completed(futures):
+            entry, saved_now = future.result()
+            summary[entry["state"]] += 1
+            summary["assets"] += saved_now
+            if progress:
+                progress(entry)
+    finally:
+        # On Ctrl-C queued briefs are dropped; those in flight finish and are checkpointed
+        executor.shutdown(wait=True, cancel_futures=True)
+    return summary
@@ -0,0 +1,135 @@
+import os
+import threading
+from collections import OrderedDict
+
+API_BASE_URL = os.environ.get("TOGETHER_API_BASE", "https://api.together.xyz/v1")
+DEFAULT_POOL_SIZE = int(os.environ.get("CREATIVEFLOW_HTTP_POOL_SIZE", "10"))
+MAX_POOLED_KEYS = 32
+# Seconds to establish a connection, and to wait for the next bytes of a response
+# (image generations can take minutes before the first byte arrives)
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = float(os.environ.get("CREATIVEFLOW_HTTP_READ_TIMEOUT", "600"))
+REQUEST_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+
+class _PooledClients:
+    def __init__(self, pool_size):
+        # The HTTP and SDK packages add a few hundred ms to startup, so they are
+        # imported on first use rather than when the app loads
+        import httpx
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+        )
+        self.together_client = None
+
+
+class ClientPool:
+    """
+    Process-wide keep-alive connection pools for the Together API, keyed by API key
+
+    Every Streamlit session that uses the same API key shares one requests
+    session (for the images endpoint and image downloads) and one Together SDK
+    client, so TCP and TLS handshakes are paid once instead of on every call.
+    The least recently used keys are dropped once more than max_keys are pooled.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, base_url=API_BASE_URL, max_keys=MAX_POOLED_KEYS):
+        self.pool_size = pool_size
+        self.base_url = base_url
+        self.max_keys = max_keys
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, api_key):
+        with self._lock:
+            entry = self._entries.get(api_key)
+            if entry is None:
+                entry = _PooledClients(self.pool_size)
+                self._entries[api_key] = entry
+                while len(self._entries) > self.max_keys:
+                    # Not closed here: another thread may still be mid-request on it.
+                    # Its connections are released once the last reference is gone.
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(api_key)
+            return entry
+
+    def session(self, api_key):
+        """
+        Get the pooled requests session for an API key
+
+        Args:
+            api_key (str): Together AI API key
+
+        Returns:
+            requests.Session: Shared keep-alive session
+        """
+        return self._entry(api_key).session
+
+    def together(self, api_key):
+        """
+        Get the pooled Together SDK client for an API key
+
+        Args:
+            api_key (str): Together AI API key
+
+        Returns:
+            Together: Shared client backed by a keep-alive connection pool
+        """
+        entry = self._entry(api_key)
+        if entry.together_client is None:
+            from together import Together
+
+            with self._lock:
+                if entry.together_client is None:
+                    # Retries are handled by the shared rate limiter, not per client
+                    entry.together_client = Together(
+                        api_key=api_key, base_url=self.base_url, http_client=entry.http_client, max_retries=0
+                    )
+        return entry.together_client
+
+    def prewarm(self, api_key):
+        """
+        Open connections to the API host in the background so the first generation skips the handshake
+
+        Args:
+            api_key (str): Together AI API key
+        """
+        def warm():
+            try:
+                # Creating the pool imports the HTTP packages, so do that off the script thread too
+                entry = self._entry(api_key)
+                entry.session.head(self.base_url, timeout=REQUEST_TIMEOUT)
+                entry.http_client.head(self.base_url)
+            except Exception:
+                # Pre-warming is best effort; the real request will connect itself
+                pass
+
+        threading.Thread(target=warm, name="creativeflow-prewarm", daemon=True).start()
+
+
+_client_pool = None
+_client_pool_lock = threading.Lock()
+
+
+def get_client_pool():
+    """
+    Get the process-wide client pool shared by all Streamlit sessions
+
+    Returns:
+        ClientPool: The shared client pool
+    """
+    global _client_pool
+    if _client_pool is None:
+        with _client_pool_lock:
+            if _client_pool is None:
+                _client_pool = ClientPool()
+    return _client_pool
@@ -1,120 +1,490 @@
 import streamlit as st
-from together import Together
-import time
 import base64
-import requests
-from io import BytesIO
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.blob_store.blob_store import get_blob_store
+from utils.content_generation.client_pool import get_client_pool, API_BASE_URL, REQUEST_TIMEOUT
+from utils.content_generation.response_cache import get_response_cache, cache_key
+from utils.content_generation.rate_limiter import call_with_retry, classify_error, get_rate_limiter, parse_retry_after
+from utils.prompt_index.prompt_index import get_prompt_index
+from utils.metrics.metrics import get_metrics
+from utils.renditions.renditions import get_rendition_cache, PREVIEW_NAMES
+
+DEFAULT_TEXT_MODEL = "deepseek-ai/DeepSeek-V3"
+DEFAULT_IMAGE_MODEL = "stabilityai/stable-diffusion-xl-base-1.0"
+MAX_PARALLEL_REQUESTS = int(os.environ.get("CREATIVEFLOW_MAX_PARALLEL_REQUESTS", "4"))
+TEXT_MAX_TOKENS = 1000
+TEXT_TEMPERATURE = 0.7
+
+# Image models whose endpoint honours the batch "n" parameter
+IMAGE_BATCH_MODELS = {
+    "stabilityai/stable-diffusion-xl-base-1.0",
+    "stabilityai/stable-diffusion-2-1",
+    "runwayml/stable-diffusion-v1-5",
+}
+
+# Image models that can return the image inline as base64 instead of a URL
+IMAGE_B64_MODELS = {
+    "stabilityai/stable-diffusion-xl-base-1.0",
+    "stabilityai/stable-diffusion-2-1",
+    "runwayml/stable-diffusion-v1-5",
+}
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
 
-def generate_text(prompt, model=None):
+class GenerationError(Exception):
+    """Raised when the API call for a generation fails"""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+def _check_response(response, message):
+    # Raise a GenerationError carrying the status so the retry layer can classify it.
+    # message may be a callable so that building it (e.g. from the body) only happens on errors.
+    if response.status_code != 200:
+        raise GenerationError(
+            message() if callable(message) else message,
+            status_code=response.status_code,
+            retry_after=parse_retry_after(response.headers.get("retry-after"))
+        )
+
+def request_text(api_key, prompt, model=DEFAULT_TEXT_MODEL, use_cache=True, variant=0):
     """
-    Generate text content using TogetherAI's API
-    
+    Call the chat completions API without touching Streamlit state
+
+    Identical requests are answered from the response cache unless use_cache
+    is False. Safe to call from worker threads.
+
     Args:
+        api_key (str): Together AI API key
         prompt (str): The prompt for text generation
-        model (str, optional): Model name. If None, uses the session's default model.
-    
+        model (str): Model name
+        use_cache (bool): Read from and write to the response cache
+        variant (int): Index of the variant within a multi-variant request
+
     Returns:
-        str: Generated text content or None if an error occurs
+        str: Generated text content
     """
-    if not st.session_state.api_key:
-        st.error("Please enter your Together AI API key in the settings tab.")
-        return None
-    
-    if model is None:
-        model = st.session_state.get("default_text_model", "deepseek-ai/DeepSeek-V3")
-    
-    try:
-        with st.spinner("Generating text..."):
-            # Initialize Together client
-            client = Together(api_key=st.session_state.api_key)
-            
-            # Call the API
-            response = client.chat.completions.create(
+    messages = [{"role": "user", "content": prompt}]
+    cache = get_response_cache()
+    key = cache_key(model, messages, TEXT_MAX_TOKENS, TEXT_TEMPERATURE, variant=variant)
+    metrics = get_metrics()
+    if use_cache:
+        cached = cache.get(key)
+        metrics.increment("response_cache_lookups", result="miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+    else:
+        cache.record_bypass()
+        metrics.increment("response_cache_lookups", result="bypass")
+
+    client = get_client_pool().together(api_key)
+
+    def create():
+        with metrics.span("api_request", kind="text", model=model):
+            return client.chat.completions.create(
                 model=model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=1000,
-                temperature=0.7,
+                messages=messages,
+                max_tokens=TEXT_MAX_TOKENS,
+                temperature=TEXT_TEMPERATURE,
             )
-            
-            # Extract the generated text
-            return response.choices[0].message.content
-            
-    except Exception as e:
-        st.error(f"An error occurred: {str(e)}")
-        return None
 
-def generate_image(prompt, model=None, width=1024, height=1024):
+    response = call_with_retry(create, limiter=get_rate_limiter(api_key, model))
+    content = response.choices[0].message.content
+    if content is None:
+        # e.g. a content-filtered completion; caching it would fail every replay
+        raise GenerationError(f"The model returned no text (finish reason: {response.choices[0].finish_reason})")
+    # Bypassed requests still refresh the cache so the next identical brief is instant
+    cache.put(key, content)
+    return content
+
+def stream_text(api_key, prompt, model=DEFAULT_TEXT_MODEL, use_cache=True):
     """
-    Generate image content using TogetherAI's API
-    
+    Stream a chat completion token by token without touching Streamlit state
+
+    A cached completion is yielded in one piece. The assembled text is cached
+    once the stream finishes.
+
+    Args:
+        api_key (str): Together AI API key
+        prompt (str): The prompt for text generation
+        model (str): Model name
+        use_cache (bool): Read from and write to the response cache
+
+    Yields:
+        str: Text fragments in arrival order
+    """
+    messages = [{"role": "user", "content": prompt}]
+    cache = get_response_cache()
+    key = cache_key(model, messages, TEXT_MAX_TOKENS, TEXT_TEMPERATURE)
+    metrics = get_metrics()
+    if use_cache:
+        cached = cache.get(key)
+        metrics.increment("response_cache_lookups", result="miss" if cached is None else "hit")
+        if cached is not None:
+            yield cached
+            return
+    else:
+        cache.record_bypass()
+        metrics.increment("response_cache_lookups", result="bypass")
+
+    client = get_client_pool().together(api_key)
+
+    def create():
+        # Covers the wait for the response headers; the tokens arrive while iterating
+        with metrics.span("api_request", kind="text_stream", model=model):
+            return client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=TEXT_MAX_TOKENS,
+                temperature=TEXT_TEMPERATURE,
+                stream=True,
+            )
+
+    started = time.perf_counter()
+    stream = call_with_retry(create, limiter=get_rate_limiter(api_key, model))
+    parts = []
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            if not parts:
+                metrics.observe("time_to_first_token", time.perf_counter() - started, model=model)
+            parts.append(delta)
+            yield delta
+    metrics.observe("generation", time.perf_counter() - started, kind="text_stream")
+    if not parts:
+        raise GenerationError("The model returned no text")
+    cache.put(key, "".join(parts))
+    get_prompt_index().add("text", prompt, model, ["".join(parts)])
+
+def request_images(api_key, prompt, model=DEFAULT_IMAGE_MODEL, width=1024, height=1024, n=1, seed=None):
+    """
+    Call the image generation API and store the results, without touching Streamlit state
+
+    Safe to call from worker threads.
+
     Args:
+        api_key (str): Together AI API key
         prompt (str): The prompt for image generation
-        model (str, optional): Model name. If None, uses the session's default model.
+        model (str): Model name
         width (int): Output image width
         height (int): Output image height
-    
+        n (int): Number of images to request in one batch
+        seed (int, optional): Generation seed; derived from the clock if None
+
     Returns:
-        str: Base64 encoded image data or None if an error occurs
+        list: SHA-256 digests of the generated images in the blob store
     """
-    if not st.session_state.api_key:
-        st.error("Please enter your Together AI API key in the settings tab.")
-        return None
-    
-    if model is None:
-        model = st.session_state.get("default_image_model", "stabilityai/stable-diffusion-xl-base-1.0")
-    
     headers = {
-        "Authorization": f"Bearer {st.session_state.api_key}",
+        "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
     }
-    
+
     data = {
         "model": model,
         "prompt": prompt,
         "width": width,
         "height": height,
         "steps": 50,
-        "seed": int(time.time()) % 1000000
+        "seed": seed if seed is not None else int(time.time()) % 1000000
     }
-    
-    try:
-        with st.spinner("Generating image..."):
-            response = requests.post(
-                "https://api.together.xyz/v1/images/generations",
+    if n > 1:
+        data["n"] = n
+    if model in IMAGE_B64_MODELS:
+        data["response_format"] = "b64_json"
+
+    session = get_client_pool().session(api_key)
+    metrics = get_metrics()
+
+    def post():
+        with metrics.span("api_request", kind="image", model=model):
+            response = session.post(
+                f"{API_BASE_URL}/images/generations",
                 headers=headers,
-                json=data
+                json=data,
+                timeout=REQUEST_TIMEOUT
             )
-            
-            if response.status_code == 200:
-                response_json = response.json()
-                
-                if "data" in response_json and len(response_json["data"]) > 0:
-                    image_data = response_json["data"][0]
-                    
-                    # Check if the response contains a URL
-                    if "url" in image_data:
-                        # Download the image from the URL
-                        image_url = image_data["url"]
-                        img_response = requests.get(image_url)
-                        if img_response.status_code == 200:
-                            # Convert the downloaded image to base64
-                            image_bytes = BytesIO(img_response.content)
-                            base64_image = base64.b64encode(image_bytes.getvalue()).decode("utf-8")
-                            return base64_image
-                        else:
-                            st.error(f"Failed to download image from URL: {image_url}")
-                            return None
-                    else:
-                        st.error(f"No image URL found in response. Available keys: {list(image_data.keys())}")
-                        return None
-                else:
-                    st.error("No data found in the API response")
-                    return None
-            else:
-                st.error(f"Error: {response.status_code}, {response.text}")
-                return None
+        # Decoding the body as text is only worth it for the error message; success bodies can be megabytes
+        _check_response(response, lambda: f"Error: {response.status_code}, {response.text}")
+        return response
+
+    response = call_with_retry(post, limiter=get_rate_limiter(api_key, model))
+    response_json = response.json()
+    del response  # release the raw body before decoding images
+    if "data" not in response_json or len(response_json["data"]) == 0:
+        raise GenerationError("No data found in the API response")
+
+    blob_store = get_blob_store()
+    digests = []
+    for image_data in response_json["data"]:
+        if image_data.get("b64_json"):
+            # Decode straight into the blob store and drop the base64 text right away
+            with metrics.span("image_decode", source="api"):
+                image_bytes = base64.b64decode(image_data.pop("b64_json"))
+            with metrics.span("image_store"):
+                digests.append(blob_store.put(image_bytes))
+            del image_bytes
+            continue
+
+        # Check if the response contains a URL
+        if "url" not in image_data:
+            raise GenerationError(f"No image URL found in response. Available keys: {list(image_data.keys())}")
+
+        image_url = image_data["url"]
+
+        def download():
+            # Stream the body to disk in chunks instead of buffering the whole image
+            with metrics.span("image_download"), session.get(image_url, stream=True, timeout=REQUEST_TIMEOUT) as img_response:
+                _check_response(img_response, f"Failed to download image from URL: {image_url}")
+                return blob_store.put_stream(img_response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE))
+
+        # Store the downloaded image once, keyed by its content hash
+        digests.append(call_with_retry(download))
+
+    for digest in digests:
+        try:
+            # Encode the on-screen previews in the background while the results are laid out
+            get_rendition_cache().submit(digest, PREVIEW_NAMES)
+        except Exception:
+            # Views render missing previews themselves
+            pass
+    return digests
+
+def _run_parallel(func, count):
+    """
+    Run func(i) for i in range(count) on a bounded thread pool
+
+    Returns:
+        tuple: (list of results in submission order, list of exceptions)
+    """
+    results, errors = [], []
+    with ThreadPoolExecutor(max_workers=max(1, min(count, MAX_PARALLEL_REQUESTS))) as executor:
+        futures = [executor.submit(func, i) for i in range(count)]
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                errors.append(e)
+    return results, errors
+
+def request_text_variants(api_key, prompt, count, model=DEFAULT_TEXT_MODEL, use_cache=True):
+    """
+    Generate several alternative texts concurrently without touching Streamlit state
+
+    Args:
+        api_key (str): Together AI API key
+        prompt (str): The prompt for text generation
+        count (int): Number of variants to generate
+        model (str): Model name
+        use_cache (bool): Read from and write to the response cache
+
+    Returns:
+        tuple: (list of generated texts, list of exceptions from failed variants)
+    """
+    with get_metrics().span("generation", kind="text"):
+        results, errors = _run_parallel(
+            lambda i: request_text(api_key, prompt, model, use_cache=use_cache, variant=i), count
+        )
+    if errors:
+        get_metrics().increment("generation_errors", len(errors), kind="text")
+    get_prompt_index().add("text", prompt, model, results)
+    return results, errors
+
+def request_image_variants(api_key, prompt, count, model=DEFAULT_IMAGE_MODEL, width=1024, height=1024):
+    """
+    Generate several alternative images without touching Streamlit state
+
+    Models in IMAGE_BATCH_MODELS receive one request with the batch "n"
+    parameter; other models (and any shortfall in a batch) are filled with
+    parallel single-image requests using distinct seeds. A failed batch
+    request falls back to single-image requests too, unless it was rate
+    limited (429).
+
+    Args:
+        api_key (str): Together AI API key
+        prompt (str): The prompt for image generation
+        count (int): Number of variants to generate
+        model (str): Model name
+        width (int): Output image width
+        height (int): Output image height
+
+    Returns:
+        tuple: (list of blob store digests, list of exceptions from failed variants)
+    """
+    started = time.perf_counter()
+    base_seed = int(time.time()) % 1000000
+    digests, errors = [], []
+    batch_error = None
+
+    if count > 1 and model in IMAGE_BATCH_MODELS:
+        try:
+            digests = request_images(api_key, prompt, model, width, height, n=count, seed=base_seed)[:count]
+        except Exception as e:
+            batch_error = e
+
+    missing = count - len(digests)
+    if batch_error is not None and classify_error(batch_error)[1] == 429:
+        # Single-image requests would only be throttled as well
+        errors.append(batch_error)
+    elif missing > 0:
+        seed_offset = base_seed + len(digests)
+        results, errors = _run_parallel(
+            lambda i: request_images(api_key, prompt, model, width, height, seed=seed_offset + i)[0],
+            missing
+        )
+        digests.extend(results)
+        if errors and batch_error is not None:
+            # The batch error only matters if the single requests failed as well
+            errors.insert(0, batch_error)
+    metrics = get_metrics()
+    metrics.observe("generation", time.perf_counter() - started, kind="image")
+    if errors:
+        metrics.increment("generation_errors", len(errors), kind="image")
+    get_prompt_index().add("image", prompt, model, digests)
+    return digests, errors
+
+def find_similar_generations(prompt, kind, model, limit=3):
+    """
+    Find earlier generations of the same kind and model whose prompt nearly matches this one
+
+    Lets the caller offer existing results before spending an API call on a
+    brief that differs only in whitespace or a few words. Image results whose
+    files were removed in the meantime are left out.
+
+    Args:
+        prompt (str): The prompt about to be sent
+        kind (str): 'text' or 'image'
+        model (str): Model the prompt is about to be sent to
+        limit (int): Maximum number of matches
+
+    Returns:
+        list: Dicts with prompt, model, outputs, created_at and similarity (0-1), most similar first
+    """
+    matches = get_prompt_index().find(kind, prompt, model, limit=limit)
+    if kind == "image":
+        blob_store = get_blob_store()
+        for match in matches:
+            match["outputs"] = [digest for digest in match["outputs"] if blob_store.exists(digest)]
+        matches = [match for match in matches if match["outputs"]]
+    return matches
+
+def generate_text(prompt, model=None, use_cache=True):
+    """
+    Generate text content using TogetherAI's API
+
+    Args:
+        prompt (str): The prompt for text generation
+        model (str, optional): Model name. If None, uses the session's default model.
+        use_cache (bool): Answer repeated requests from the response cache
+
+    Returns:
+        str: Generated text content or None if an error occurs
+    """
+    variants = generate_text_variants(prompt, 1, model=model, use_cache=use_cache)
+    return variants[0] if variants else None
+
+def generate_text_stream(prompt, model=None, use_cache=True):
+    """
+    Generate text content as a stream of fragments for st.write_stream
+
+    Args:
+        prompt (str): The prompt for text generation
+        model (str, optional): Model name. If None, uses the session's default model.
+        use_cache (bool): Answer repeated requests from the response cache
+
+    Yields:
+        str: Text fragments
+
+    Raises:
+        GenerationError: If the generation fails. Not reported with st.error here, since callers
+            usually stream into a placeholder that they clear afterwards.
+    """
+    if not st.session_state.api_key:
+        raise GenerationError("Please enter your Together AI API key in the settings tab.")
+
+    if model is None:
+        model = st.session_state.get("default_text_model", DEFAULT_TEXT_MODEL)
+
+    try:
+        yield from stream_text(st.session_state.api_key, prompt, model, use_cache=use_cache)
     except Exception as e:
+        get_metrics().increment("generation_errors", kind="text_stream")
+        if isinstance(e, GenerationError):
+            raise
+        raise GenerationError(str(e)) from e
+
+def generate_text_variants(prompt, count, model=None, use_cache=True):
+    """
+    Generate several alternative texts for the same prompt concurrently
+
+    Args:
+        prompt (str): The prompt for text generation
+        count (int): Number of variants to generate
+        model (str, optional): Model name. If None, uses the session's default model.
+        use_cache (bool): Answer repeated requests from the response cache
+
+    Returns:
+        list: Generated texts (failed variants are reported and left out)
+    """
+    if not st.session_state.api_key:
+        st.error("Please enter your Together AI API key in the settings tab.")
+        return []
+
+    if model is None:
+        model = st.session_state.get("default_text_model", DEFAULT_TEXT_MODEL)
+
+    with st.spinner("Generating text..."):
+        results, errors = request_text_variants(st.session_state.api_key, prompt, count, model, use_cache=use_cache)
+
+    for e in errors:
+        st.error(f"An error occurred: {str(e)}")
+    return results
+
+def generate_image(prompt, model=None, width=1024, height=1024):
+    """
+    Generate image content using TogetherAI's API
+
+    Args:
+        prompt (str): The prompt for image generation
+        model (str, optional): Model name. If None, uses the session's default model.
+        width (int): Output image width
+        height (int): Output image height
+
+    Returns:
+        str: SHA-256 digest of the image in the blob store or None if an error occurs
+    """
+    variants = generate_image_variants(prompt, 1, model=model, width=width, height=height)
+    return variants[0] if variants else None
+
+def generate_image_variants(prompt, count, model=None, width=1024, height=1024):
+    """
+    Generate several alternative images for the same prompt
+
+    Args:
+        prompt (str): The prompt for image generation
+        count (int): Number of variants to generate
+        model (str, optional): Model name. If None, uses the session's default model.
+        width (int): Output image width
+        height (int): Output image height
+
+    Returns:
+        list: Blob store digests of the generated images (failed variants are reported and left out)
+    """
+    if not st.session_state.api_key:
+        st.error("Please enter your Together AI API key in the settings tab.")
+        return []
+
+    if model is None:
+        model = st.session_state.get("default_image_model", DEFAULT_IMAGE_MODEL)
+
+    with st.spinner("Generating image..."):
+        digests, errors = request_image_variants(st.session_state.api_key, prompt, count, model, width, height)
+
+    for e in errors:
         st.error(f"An error occurred: {str(e)}")
-        import traceback
-        st.error(traceback.format_exc())
-        return None
+    return digests
@@ -0,0 +1,229 @@
+import os
+import random
+import threading
+import time
+
+from utils.metrics.metrics import get_metrics
+
+DEFAULT_RATE = float(os.environ.get("CREATIVEFLOW_RATE_LIMIT_RPS", "5"))
+DEFAULT_BURST = int(os.environ.get("CREATIVEFLOW_RATE_LIMIT_BURST", "10"))
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("CREATIVEFLOW_MAX_CONCURRENCY", "8"))
+DEFAULT_MAX_RETRIES = int(os.environ.get("CREATIVEFLOW_MAX_RETRIES", "4"))
+BASE_RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 30.0
+
+# Status codes that mean the request was not processed and can safely be sent again
+RETRYABLE_STATUS = {408, 429, 502, 503, 504}
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header given in seconds; returns None if absent or not numeric"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error):
+    """
+    Decide whether a failed API call can be retried
+
+    Works with Together SDK errors (status_code/response attributes), errors
+    raised for requests responses and connection failures.
+
+    Args:
+        error (Exception): The exception raised by the call
+
+    Returns:
+        tuple: (retryable, status code or None, Retry-After seconds or None)
+    """
+    status = getattr(error, "status_code", None)
+    retry_after = getattr(error, "retry_after", None)
+    response = getattr(error, "response", None)
+    if retry_after is None and response is not None and hasattr(response, "headers"):
+        retry_after = parse_retry_after(response.headers.get("retry-after"))
+
+    if status is not None:
+        return status in RETRYABLE_STATUS, status, retry_after
+
+    # Imported here so the app can start without loading the HTTP packages
+    import requests
+    from together import APIConnectionError
+
+    if isinstance(error, (APIConnectionError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True, None, None
+    return False, None, None
+
+
+class AdaptiveLimiter:
+    """
+    Token bucket plus AIMD concurrency limit for one (API key, model) pair
+
+    The token bucket caps the request rate. The concurrency limit grows by
+    1/limit after every success (additive increase), halves after every 429
+    (multiplicative decrease) and is left alone by other failures, and a 429's Retry-After pauses all callers, so
+    concurrent sessions back off together instead of failing together.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.tokens = float(burst)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.counters = {"requests": 0, "throttled": 0, "retries": 0, "failures": 0}
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """
+        Block until the rate, concurrency limit and any Retry-After pause allow another request
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.in_flight >= max(1, int(self.limit)):
+                    wait = None
+                elif self.tokens < 1:
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    self.counters["requests"] += 1
+                    return
+                self._cond.wait(wait)
+
+    def release(self, success=True, throttled=False, retry_after=None):
+        """
+        Return a concurrency slot and adjust the limit
+
+        Args:
+            success (bool): The request succeeded; only successes raise the limit
+            throttled (bool): The request was rejected with 429
+            retry_after (float, optional): Seconds the server asked us to wait
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.counters["throttled"] += 1
+                self.limit = max(1.0, self.limit / 2)
+                pause = retry_after if retry_after is not None else 1.0
+                self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+            elif success:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            # Other failures (5xx, timeouts) say nothing about capacity, so the limit stays put
+            self._cond.notify_all()
+
+    def record(self, counter):
+        with self._cond:
+            self.counters[counter] += 1
+
+    def state(self):
+        """
+        Get a snapshot of the limiter for display
+
+        Returns:
+            dict: Current limit, in-flight requests, available tokens, pause and counters
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            return dict(
+                self.counters,
+                concurrency_limit=round(self.limit, 2),
+                in_flight=self.in_flight,
+                tokens=round(self.tokens, 2),
+                paused_for=round(max(0.0, self.blocked_until - now), 1),
+            )
+
+
+def call_with_retry(func, limiter=None, max_retries=DEFAULT_MAX_RETRIES):
+    """
+    Call func under a limiter, retrying retryable failures with jittered exponential backoff
+
+    Args:
+        func (callable): Zero-argument function performing one API call
+        limiter (AdaptiveLimiter, optional): Limiter to acquire before each attempt
+        max_retries (int): Retries after the first attempt
+
+    Returns:
+        Whatever func returns
+    """
+    for attempt in range(max_retries + 1):
+        if limiter:
+            limiter.acquire()
+        try:
+            result = func()
+        except Exception as e:
+            retryable, status, retry_after = classify_error(e)
+            if limiter:
+                limiter.release(success=False, throttled=status == 429, retry_after=retry_after)
+            metrics = get_metrics()
+            status_label = str(status) if status is not None else type(e).__name__
+            if not retryable or attempt == max_retries:
+                if limiter:
+                    limiter.record("failures")
+                metrics.increment("api_failures", status=status_label)
+                raise
+            if limiter:
+                limiter.record("retries")
+            metrics.increment("api_retries", status=status_label)
+            delay = retry_after if retry_after is not None else random.uniform(
+                0, min(MAX_RETRY_DELAY, BASE_RETRY_DELAY * 2 ** attempt)
+            )
+            time.sleep(delay)
+            continue
+        if limiter:
+            limiter.release()
+        return result
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(api_key, model):
+    """
+    Get the process-wide limiter for an API key and model
+
+    Args:
+        api_key (str): Together AI API key
+        model (str): Model name
+
+    Returns:
+        AdaptiveLimiter: The shared limiter
+    """
+    key = (api_key, model)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = AdaptiveLimiter()
+        return limiter
+
+
+def get_limiter_states(api_key=None):
+    """
+    Get the state of every limiter, optionally only those of one API key
+
+    Args:
+        api_key (str, optional): Only include limiters of this key
+
+    Returns:
+        list: Dicts with the limiter state plus "model" and a masked "api_key"
+    """
+    with _limiters_lock:
+        items = list(_limiters.items())
+    return [
+        dict(limiter.state(), model=model, api_key=f"…{key[-4:]}")
+        for (key, model), limiter in items
+        if api_key is None or key == api_key
+    ]
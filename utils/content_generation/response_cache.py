@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from utils.storage.storage import get_data_dir
+
+CACHE_FILENAME = "response_cache.db"
+DEFAULT_TTL = int(os.environ.get("CREATIVEFLOW_CACHE_TTL", str(24 * 3600)))
+DEFAULT_MEMORY_BYTES = int(os.environ.get("CREATIVEFLOW_CACHE_MEMORY_MB", "16")) * 1024 * 1024
+DEFAULT_DISK_BYTES = int(os.environ.get("CREATIVEFLOW_CACHE_DISK_MB", "256")) * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses (accessed_at);
+CREATE INDEX IF NOT EXISTS idx_responses_expires_at ON responses (expires_at);
+"""
+
+
+def cache_key(model, messages, max_tokens, temperature, variant=0):
+    """
+    Build a cache key from the parameters that determine a completion
+
+    Message content is whitespace-normalized so briefs that differ only in
+    indentation or line breaks share an entry. The variant index keeps the
+    alternatives of a multi-variant request apart.
+
+    Args:
+        model (str): Model name
+        messages (list): Chat messages sent to the API
+        max_tokens (int): Completion token limit
+        temperature (float): Sampling temperature
+        variant (int): Index of the variant within a multi-variant request
+
+    Returns:
+        str: SHA-256 hex digest identifying the request
+    """
+    normalized = {
+        "model": model,
+        "messages": [
+            {"role": m["role"], "content": " ".join(m["content"].split())} for m in messages
+        ],
+        "max_tokens": max_tokens,
+        "temperature": round(float(temperature), 4),
+        "variant": variant,
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier prompt -> completion cache with per-entry TTL and LRU eviction
+
+    A byte-bounded in-memory LRU sits in front of a byte-bounded SQLite table;
+    entries evicted from memory stay available on disk until they expire or
+    the disk tier evicts its least recently used rows. The disk tier's size is
+    summed once at startup and tracked from then on.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_memory_bytes=DEFAULT_MEMORY_BYTES,
+                 max_disk_bytes=DEFAULT_DISK_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._disk_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0}
+
+    def _remember(self, key, value, expires_at):
+        # Caller holds self._lock
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old[0])
+        encoded = value.encode("utf-8")
+        if len(encoded) > self.max_memory_bytes:
+            return
+        self._memory[key] = (encoded, expires_at)
+        self._memory_size += len(encoded)
+        while self._memory_size > self.max_memory_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def get(self, key):
+        """
+        Look up a cached completion
+
+        Args:
+            key (str): Key from cache_key()
+
+        Returns:
+            str: Cached completion or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return entry[0].decode("utf-8")
+                self._memory.pop(key)
+                self._memory_size -= len(entry[0])
+
+            row = self._conn.execute(
+                "SELECT value, expires_at, size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    with self._conn:
+                        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._disk_size -= row[2]
+                self.counters["misses"] += 1
+                return None
+
+            with self._conn:
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._remember(key, row[0], row[1])
+            self.counters["disk_hits"] += 1
+            return row[0]
+
+    def put(self, key, value, ttl=None):
+        """
+        Store a completion in both tiers
+
+        Args:
+            key (str): Key from cache_key()
+            value (str): Completion text
+            ttl (int, optional): Lifetime in seconds, defaults to the cache's TTL
+        """
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._remember(key, value, expires_at)
+            with self._conn:
+                replaced = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, value, size, expires_at, now)
+                )
+                self._disk_size += size - (replaced[0] if replaced else 0)
+                expired = self._conn.execute(
+                    "DELETE FROM responses WHERE expires_at <= ? RETURNING size", (now,)
+                ).fetchall()
+                self._disk_size -= sum(old_size for old_size, in expired)
+                if self._disk_size > self.max_disk_bytes:
+                    # Drop least recently used rows until the disk tier fits its budget again
+                    excess, evicted = self._disk_size - self.max_disk_bytes, []
+                    for old_key, old_size in self._conn.execute(
+                        "SELECT key, size FROM responses ORDER BY accessed_at"
+                    ):
+                        if excess <= 0:
+                            break
+                        evicted.append((old_key,))
+                        excess -= old_size
+                        self._disk_size -= old_size
+                    self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def record_bypass(self):
+        with self._lock:
+            self.counters["bypassed"] += 1
+
+    def stats(self):
+        """
+        Get hit/miss counters and tier sizes
+
+        Returns:
+            dict: Counters plus memory_entries, memory_bytes, disk_entries and disk_bytes
+        """
+        with self._lock:
+            disk_entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return dict(
+                self.counters,
+                memory_entries=len(self._memory),
+                memory_bytes=self._memory_size,
+                disk_entries=disk_entries,
+                disk_bytes=self._disk_size,
+            )
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            with self._conn:
+                self._conn.execute("DELETE FROM responses")
+            self._disk_size = 0
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Get the process-wide response cache kept in the data directory
+
+    Returns:
+        ResponseCache: The shared response cache
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(os.path.join(get_data_dir(), CACHE_FILENAME))
+    return _response_cache
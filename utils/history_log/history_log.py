@@ -0,0 +1,311 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from utils.storage.storage import get_data_dir, get_storage, DATETIME_FORMAT
+
+HISTORY_DIRNAME = "history"
+MANIFEST_FILENAME = "segments.jsonl"
+SEGMENT_PREFIX = "history-"
+DEFAULT_SEGMENT_BYTES = int(os.environ.get("CREATIVEFLOW_HISTORY_SEGMENT_MB", "8")) * 1024 * 1024
+DEFAULT_SEGMENT_AGE = int(os.environ.get("CREATIVEFLOW_HISTORY_SEGMENT_DAYS", "7")) * 24 * 3600
+DEFAULT_BUFFER_SIZE = int(os.environ.get("CREATIVEFLOW_HISTORY_BUFFER", "200"))
+# Every INDEX_INTERVAL-th entry of a segment gets a (timestamp, offset) seek index record
+INDEX_INTERVAL = 64
+
+HISTORY_COLUMNS = ("timestamp", "project_id", "project_name", "asset_id", "asset_type", "description")
+
+
+def _encode(item):
+    record = {c: item[c] for c in HISTORY_COLUMNS}
+    record["timestamp"] = record["timestamp"].strftime(DATETIME_FORMAT)
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _decode(line):
+    item = json.loads(line)
+    item["timestamp"] = datetime.strptime(item["timestamp"], DATETIME_FORMAT)
+    return item
+
+
+class _Segment:
+    def __init__(self, path, first=None, last=None, count=0, size=0, opened_at=None):
+        self.path = path
+        self.first = first
+        self.last = last
+        self.count = count
+        self.size = size
+        self.opened_at = opened_at if opened_at is not None else time.time()
+        self.index_times = []
+        self.index_offsets = []
+
+    @property
+    def index_path(self):
+        return self.path + ".idx"
+
+    def load_index(self):
+        self.index_times, self.index_offsets = [], []
+        if not os.path.exists(self.index_path):
+            return
+        valid = 0
+        with open(self.index_path, "rb") as f:
+            for line in f:
+                # A crash can tear the last record, or leave one for an entry that was cut off
+                if not line.endswith(b"\n"):
+                    break
+                timestamp, offset = line.decode("utf-8").rstrip("\n").split("\t")
+                if int(offset) >= self.size:
+                    break
+                self.index_times.append(datetime.strptime(timestamp, DATETIME_FORMAT))
+                self.index_offsets.append(int(offset))
+                valid += len(line)
+        if os.path.getsize(self.index_path) != valid:
+            # Appends add the records for those entries again
+            with open(self.index_path, "r+b") as f:
+                f.truncate(valid)
+
+    def seek_offset(self, start):
+        # Last indexed entry strictly before start; entries before it can be skipped
+        if start is None or not self.index_times:
+            return 0
+        position = bisect.bisect_left(self.index_times, start) - 1
+        return self.index_offsets[position] if position >= 0 else 0
+
+
+class HistoryLog:
+    """
+    Append-only activity log split into rotating JSON Lines segments
+
+    Each entry is appended to the active segment, which is closed and
+    replaced once it grows past max_segment_bytes or has been open longer
+    than max_segment_age seconds. Closed segments are listed with their time
+    range in a manifest and never rewritten, so the log is a complete audit
+    trail. The newest entries stay in a fixed-size ring buffer for the
+    dashboard, and every segment has a sparse timestamp -> byte offset index
+    so a time range is read by seeking instead of scanning whole files.
+    """
+
+    def __init__(self, root, max_segment_bytes=DEFAULT_SEGMENT_BYTES, max_segment_age=DEFAULT_SEGMENT_AGE,
+                 buffer_size=DEFAULT_BUFFER_SIZE):
+        self.root = root
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        self._segments = []
+        self._recent = deque(maxlen=self.buffer_size)
+        self._count = 0
+
+        closed = set()
+        manifest_path = os.path.join(self.root, MANIFEST_FILENAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    segment = _Segment(
+                        os.path.join(self.root, entry["name"]),
+                        first=datetime.strptime(entry["first"], DATETIME_FORMAT),
+                        last=datetime.strptime(entry["last"], DATETIME_FORMAT),
+                        count=entry["count"],
+                        size=entry["size"],
+                    )
+                    self._segments.append(segment)
+                    closed.add(entry["name"])
+                    self._count += segment.count
+
+        # Only the active segment (at most max_segment_bytes) is scanned on start
+        self._active = None
+        names = sorted(n for n in os.listdir(self.root) if n.startswith(SEGMENT_PREFIX) and n.endswith(".jsonl"))
+        for name in names:
+            if name in closed:
+                continue
+            path = os.path.join(self.root, name)
+            segment = _Segment(path)
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn write from a crash; the next append starts on a fresh line
+                    item = _decode(line)
+                    segment.first = segment.first or item["timestamp"]
+                    segment.last = item["timestamp"]
+                    segment.count += 1
+                    segment.size += len(line)
+            if os.path.getsize(path) != segment.size:
+                with open(path, "r+b") as f:
+                    f.truncate(segment.size)
+            if segment.first is not None:
+                # The segment was opened by its first entry. File times can't be used:
+                # ctime and mtime move with every append, so restarts would reset the age.
+                segment.opened_at = segment.first.timestamp()
+            self._segments.append(segment)
+            self._active = segment
+            self._count += segment.count
+
+        for segment in self._segments:
+            segment.load_index()
+
+        # Refill the ring buffer from the newest segments backwards
+        for segment in reversed(self._segments):
+            if len(self._recent) >= self.buffer_size:
+                break
+            items = list(self._iter_segment(segment))
+            self._recent.extendleft(reversed(items[-(self.buffer_size - len(self._recent)):]))
+
+    def _iter_segment(self, segment, start=None, end=None):
+        if not os.path.exists(segment.path):
+            return
+        with open(segment.path, "rb") as f:
+            f.seek(segment.seek_offset(start))
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                item = _decode(line)
+                if start is not None and item["timestamp"] < start:
+                    continue
+                if end is not None and item["timestamp"] >= end:
+                    break
+                yield item
+
+    def _close_active(self):
+        segment = self._active
+        self._active = None
+        if segment is None or segment.count == 0:
+            return
+        entry = {
+            "name": os.path.basename(segment.path),
+            "first": segment.first.strftime(DATETIME_FORMAT),
+            "last": segment.last.strftime(DATETIME_FORMAT),
+            "count": segment.count,
+            "size": segment.size,
+        }
+        with open(os.path.join(self.root, MANIFEST_FILENAME), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def _open_segment(self):
+        number = len(self._segments) + 1
+        segment = _Segment(os.path.join(self.root, f"{SEGMENT_PREFIX}{number:08d}.jsonl"))
+        self._segments.append(segment)
+        self._active = segment
+        return segment
+
+    def append(self, item):
+        """
+        Append an entry to the log
+
+        Args:
+            item (dict): History item with the keys in HISTORY_COLUMNS; timestamp is a datetime
+        """
+        line = _encode(item)
+        with self._lock:
+            segment = self._active
+            if segment is not None and segment.count and (
+                segment.size + len(line) > self.max_segment_bytes
+                or time.time() - segment.opened_at > self.max_segment_age
+            ):
+                self._close_active()
+                segment = None
+            if segment is None:
+                segment = self._open_segment()
+
+            with open(segment.path, "ab") as f:
+                f.write(line)
+            if segment.count % INDEX_INTERVAL == 0:
+                with open(segment.index_path, "a", encoding="utf-8") as f:
+                    f.write(f"{item['timestamp'].strftime(DATETIME_FORMAT)}\t{segment.size}\n")
+                segment.index_times.append(item["timestamp"])
+                segment.index_offsets.append(segment.size)
+
+            segment.first = segment.first or item["timestamp"]
+            segment.last = item["timestamp"]
+            segment.count += 1
+            segment.size += len(line)
+            self._count += 1
+            self._recent.append({c: item[c] for c in HISTORY_COLUMNS})
+
+    def recent(self, limit=5):
+        """
+        Get the newest entries
+
+        Args:
+            limit (int): Maximum number of entries
+
+        Returns:
+            list: History items, newest first
+        """
+        with self._lock:
+            if limit <= len(self._recent) or len(self._recent) == self._count:
+                return [dict(item) for item in list(reversed(self._recent))[:limit]]
+        return list(reversed(self.read_range()))[:limit]
+
+    def read_range(self, start=None, end=None):
+        """
+        Read the entries logged in a time range
+
+        Only segments overlapping the range are opened, and each is entered
+        at the closest seek index record before start.
+
+        Args:
+            start (datetime, optional): Include entries at or after this time
+            end (datetime, optional): Include entries before this time
+
+        Returns:
+            list: History items, oldest first
+        """
+        with self._lock:
+            segments = [
+                s for s in self._segments
+                if s.count and (start is None or s.last >= start) and (end is None or s.first < end)
+            ]
+        items = []
+        for segment in segments:
+            items.extend(self._iter_segment(segment, start, end))
+        return items
+
+    def count(self):
+        return self._count
+
+    def clear(self):
+        """
+        Delete every segment, index and the manifest
+        """
+        with self._lock:
+            for name in os.listdir(self.root):
+                if name.startswith(SEGMENT_PREFIX) or name == MANIFEST_FILENAME:
+                    os.remove(os.path.join(self.root, name))
+            self._load()
+
+
+_history_log = None
+_history_log_lock = threading.Lock()
+
+
+def get_history_log():
+    """
+    Get the process-wide history log kept in the data directory
+
+    History rows left in the storage backend by earlier versions are moved
+    into the log the first time it is opened.
+
+    Returns:
+        HistoryLog: The shared history log
+    """
+    global _history_log
+    if _history_log is None:
+        with _history_log_lock:
+            if _history_log is None:
+                history_log = HistoryLog(os.path.join(get_data_dir(), HISTORY_DIRNAME))
+                backend = getattr(get_storage(), "backend", None)
+                if hasattr(backend, "read_legacy_history"):
+                    for item in backend.read_legacy_history():
+                        history_log.append(item)
+                    backend.drop_legacy_history()
+                _history_log = history_log
+    return _history_log
@@ -0,0 +1,412 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from utils.storage.storage import get_data_dir, get_storage, DATETIME_FORMAT
+from utils.blob_store.blob_store import get_blob_store, is_blob_ref
+
+HASH_FILENAME = "image_hashes.db"
+# dHash compares horizontally adjacent pixels of a (HASH_SIZE + 1) x HASH_SIZE grayscale grid
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+DEFAULT_DUPLICATE_DISTANCE = int(os.environ.get("CREATIVEFLOW_DUPLICATE_DISTANCE", "5"))
+DEFAULT_SIMILAR_DISTANCE = int(os.environ.get("CREATIVEFLOW_SIMILAR_DISTANCE", "12"))
+BACKFILL_BATCH_SIZE = 500
+# Bumped when hashes are computed differently; older hashes are dropped and recomputed.
+# 1: always hash the original image (earlier versions hashed a preview when one existed)
+HASH_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_hash (
+    asset_id TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    hash INTEGER,
+    created_at TEXT
+);
+"""
+
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(values):
+    # np.bitwise_count needs NumPy 2; fall back to a per-byte lookup table
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values).astype(np.int64)
+    return _POPCOUNT_TABLE[values.view(np.uint8).reshape(-1, 8)].sum(axis=1, dtype=np.int64)
+
+
+def _to_signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def _created_at(asset):
+    # Stored as text in DATETIME_FORMAT, which sorts chronologically
+    value = asset.get("created_at")
+    return value.strftime(DATETIME_FORMAT) if isinstance(value, datetime) else value
+
+
+def compute_dhash(fp):
+    """
+    Compute the 64-bit difference hash of an image
+
+    The image is shrunk to a 9x8 grayscale grid and every bit records whether
+    a pixel is brighter than its left neighbour, so re-encoding, resizing and
+    small edits change only a few bits.
+
+    Args:
+        fp: Path or file object of the image
+
+    Returns:
+        int: Unsigned 64-bit hash
+    """
+    from PIL import Image
+
+    with Image.open(fp) as image:
+        image.draft("L", (HASH_SIZE * 16, HASH_SIZE * 16))
+        grid = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+    pixels = np.asarray(grid, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hash_stored_image(digest):
+    """
+    Compute the hash of an image in the blob store
+
+    Always the original is hashed, never a rendition, so an image gets the
+    same hash whether or not its previews have been rendered yet.
+
+    Args:
+        digest (str): SHA-256 digest of the image blob
+
+    Returns:
+        int: Unsigned 64-bit hash
+    """
+    with get_blob_store().open(digest) as blob:
+        return compute_dhash(blob)
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+
+def _near_pairs(hashes, max_distance):
+    """
+    Find all pairs of hashes within max_distance bits using multi-index hashing
+
+    The 64 bits are split into max_distance + 1 chunks. Two hashes that differ
+    in at most max_distance bits agree exactly on at least one chunk, so only
+    hashes sharing a chunk value are compared. Per chunk the hashes are sorted
+    by chunk value and each one is compared with the k-th next hash of the same
+    run for k = 1, 2, ..., one vectorized step per k.
+
+    Args:
+        hashes (numpy.ndarray): Distinct uint64 hashes
+        max_distance (int): Maximum Hamming distance
+
+    Returns:
+        tuple: Two index arrays (left, right) of the matching pairs; a pair may appear more than once
+    """
+    chunks = min(max_distance + 1, HASH_BITS)
+    bounds = np.linspace(0, HASH_BITS, chunks + 1).astype(np.uint64)
+    lefts, rights = [], []
+    for low, high in zip(bounds[:-1], bounds[1:]):
+        keys = (hashes >> low) & np.uint64((1 << int(high - low)) - 1)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        # End (exclusive) of the run of equal keys each position belongs to
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        run_end = np.repeat(np.r_[starts[1:], len(keys)], np.diff(np.r_[starts, len(keys)]))
+        active = np.flatnonzero(run_end - np.arange(len(keys)) > 1)
+        step = 1
+        while len(active):
+            left, right = order[active], order[active + step]
+            close = _popcount(hashes[left] ^ hashes[right]) <= max_distance
+            lefts.append(left[close])
+            rights.append(right[close])
+            step += 1
+            active = active[run_end[active] - active > step]
+    if not lefts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(lefts), np.concatenate(rights)
+
+
+class ImageHashIndex:
+    """
+    Perceptual hashes of image assets for near-duplicate and similarity search
+
+    Each image gets a 64-bit dHash once, when it is saved. The hashes are kept
+    in SQLite and mirrored in NumPy arrays, so a similarity query is a single
+    vectorized XOR + popcount over every hash, and a duplicate scan compares
+    only hashes that share a multi-index chunk instead of every pair.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(image_hash)")}
+        if "created_at" not in columns:
+            # Filled in for existing rows by backfill
+            with self._conn:
+                self._conn.execute("ALTER TABLE image_hash ADD COLUMN created_at TEXT")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < HASH_VERSION:
+            # Stale hashes can't be compared with new ones; backfill recomputes them
+            with self._conn:
+                self._conn.execute("DELETE FROM image_hash")
+            self._conn.execute(f"PRAGMA user_version = {HASH_VERSION}")
+        self._ids = []
+        self._projects = []
+        self._hashes = []
+        self._created = []
+        self._positions = {}
+        self._arrays = None
+        self._groups = {}
+        self._load()
+
+    def _load(self):
+        self._ids, self._projects, self._hashes, self._created, self._positions = [], [], [], [], {}
+        self._index(self._conn.execute(
+            "SELECT asset_id, project_id, hash, created_at FROM image_hash WHERE hash IS NOT NULL ORDER BY rowid"
+        ))
+
+    def _index(self, rows):
+        # Called with the lock held (or from __init__)
+        for asset_id, project_id, value, created_at in rows:
+            if value is None:
+                continue
+            position = self._positions.get(asset_id)
+            if position is None:
+                self._positions[asset_id] = len(self._ids)
+                self._ids.append(asset_id)
+                self._projects.append(project_id)
+                self._hashes.append(value)
+                self._created.append(created_at)
+            else:
+                self._projects[position] = project_id
+                self._hashes[position] = value
+                self._created[position] = created_at
+        self._arrays = None
+        self._groups = {}
+
+    def _snapshot(self):
+        # Called with the lock held; the arrays are rebuilt only after new hashes were added
+        if self._arrays is None:
+            self._arrays = (
+                list(self._ids),
+                np.array(self._projects, dtype=object),
+                np.array(self._hashes, dtype=np.int64).view(np.uint64),
+                list(self._created),
+            )
+        return self._arrays
+
+    def add(self, asset):
+        """
+        Hash an image asset and store the hash
+
+        Args:
+            asset (dict): Image asset whose content is a blob digest
+
+        Returns:
+            int: The unsigned hash
+        """
+        value = hash_stored_image(asset["content"])
+        self._store([(asset["id"], asset["project_id"], _to_signed(value), _created_at(asset))])
+        return value
+
+    def add_many(self, assets):
+        """
+        Hash several image assets; images that are not stored blobs or can't be decoded are skipped
+
+        Args:
+            assets (list): Assets of any type
+
+        Returns:
+            int: Number of images hashed
+        """
+        rows = []
+        for asset in assets:
+            value = None
+            if asset["type"] == "image" and is_blob_ref(asset["content"]):
+                try:
+                    value = _to_signed(hash_stored_image(asset["content"]))
+                except (OSError, ValueError):
+                    pass
+            if asset["type"] == "image":
+                rows.append((asset["id"], asset["project_id"], value, _created_at(asset)))
+        self._store(rows)
+        return sum(1 for row in rows if row[2] is not None)
+
+    def _store(self, rows):
+        if not rows:
+            return
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO image_hash (asset_id, project_id, hash, created_at) VALUES (?, ?, ?, ?)", rows
+                )
+            self._index(rows)
+
+    def known_ids(self):
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT asset_id FROM image_hash")}
+
+    def missing_created_at(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM image_hash WHERE created_at IS NULL").fetchone()[0]
+
+    def _set_created_at(self, assets):
+        rows = [(_created_at(asset), asset["id"]) for asset in assets]
+        if not rows:
+            return
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("UPDATE image_hash SET created_at = ? WHERE asset_id = ?", rows)
+            for created_at, asset_id in rows:
+                position = self._positions.get(asset_id)
+                if position is not None:
+                    self._created[position] = created_at
+            self._arrays = None
+            self._groups = {}
+
+    def size(self):
+        with self._lock:
+            return len(self._ids)
+
+    def similar(self, asset_id, max_distance=DEFAULT_SIMILAR_DISTANCE, limit=12):
+        """
+        Find the images closest to an image asset
+
+        Args:
+            asset_id (str): ID of the query image
+            max_distance (int): Maximum Hamming distance in bits
+            limit (int): Maximum number of results
+
+        Returns:
+            list: (asset_id, distance) tuples, closest first, without the query image
+        """
+        with self._lock:
+            ids, _, hashes, _ = self._snapshot()
+            position = self._positions.get(asset_id)
+        if position is None:
+            return []
+        distances = _popcount(hashes ^ hashes[position])
+        distances[position] = HASH_BITS + 1
+        candidates = np.flatnonzero(distances <= max_distance)
+        best = candidates[np.argsort(distances[candidates], kind="stable")[:limit]]
+        return [(ids[i], int(distances[i])) for i in best]
+
+    def duplicate_groups(self, project_id=None, max_distance=DEFAULT_DUPLICATE_DISTANCE):
+        """
+        Group images whose hashes are within max_distance bits of each other
+
+        Grouping is transitive: two images are in the same group if a chain of
+        near-duplicates connects them. Results are cached until hashes change.
+
+        Args:
+            project_id (str, optional): Only group images of this project
+            max_distance (int): Maximum Hamming distance in bits
+
+        Returns:
+            list: Groups of two or more asset ids, most recently created first
+        """
+        key = (project_id, max_distance)
+        with self._lock:
+            if key in self._groups:
+                return self._groups[key]
+            ids, projects, hashes, created = self._snapshot()
+        positions = np.arange(len(ids)) if project_id is None else np.flatnonzero(projects == project_id)
+
+        # Identical hashes are merged first so large sets of exact copies cost nothing extra
+        unique, inverse = np.unique(hashes[positions], return_inverse=True)
+        left, right = _near_pairs(unique, max_distance)
+        union_find = _UnionFind(len(unique))
+        for a, b in zip(left.tolist(), right.tolist()):
+            union_find.union(a, b)
+
+        members = {}
+        for position, unique_index in zip(positions.tolist(), inverse.ravel().tolist()):
+            members.setdefault(union_find.find(unique_index), []).append(position)
+        groups = []
+        for group in members.values():
+            if len(group) > 1:
+                # Imported and backfilled images are hashed out of creation order
+                group.sort(key=lambda p: (created[p] or "", p), reverse=True)
+                groups.append([ids[p] for p in group])
+        groups.sort(key=len, reverse=True)
+
+        with self._lock:
+            if self._arrays is not None and self._arrays[0] is ids:
+                self._groups[key] = groups
+        return groups
+
+    def clear(self):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM image_hash")
+            self._load()
+
+    def backfill(self, storage):
+        """
+        Hash stored images that have no hash yet, e.g. ones saved before hashing existed
+
+        Hashes recorded before creation times were kept get theirs from the stored asset.
+
+        Args:
+            storage (StorageBackend): Storage to read the image assets from
+        """
+        known = self.known_ids()
+        update_created = self.missing_created_at() > 0
+        offset = 0
+        while True:
+            batch = storage.get_assets(asset_type="image", offset=offset, limit=BACKFILL_BATCH_SIZE)
+            self.add_many([asset for asset in batch if asset["id"] not in known])
+            if update_created:
+                self._set_created_at([asset for asset in batch if asset["id"] in known])
+            if len(batch) < BACKFILL_BATCH_SIZE:
+                return
+            offset += len(batch)
+
+
+_image_hash_index = None
+_image_hash_index_lock = threading.Lock()
+
+
+def get_image_hash_index():
+    """
+    Get the process-wide image hash index kept in the data directory
+
+    Images saved before the index existed are hashed the first time it is opened.
+
+    Returns:
+        ImageHashIndex: The shared image hash index
+    """
+    global _image_hash_index
+    if _image_hash_index is None:
+        with _image_hash_index_lock:
+            if _image_hash_index is None:
+                image_hash_index = ImageHashIndex(os.path.join(get_data_dir(), HASH_FILENAME))
+                storage = get_storage()
+                if (len(image_hash_index.known_ids()) < storage.count_assets(asset_type="image")
+                        or image_hash_index.missing_created_at()):
+                    image_hash_index.backfill(storage)
+                _image_hash_index = image_hash_index
+    return _image_hash_index
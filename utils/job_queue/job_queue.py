@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from utils.storage.storage import get_data_dir
+from utils.content_generation.content_generation import (
+    request_text_variants, request_image_variants, DEFAULT_TEXT_MODEL, DEFAULT_IMAGE_MODEL
+)
+
+JOBS_FILENAME = "jobs.db"
+DEFAULT_WORKERS = int(os.environ.get("CREATIVEFLOW_JOB_WORKERS", "4"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    project_id TEXT,
+    params TEXT NOT NULL,
+    state TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    dismissed INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (state);
+"""
+# Created after the owner column is added to job tables from earlier versions
+OWNER_INDEX = "CREATE INDEX IF NOT EXISTS idx_jobs_owner_created ON jobs (owner, dismissed, created_at)"
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def job_owner(api_key):
+    """
+    Derive the owner ID jobs are listed under from an API key
+
+    Jobs follow the key rather than the Streamlit session, so they are still
+    listed after a page reload; the key itself is never written to disk.
+
+    Args:
+        api_key (str): Together AI API key
+
+    Returns:
+        str: Owner ID
+    """
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:32]
+
+
+def _run_text_job(api_key, params):
+    return request_text_variants(
+        api_key, params["prompt"], params.get("count", 1),
+        model=params.get("model") or DEFAULT_TEXT_MODEL,
+        use_cache=params.get("use_cache", True)
+    )
+
+
+def _run_image_job(api_key, params):
+    return request_image_variants(
+        api_key, params["prompt"], params.get("count", 1),
+        model=params.get("model") or DEFAULT_IMAGE_MODEL,
+        width=params.get("width", 1024),
+        height=params.get("height", 1024)
+    )
+
+
+JOB_HANDLERS = {
+    "text": _run_text_job,
+    "image": _run_image_job,
+}
+
+
+class JobQueue:
+    """
+    Background generation jobs executed by a worker thread pool
+
+    Job state (queued/running/done/failed) and results live in SQLite so a
+    session opened after a page reload can pick up finished work. Jobs are
+    listed only to their owner (see job_owner) since prompts and results are
+    private to whoever submitted them. API keys are held in memory only and
+    never written to disk; jobs that were still pending when the process
+    stopped are marked failed on the next start.
+    """
+
+    def __init__(self, path, workers=DEFAULT_WORKERS):
+        self.path = path
+        self._lock = threading.Lock()
+        self._api_keys = {}
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        with self._conn:
+            if "owner" not in columns:
+                # Jobs from before owners were recorded stay unlisted
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            self._conn.execute("DROP INDEX IF EXISTS idx_jobs_dismissed_created")
+            self._conn.execute(OWNER_INDEX)
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, finished_at = ? WHERE state IN (?, ?)",
+                (FAILED, "Interrupted by an application restart", _now(), *ACTIVE_STATES)
+            )
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="creativeflow-job")
+
+    def _update(self, job_id, **fields):
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    @staticmethod
+    def _row_to_job(row):
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def submit(self, kind, params, api_key, project_id=None):
+        """
+        Queue a generation job and return immediately
+
+        Args:
+            kind (str): Job kind, a key of JOB_HANDLERS ('text' or 'image')
+            params (dict): JSON-serializable handler parameters (prompt, count, model, ...)
+            api_key (str): Together AI API key, kept in memory only; also determines the job's owner
+            project_id (str, optional): Project the results are meant for
+
+        Returns:
+            str: Job ID
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = str(uuid.uuid4())
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, owner, project_id, params, state, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, job_owner(api_key), project_id, json.dumps(params), QUEUED, _now())
+            )
+            self._api_keys[job_id] = api_key
+        self._executor.submit(self._run, job_id, kind, params)
+        return job_id
+
+    def _run(self, job_id, kind, params):
+        api_key = self._api_keys.pop(job_id, None)
+        self._update(job_id, state=RUNNING, started_at=_now())
+        try:
+            results, errors = JOB_HANDLERS[kind](api_key, params)
+        except Exception as e:
+            results, errors = [], [e]
+
+        error = "; ".join(str(e) for e in errors) or None
+        if results:
+            self._update(job_id, state=DONE, result=json.dumps({"variants": results}), error=error, finished_at=_now())
+        else:
+            self._update(job_id, state=FAILED, error=error or "No results returned", finished_at=_now())
+
+    def get(self, job_id):
+        """
+        Get a job by ID
+
+        Args:
+            job_id (str): Job ID
+
+        Returns:
+            dict: Job with decoded params and result, or None if not found
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list_jobs(self, owner, project_id=None, limit=10, include_dismissed=False):
+        """
+        List an owner's most recent jobs
+
+        Args:
+            owner (str): Owner ID from job_owner()
+            project_id (str, optional): Only list jobs submitted for this project
+            limit (int): Maximum number of jobs
+            include_dismissed (bool): Also return jobs the user has dismissed
+
+        Returns:
+            list: Jobs, newest first
+        """
+        conditions, params = ["owner = ?"], [owner]
+        if project_id is not None:
+            conditions.append("project_id = ?")
+            params.append(project_id)
+        if not include_dismissed:
+            conditions.append("dismissed = 0")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM jobs WHERE {' AND '.join(conditions)} ORDER BY created_at DESC, rowid DESC LIMIT ?",
+                (*params, limit)
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def count_active(self, owner):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE owner = ? AND state IN (?, ?)", (owner, *ACTIVE_STATES)
+            ).fetchone()[0]
+
+    def dismiss(self, job_id):
+        """
+        Hide a finished job from the job list
+
+        Args:
+            job_id (str): Job ID
+        """
+        self._update(job_id, dismissed=1)
+
+    def clear(self):
+        """
+        Delete every job; jobs still running finish without being listed
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM jobs")
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """
+    Get the process-wide job queue shared by all Streamlit sessions
+
+    Returns:
+        JobQueue: The shared job queue
+    """
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue(os.path.join(get_data_dir(), JOBS_FILENAME))
+    return _job_queue
@@ -0,0 +1,296 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+METRICS_PORT = os.environ.get("CREATIVEFLOW_METRICS_PORT")
+METRICS_FILE = os.environ.get("CREATIVEFLOW_METRICS_FILE")
+METRICS_FILE_INTERVAL = float(os.environ.get("CREATIVEFLOW_METRICS_INTERVAL", "15"))
+METRIC_PREFIX = "creativeflow"
+# Recent durations kept per series for the percentiles shown in the app
+SAMPLE_SIZE = 2048
+# Upper bounds in seconds of the exported histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+class _Timing:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        self.samples.append(seconds)
+
+
+class Metrics:
+    """
+    Process-wide span timings and counters
+
+    A span is a named, labelled duration, e.g. one API call or one tab's part
+    of a script run. Every series keeps its count and sum, cumulative histogram
+    buckets for export, and its most recent SAMPLE_SIZE durations for the
+    percentiles in the Diagnostics panel. Recording takes one lock and no I/O,
+    so spans can sit on hot paths and in worker threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._counters = {}
+        self.started_at = time.time()
+        # Last failure of the endpoint or file export, shown in the Diagnostics panel
+        self.export_error = None
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def observe(self, name, seconds, **labels):
+        """
+        Record a duration
+
+        Args:
+            name (str): Span name, e.g. 'api_request'
+            seconds (float): Duration
+            **labels: Label values, e.g. kind='text'
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                timing = self._timings[key] = _Timing()
+            timing.observe(seconds)
+
+    @contextmanager
+    def span(self, name, **labels):
+        """
+        Time a block of code; the duration is recorded even if the block raises
+
+        Args:
+            name (str): Span name
+            **labels: Label values
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def increment(self, name, amount=1, **labels):
+        """
+        Add to a counter
+
+        Args:
+            name (str): Counter name, e.g. 'api_retries'
+            amount (int): Amount to add
+            **labels: Label values
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def timings(self):
+        """
+        Summarize every span series
+
+        Returns:
+            list: Dicts with name, labels, count, total_s and mean/p50/p95/p99/max in ms
+                over the recent samples, sorted by name and labels
+        """
+        with self._lock:
+            items = [(key, timing.count, timing.total, list(timing.samples)) for key, timing in self._timings.items()]
+        rows = []
+        for (name, labels), count, total, samples in sorted(items):
+            samples_ms = np.array(samples) * 1000
+            p50, p95, p99 = np.percentile(samples_ms, [50, 95, 99])
+            rows.append({
+                "name": name,
+                "labels": dict(labels),
+                "count": count,
+                "total_s": round(total, 3),
+                "mean_ms": round(total / count * 1000, 2),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "max_ms": round(float(samples_ms.max()), 2),
+            })
+        return rows
+
+    def counters(self):
+        """
+        Get every counter
+
+        Returns:
+            list: Dicts with name, labels and value, sorted by name and labels
+        """
+        with self._lock:
+            items = sorted(self._counters.items())
+        return [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in items]
+
+    def render(self, openmetrics=False):
+        """
+        Render all metrics in the Prometheus text exposition format
+
+        Spans become <prefix>_<name>_seconds histograms and counters
+        <prefix>_<name>_total counters.
+
+        Args:
+            openmetrics (bool): Render OpenMetrics text instead (terminated by '# EOF')
+
+        Returns:
+            str: The exposition text
+        """
+        with self._lock:
+            timings = sorted(
+                (key, timing.count, timing.total, list(timing.buckets)) for key, timing in self._timings.items()
+            )
+            counters = sorted(self._counters.items())
+
+        lines = []
+        family = None
+        for (name, labels), count, total, buckets in timings:
+            metric = f"{METRIC_PREFIX}_{name}_seconds"
+            if metric != family:
+                family = metric
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS + (float("inf"),), buckets + [count - sum(buckets)]):
+                cumulative += bucket
+                lines.append(f"{metric}_bucket{_format_labels(labels, [('le', _format_bound(bound))])} {cumulative}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {total!r}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+
+        for (name, labels), value in counters:
+            metric = f"{METRIC_PREFIX}_{name}"
+            if metric != family:
+                family = metric
+                # OpenMetrics names the counter family without the _total suffix of its sample
+                lines.append(f"# TYPE {metric if openmetrics else metric + '_total'} counter")
+            lines.append(f"{metric}_total{_format_labels(labels)} {value}")
+
+        uptime = f"{METRIC_PREFIX}_uptime_seconds"
+        lines.append(f"# TYPE {uptime} gauge")
+        lines.append(f"{uptime} {time.time() - self.started_at:.3f}")
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, openmetrics=True):
+        """
+        Write the metrics to a file, replacing it atomically so scrapers never read a partial file
+
+        Args:
+            path (str): Output file, e.g. for node_exporter's textfile collector
+            openmetrics (bool): Write OpenMetrics rather than Prometheus text
+        """
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.render(openmetrics=openmetrics))
+        os.replace(temp_path, path)
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+            self.started_at = time.time()
+
+
+def _serve(metrics, port):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+            body = metrics.render(openmetrics=openmetrics).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("", int(port)), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="creativeflow-metrics", daemon=True).start()
+    return server
+
+
+def _write_periodically(metrics, path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            metrics.write(path)
+            metrics.export_error = None
+        except OSError as e:
+            metrics.export_error = f"Could not write metrics to {path}: {e}"
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    Get the process-wide metrics shared by all Streamlit sessions and worker threads
+
+    On first use this starts the /metrics endpoint if CREATIVEFLOW_METRICS_PORT
+    is set, and the periodic OpenMetrics file export if CREATIVEFLOW_METRICS_FILE is set.
+
+    Returns:
+        Metrics: The shared metrics
+    """
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                metrics = Metrics()
+                if METRICS_PORT:
+                    try:
+                        _serve(metrics, METRICS_PORT)
+                    except OSError as e:
+                        # Another process (e.g. a second app instance) may already hold the port
+                        metrics.export_error = f"Could not serve metrics on port {METRICS_PORT}: {e}"
+                if METRICS_FILE:
+                    threading.Thread(
+                        target=_write_periodically, args=(metrics, METRICS_FILE, METRICS_FILE_INTERVAL),
+                        name="creativeflow-metrics-file", daemon=True
+                    ).start()
+                _metrics = metrics
+    return _metrics
+
+
+def span(name, **labels):
+    """Time a block of code with the shared metrics; see Metrics.span"""
+    return get_metrics().span(name, **labels)
@@ -0,0 +1,500 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import zipfile
+from datetime import datetime
+
+from utils.storage.storage import get_storage, get_data_dir, now
+from utils.blob_store.blob_store import get_blob_store, is_blob_ref
+from utils.search_index.search_index import get_search_index
+from utils.image_hash.image_hash import get_image_hash_index
+
+EXPORT_DIRNAME = "exports"
+IMPORT_DIRNAME = "imports"
+ARCHIVE_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+COPY_CHUNK_SIZE = 1024 * 1024
+EXPORT_BATCH_SIZE = 200
+IMPORT_BATCH_SIZE = 500
+READ_CHUNK_SIZE = 1024 * 1024
+
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF8", "gif"),
+)
+
+# One lock per project, so exports of different projects run side by side
+_export_locks = {}
+_export_locks_lock = threading.Lock()
+
+
+def _export_lock(project_id):
+    with _export_locks_lock:
+        return _export_locks.setdefault(project_id, threading.Lock())
+
+
+def _image_extension(header):
+    for signature, extension in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return extension
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    return "bin"
+
+
+def project_version(project_id):
+    """
+    Get a fingerprint that changes whenever a project or its asset list changes
+
+    Args:
+        project_id (str): ID of the project
+
+    Returns:
+        str: Version hash, or None if the project doesn't exist
+    """
+    storage = get_storage()
+    project = storage.get_project(project_id)
+    if project is None:
+        return None
+    newest = storage.get_assets(project_id=project_id, limit=1, newest_first=True)
+    state = {
+        "project": project,
+        "assets": storage.count_assets(project_id=project_id),
+        "newest": newest[0]["id"] if newest else None,
+    }
+    return hashlib.sha256(json.dumps(state, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _iter_project_assets(storage, project_id):
+    # Page through the assets, oldest first, so only one batch of text content is held at a time
+    offset = 0
+    while True:
+        batch = storage.get_assets(project_id=project_id, offset=offset, limit=EXPORT_BATCH_SIZE)
+        yield from batch
+        if len(batch) < EXPORT_BATCH_SIZE:
+            return
+        offset += len(batch)
+
+
+def _write_archive(path, project_id):
+    storage = get_storage()
+    blob_store = get_blob_store()
+    project = storage.get_project(project_id)
+    manifest = {"format": ARCHIVE_FORMAT_VERSION, "project": project, "assets": []}
+
+    with zipfile.ZipFile(path, "w") as archive:
+        for asset in _iter_project_assets(storage, project_id):
+            entry = {k: v for k, v in asset.items() if k not in ("project_id", "project_name", "content")}
+            content = asset["content"]
+
+            if asset["type"] != "image":
+                entry["file"] = f"texts/{asset['id']}.txt"
+                archive.writestr(entry["file"], content, compress_type=zipfile.ZIP_DEFLATED)
+            elif is_blob_ref(content):
+                # Copy the blob in chunks; images are already compressed so they are stored as-is
+                entry["sha256"] = content
+                with blob_store.open(content) as blob:
+                    entry["file"] = f"images/{asset['id']}.{_image_extension(blob[:12])}"
+                    info = zipfile.ZipInfo(entry["file"], date_time=asset["created_at"].timetuple()[:6])
+                    with archive.open(info, "w", force_zip64=True) as target:
+                        for start in range(0, len(blob), COPY_CHUNK_SIZE):
+                            target.write(blob[start:start + COPY_CHUNK_SIZE])
+            elif content.startswith("http"):
+                entry["url"] = content
+            else:
+                data = base64.b64decode(content)
+                entry["file"] = f"images/{asset['id']}.{_image_extension(data[:12])}"
+                archive.writestr(entry["file"], data)
+
+            manifest["assets"].append(entry)
+
+        archive.writestr(
+            MANIFEST_NAME,
+            json.dumps(manifest, separators=(",", ":"), default=str),
+            compress_type=zipfile.ZIP_DEFLATED
+        )
+
+
+def export_project_archive(project_id):
+    """
+    Export a project as a ZIP archive on disk
+
+    The archive holds a compact manifest.json with the project and asset
+    metadata, each text asset as texts/<id>.txt and each stored image as raw
+    bytes under images/. It is written entry by entry, so memory use doesn't
+    grow with the project, and kept in the export cache until the project
+    changes, so exporting an unchanged project again costs nothing.
+
+    Args:
+        project_id (str): ID of the project to export
+
+    Returns:
+        str: Path of the ZIP file or None if the project doesn't exist
+    """
+    version = project_version(project_id)
+    if version is None:
+        return None
+
+    export_dir = os.path.join(get_data_dir(), EXPORT_DIRNAME)
+    path = os.path.join(export_dir, f"{project_id}-{version[:16]}.zip")
+    with _export_lock(project_id):
+        if os.path.exists(path):
+            return path
+
+        os.makedirs(export_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=export_dir, prefix=".tmp-", suffix=".zip")
+        os.close(fd)
+        try:
+            _write_archive(tmp_path, project_id)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # Earlier versions of this project's archive are stale now
+        for name in os.listdir(export_dir):
+            if name.startswith(f"{project_id}-") and name != os.path.basename(path):
+                os.remove(os.path.join(export_dir, name))
+    return path
+
+
+def clear_export_cache():
+    """
+    Delete every cached export archive, waiting for exports in progress
+    """
+    # Holding the registry lock keeps new exports from starting meanwhile
+    with _export_locks_lock:
+        locks = list(_export_locks.values())
+        for lock in locks:
+            lock.acquire()
+        try:
+            shutil.rmtree(os.path.join(get_data_dir(), EXPORT_DIRNAME), ignore_errors=True)
+        finally:
+            for lock in locks:
+                lock.release()
+
+
+def list_import_files():
+    """
+    List the project files placed in the data directory's imports folder
+
+    Archives too large to upload through the browser can be copied there and
+    imported from the server side.
+
+    Returns:
+        list: Paths of .json and .zip files, sorted by name
+    """
+    import_dir = os.path.join(get_data_dir(), IMPORT_DIRNAME)
+    os.makedirs(import_dir, exist_ok=True)
+    return [
+        os.path.join(import_dir, name) for name in sorted(os.listdir(import_dir))
+        if name.lower().endswith((".json", ".zip"))
+    ]
+
+
+class _JSONStream:
+    """
+    Minimal incremental JSON reader for project documents
+
+    Top-level objects and arrays are walked key by key and item by item,
+    and only the value being decoded is held in memory.
+    """
+
+    def __init__(self, text_file):
+        self._file = text_file
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self._file.read(READ_CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"Invalid project file: expected '{char}'")
+        self._pos += 1
+
+    def _separator(self, closing):
+        char = self._peek()
+        self._pos += 1
+        if char == closing:
+            return False
+        if char != ",":
+            raise ValueError(f"Invalid project file: expected ',' or '{closing}'")
+        return True
+
+    def value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A value ending exactly at the buffer end may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise ValueError("Invalid project file: truncated or malformed JSON")
+            self._fill()
+
+    def iter_object(self):
+        """Yield the keys of an object; the caller reads each value before resuming"""
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(":")
+            yield key
+            if not self._separator("}"):
+                return
+
+    def iter_array(self):
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if not self._separator("]"):
+                return
+
+
+def _iter_document(stream):
+    # Yields ("project", dict) once, then ("asset", dict) for each asset. Handles
+    # both export_project() JSON (project fields at the top level) and archive
+    # manifests (project fields under "project").
+    project = {}
+    for key in stream.iter_object():
+        if key == "assets" and project is not None:
+            yield "project", project
+            project = None
+            for asset in stream.iter_array():
+                yield "asset", asset
+        elif key == "project" and project is not None:
+            project.update(stream.value())
+        else:
+            value = stream.value()
+            if project is not None:
+                project[key] = value
+    if project is not None:
+        yield "project", project
+
+
+def _parse_datetime(value):
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).replace(microsecond=0)
+        except ValueError:
+            pass
+    return now()
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _asset_hash(asset_type, content):
+    # Content hash used to recognise an asset that is already in the project
+    if asset_type == "image" and is_blob_ref(content):
+        return content
+    if asset_type == "image" and not content.startswith("http"):
+        return _sha256(base64.b64decode(content))
+    return _sha256(content.encode("utf-8"))
+
+
+def _iter_member(archive, name):
+    with archive.open(name) as member:
+        while True:
+            chunk = member.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _hash_chunks(chunks):
+    hasher = hashlib.sha256()
+    for chunk in chunks:
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def import_project_archive(source, dry_run=False, progress=None):
+    """
+    Import a project from an export_project() JSON file or an exported ZIP archive
+
+    The file is parsed incrementally, so only one asset is decoded at a time.
+    A project whose id already exists receives the new assets; otherwise it
+    is created with its original id. Assets whose content hash matches an
+    asset already in the project (or earlier in the file) are skipped, and
+    the rest are inserted in batches of IMPORT_BATCH_SIZE. Does not touch
+    Streamlit state.
+
+    Args:
+        source (str or file): Path or seekable binary file object
+        dry_run (bool): Only report what would be imported, without writing anything
+        progress (callable, optional): Called with the completed fraction (0.0 - 1.0)
+
+    Returns:
+        dict: Summary with project_id, project_name, new_project, total, imported,
+            duplicates, text, image and dry_run
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return import_project_archive(f, dry_run=dry_run, progress=progress)
+
+    storage = get_storage()
+    blob_store = get_blob_store()
+    source.seek(0, os.SEEK_END)
+    source_size = max(1, source.tell())
+    source.seek(0)
+
+    archive = None
+    if zipfile.is_zipfile(source):
+        source.seek(0)
+        archive = zipfile.ZipFile(source)
+        if MANIFEST_NAME not in archive.namelist():
+            raise ValueError("Invalid project archive: manifest.json is missing")
+        member_count = max(1, len(archive.infolist()) - 1)
+        text_file = io.TextIOWrapper(archive.open(MANIFEST_NAME), encoding="utf-8")
+    else:
+        source.seek(0)
+        text_file = io.TextIOWrapper(source, encoding="utf-8")
+
+    summary = {"project_id": None, "project_name": None, "new_project": False, "total": 0,
+               "imported": 0, "duplicates": 0, "text": 0, "image": 0, "dry_run": dry_run}
+    seen = set()
+    used_ids = set()
+    batch = []
+    reported = 0.0
+
+    def flush():
+        if not batch:
+            return
+        # Keep original asset ids unless they are taken already
+        taken = {asset["id"] for asset in storage.get_assets_by_ids([asset["id"] for asset in batch])}
+        for asset in batch:
+            if asset["id"] in taken:
+                asset["id"] = str(uuid.uuid4())
+        if not dry_run:
+            storage.add_assets(batch)
+            get_search_index().add_many(batch)
+            get_image_hash_index().add_many(batch)
+        batch.clear()
+
+    try:
+        for kind, item in _iter_document(_JSONStream(text_file)):
+            if kind == "project":
+                project_id = item.get("id") or str(uuid.uuid4())
+                existing = storage.get_project(project_id)
+                summary["project_id"] = project_id
+                summary["project_name"] = existing["name"] if existing else item.get("name") or "Imported Project"
+                summary["new_project"] = existing is None
+                if existing:
+                    for asset in _iter_project_assets(storage, project_id):
+                        seen.add((asset["type"], _asset_hash(asset["type"], asset["content"])))
+                elif not dry_run:
+                    storage.create_project({
+                        "id": project_id,
+                        "name": summary["project_name"],
+                        "description": item.get("description") or "",
+                        "brand_guidelines": item.get("brand_guidelines") or "",
+                        "target_audience": item.get("target_audience") or "",
+                        "created_at": _parse_datetime(item.get("created_at")),
+                    })
+                continue
+
+            summary["total"] += 1
+            asset_type = item.get("type", "text")
+            file_name = item.get("file")
+
+            if asset_type != "image":
+                content = archive.read(file_name).decode("utf-8") if archive and file_name else item.get("content", "")
+                key = (asset_type, _sha256(content.encode("utf-8")))
+            elif item.get("url"):
+                content = item["url"]
+                key = (asset_type, _sha256(content.encode("utf-8")))
+            elif archive and file_name:
+                digest = item.get("sha256")
+                if not digest:
+                    chunks = _iter_member(archive, file_name)
+                    digest = _hash_chunks(chunks) if dry_run else blob_store.put_stream(chunks)
+                content = digest
+                key = (asset_type, digest)
+            else:
+                content = item.get("content", "")
+                if is_blob_ref(content) or content.startswith("http"):
+                    key = (asset_type, _asset_hash(asset_type, content))
+                else:
+                    # Inline base64 from export_project(); move it into the blob store
+                    data = base64.b64decode(content)
+                    content = _sha256(data) if dry_run else blob_store.put(data)
+                    key = (asset_type, content)
+
+            if key in seen:
+                summary["duplicates"] += 1
+            else:
+                seen.add(key)
+                if archive and file_name and asset_type == "image" and not dry_run and not blob_store.exists(content):
+                    content = blob_store.put_stream(_iter_member(archive, file_name))
+
+                asset_id = item.get("id") or str(uuid.uuid4())
+                if asset_id in used_ids:
+                    asset_id = str(uuid.uuid4())
+                used_ids.add(asset_id)
+                batch.append({
+                    "id": asset_id,
+                    "project_id": summary["project_id"],
+                    "type": asset_type,
+                    "content": content,
+                    "description": item.get("description") or "",
+                    "created_at": _parse_datetime(item.get("created_at")),
+                })
+                summary["imported"] += 1
+                summary[asset_type] = summary.get(asset_type, 0) + 1
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    flush()
+
+            if progress:
+                done = summary["total"] / member_count if archive else source.tell() / source_size
+                if done - reported >= 0.01:
+                    reported = min(1.0, done)
+                    progress(reported)
+        flush()
+    finally:
+        if archive is not None:
+            archive.close()
+        else:
+            # Leave the caller's file object open
+            text_file.detach()
+
+    if summary["project_id"] is None:
+        raise ValueError("Invalid project file: no project found")
+    if progress:
+        progress(1.0)
+    return summary
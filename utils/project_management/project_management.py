@@ -1,18 +1,29 @@
 import streamlit as st
 import uuid
 import json
-from datetime import datetime
+import base64
+
+from utils.storage.storage import get_storage, now
+from utils.blob_store.blob_store import get_blob_store, is_blob_ref
+from utils.renditions.renditions import get_rendition_cache
+from utils.history_log.history_log import get_history_log
+from utils.project_management.project_archive import clear_export_cache
+from utils.search_index.search_index import get_search_index
+from utils.image_hash.image_hash import get_image_hash_index
+from utils.prompt_index.prompt_index import get_prompt_index
+from utils.content_generation.response_cache import get_response_cache
+from utils.job_queue.job_queue import get_job_queue
 
 def create_project(name, description, brand_guidelines, target_audience):
     """
-    Create a new project and add it to the session state
-    
+    Create a new project in the project store and make it the active project
+
     Args:
         name (str): Project name
         description (str): Project description
         brand_guidelines (str): Brand guidelines
         target_audience (str): Target audience description
-    
+
     Returns:
         str: Project ID
     """
@@ -23,49 +34,104 @@ def create_project(name, description, brand_guidelines, target_audience):
         "description": description,
         "brand_guidelines": brand_guidelines,
         "target_audience": target_audience,
-        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "assets": []
+        "created_at": now()
     }
-    st.session_state.projects.append(project)
+    get_storage().create_project(project)
     st.session_state.current_project = project_id
     return project_id
 
 def export_project(project_id):
     """
     Export a project as JSON
-    
+
+    Images kept in the blob store are inlined as base64 so the export is self-contained.
+
     Args:
         project_id (str): ID of the project to export
-    
+
     Returns:
         str: JSON string representation of the project or None if project not found
     """
-    project = next((p for p in st.session_state.projects if p["id"] == project_id), None)
+    storage = get_storage()
+    project = storage.get_project(project_id)
     if not project:
         return None
-    
-    return json.dumps(project, indent=2)
+
+    blob_store = get_blob_store()
+    project["assets"] = []
+    for asset in storage.get_assets(project_id=project_id):
+        asset = {k: v for k, v in asset.items() if k not in ("project_id", "project_name")}
+        if asset["type"] == "image" and is_blob_ref(asset["content"]):
+            with blob_store.open(asset["content"]) as blob:
+                asset["content"] = base64.b64encode(blob).decode("utf-8")
+        project["assets"].append(asset)
+    return json.dumps(project, indent=2, default=str)
 
 def get_project_by_id(project_id):
     """
     Get a project by its ID
-    
+
     Args:
         project_id (str): ID of the project to retrieve
-    
+
     Returns:
         dict: Project data or None if not found
     """
-    return next((p for p in st.session_state.projects if p["id"] == project_id), None)
+    if not project_id:
+        return None
+    return get_storage().get_project(project_id)
 
 def get_project_by_name(project_name):
     """
     Get a project by its name
-    
+
     Args:
         project_name (str): Name of the project to retrieve
-    
+
     Returns:
         dict: Project data or None if not found
     """
-    return next((p for p in st.session_state.projects if p["name"] == project_name), None)
\ No newline at end of file
+    return get_storage().get_project_by_name(project_name)
+
+def list_projects(limit=None, newest_first=False):
+    """
+    List projects ordered by creation time
+
+    Args:
+        limit (int, optional): Maximum number of projects to return
+        newest_first (bool): Return the most recently created projects first
+
+    Returns:
+        list: List of project dicts
+    """
+    return get_storage().list_projects(limit=limit, newest_first=newest_first)
+
+def count_projects():
+    """
+    Count all projects
+
+    Returns:
+        int: Number of projects
+    """
+    return get_storage().count_projects()
+
+def clear_all_data():
+    """
+    Delete all projects, assets, history and stored images and reset the session's project selection
+
+    Past prompts, cached completions and background jobs are deleted too, so
+    nothing deleted is offered again as a suggestion or served from the cache.
+    """
+    get_storage().clear()
+    get_history_log().clear()
+    clear_export_cache()
+    get_search_index().clear()
+    get_image_hash_index().clear()
+    get_prompt_index().clear()
+    get_response_cache().clear()
+    get_job_queue().clear()
+    rendition_cache = get_rendition_cache()
+    for digest in get_blob_store().gc(set(), min_age=0):
+        rendition_cache.discard(digest)
+    st.session_state.current_project = None
+    st.session_state.generated_content = {}
@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from utils.storage.storage import get_data_dir, DATETIME_FORMAT
+
+PROMPT_INDEX_FILENAME = "prompts.db"
+DEFAULT_MATCH_THRESHOLD = float(os.environ.get("CREATIVEFLOW_PROMPT_MATCH_THRESHOLD", "0.8"))
+NUM_PERMUTATIONS = 128
+SHINGLE_SIZE = 3
+# Weight of missed matches vs. extra candidates when choosing the LSH band layout;
+# candidates are verified against the full signature, so misses cost more
+FALSE_NEGATIVE_WEIGHT = 0.8
+MERSENNE_PRIME = (1 << 31) - 1
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_key TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    outputs TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_generations_prompt_key ON generations (kind, model, prompt_key);
+"""
+
+# Fixed seed so signatures stay comparable across restarts
+_random = np.random.RandomState(20240229)
+_PERM_A = _random.randint(1, MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _random.randint(0, MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingles(text):
+    """
+    Split text into overlapping word n-grams, ignoring case, punctuation and whitespace
+
+    Args:
+        text (str): Prompt text
+
+    Returns:
+        set: SHINGLE_SIZE-word shingles (the whole text if it is shorter)
+    """
+    words = WORD_RE.findall(text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text):
+    """
+    Compute the MinHash signature of a text's shingle set
+
+    The fraction of equal positions in two signatures estimates the Jaccard
+    similarity of the shingle sets.
+
+    Args:
+        text (str): Prompt text
+
+    Returns:
+        numpy.ndarray: NUM_PERMUTATIONS uint32 values
+    """
+    values = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles(text)),
+        dtype=np.uint64
+    ) % np.uint64(MERSENNE_PRIME)
+    # Universal hashing (a * x + b) mod p; with everything below 2^31 it cannot overflow 64 bits
+    permuted = (np.outer(_PERM_A, values) + _PERM_B[:, None]) % np.uint64(MERSENNE_PRIME)
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def lsh_layout(threshold, num_permutations=NUM_PERMUTATIONS):
+    """
+    Choose how many bands of how many rows to split signatures into
+
+    Two signatures become candidates when all rows of at least one band match,
+    which for Jaccard similarity s happens with probability 1 - (1 - s^rows)^bands.
+    The layout minimizes the weighted area of that curve on the wrong side of
+    the threshold.
+
+    Args:
+        threshold (float): Jaccard similarity from which texts should match
+        num_permutations (int): Signature length
+
+    Returns:
+        tuple: (bands, rows)
+    """
+    similarities = np.linspace(0, 1, 201)
+    best = None
+    for rows in range(1, num_permutations + 1):
+        bands = num_permutations // rows
+        probability = 1 - (1 - similarities ** rows) ** bands
+        false_positive = probability[similarities < threshold].sum()
+        false_negative = (1 - probability[similarities >= threshold]).sum()
+        error = (1 - FALSE_NEGATIVE_WEIGHT) * false_positive + FALSE_NEGATIVE_WEIGHT * false_negative
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+def _prompt_key(text):
+    return hashlib.sha256(" ".join(text.split()).lower().encode("utf-8")).hexdigest()
+
+
+class PromptIndex:
+    """
+    MinHash LSH index of past generation prompts and their outputs
+
+    Every completed generation is stored with the MinHash signature of its
+    prompt, and each signature band is kept in an in-memory hash table. A new
+    brief is looked up by its bands, so only prompts sharing a band are
+    compared, and candidates are kept if their estimated Jaccard similarity
+    reaches the threshold. Repeating an identical prompt replaces the stored
+    outputs instead of adding an entry.
+    """
+
+    def __init__(self, path, threshold=DEFAULT_MATCH_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.bands, self.rows = lsh_layout(threshold)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._load()
+
+    def _load(self):
+        self._signatures = {}
+        self._kinds = {}
+        self._buckets = [{} for _ in range(self.bands)]
+        for row in self._conn.execute("SELECT id, kind, model, signature FROM generations"):
+            self._index(row["id"], (row["kind"], row["model"]), np.frombuffer(row["signature"], dtype=np.uint32))
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _index(self, entry_id, kind, signature):
+        # Called with the lock held (or from __init__); kind is a (kind, model) pair
+        if entry_id in self._signatures:
+            return
+        self._signatures[entry_id] = signature
+        self._kinds[entry_id] = kind
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(key, []).append(entry_id)
+
+    def add(self, kind, prompt, model, outputs):
+        """
+        Remember the outputs of a generation
+
+        Args:
+            kind (str): 'text' or 'image'
+            prompt (str): The prompt that was sent
+            model (str): Model name
+            outputs (list): Generated texts or image blob digests
+        """
+        if not outputs:
+            return
+        signature = minhash(prompt)
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO generations (kind, model, prompt_key, prompt, outputs, signature, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (kind, model, prompt_key) DO UPDATE SET "
+                    "outputs = excluded.outputs, prompt = excluded.prompt, created_at = excluded.created_at "
+                    "RETURNING id",
+                    (kind, model, _prompt_key(prompt), prompt, json.dumps(outputs), signature.tobytes(),
+                     datetime.now().strftime(DATETIME_FORMAT))
+                )
+                entry_id = cursor.fetchone()[0]
+            self._index(entry_id, (kind, model), signature)
+
+    def find(self, kind, prompt, model, limit=3):
+        """
+        Find earlier generations of a model whose prompt is a near-duplicate of this one
+
+        Args:
+            kind (str): Only match generations of this kind ('text' or 'image')
+            prompt (str): The new prompt
+            model (str): Only match generations of this model
+            limit (int): Maximum number of matches
+
+        Returns:
+            list: Dicts with id, kind, model, prompt, outputs, created_at and
+                the estimated similarity (0-1), most similar first
+        """
+        signature = minhash(prompt)
+        with self._lock:
+            candidates = set()
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(bucket.get(key, ()))
+            scored = [
+                (float(np.count_nonzero(self._signatures[entry_id] == signature)) / NUM_PERMUTATIONS, entry_id)
+                for entry_id in candidates if self._kinds[entry_id] == (kind, model)
+            ]
+            matches = sorted((s for s in scored if s[0] >= self.threshold), reverse=True)[:limit]
+            if not matches:
+                return []
+            rows = {
+                row["id"]: row for row in self._conn.execute(
+                    f"SELECT id, kind, model, prompt, outputs, created_at FROM generations "
+                    f"WHERE id IN ({', '.join('?' * len(matches))})",
+                    [entry_id for _, entry_id in matches]
+                )
+            }
+        results = []
+        for similarity, entry_id in matches:
+            row = rows[entry_id]
+            results.append(dict(
+                row,
+                outputs=json.loads(row["outputs"]),
+                created_at=datetime.strptime(row["created_at"], DATETIME_FORMAT),
+                similarity=similarity
+            ))
+        return results
+
+    def count(self):
+        with self._lock:
+            return len(self._signatures)
+
+    def clear(self):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM generations")
+            self._load()
+
+
+_prompt_index = None
+_prompt_index_lock = threading.Lock()
+
+
+def get_prompt_index():
+    """
+    Get the process-wide prompt index kept in the data directory
+
+    Returns:
+        PromptIndex: The shared prompt index
+    """
+    global _prompt_index
+    if _prompt_index is None:
+        with _prompt_index_lock:
+            if _prompt_index is None:
+                _prompt_index = PromptIndex(os.path.join(get_data_dir(), PROMPT_INDEX_FILENAME))
+    return _prompt_index
@@ -0,0 +1,155 @@
+TEXT = "text"
+IMAGE = "image"
+
+# The generator form wrote its prompts as indented triple-quoted strings, so
+# every line after the first (blank ones included) starts with 16 spaces and
+# the prompt ends in a newline plus that indent. Response cache keys are
+# computed from the exact prompt text, so the layout is kept as it was.
+FORM_INDENT = " " * 16
+
+
+def _form_prompt(first_line, *lines):
+    return "\n".join([first_line] + [FORM_INDENT + line for line in lines] + [FORM_INDENT])
+
+
+def _marketing_copy(product_name, key_features, copy_length, tone):
+    return _form_prompt(
+        f"Create a compelling marketing copy for {product_name}.",
+        f"Key features: {key_features}",
+        f"Length: {copy_length}",
+        f"Tone: {tone}",
+        "Make it persuasive and focused on benefits. Format it nicely with headlines and sections.",
+    )
+
+
+def _social_media_post(platform, topic, include_hashtags, include_call_to_action):
+    return _form_prompt(
+        f"Create an engaging social media post for {platform} about {topic}.",
+        "Include relevant hashtags." if include_hashtags else "",
+        "Include a strong call-to-action." if include_call_to_action else "",
+        "Make it attention-grabbing and appropriate for the platform's audience.",
+    )
+
+
+def _campaign_concept(campaign_objective, campaign_duration, target_audience, key_message):
+    return _form_prompt(
+        "Develop a creative campaign concept with the following details:",
+        f"Objective: {campaign_objective}",
+        f"Target Audience: {target_audience}",
+        f"Key Message: {key_message}",
+        f"Duration: {campaign_duration}",
+        "",
+        "Include the following sections:",
+        "1. Campaign Name/Tagline",
+        "2. Concept Overview",
+        "3. Key Visuals Description",
+        "4. Channel Strategy",
+        "5. Expected Outcomes",
+    )
+
+
+def _brand_storytelling(brand_name, brand_values, brand_history, target_audience):
+    return _form_prompt(
+        f"Craft a compelling brand story for {brand_name} with the following elements:",
+        f"Brand History: {brand_history}",
+        f"Brand Values: {brand_values}",
+        f"Target Audience: {target_audience}",
+        "",
+        "Create a narrative that emotionally connects with the audience, highlights the brand's journey,",
+        "and emphasizes its values and vision for the future. The story should be authentic and memorable.",
+    )
+
+
+def _visual_content(visual_type, style, description, theme):
+    return _form_prompt(
+        f"Create a {style.lower()} {visual_type.lower()} with the following details:",
+        f"Description: {description}",
+        f"Theme/Mood: {theme}",
+        "",
+        "Make it visually striking and appropriate for commercial use. Ensure it has professional quality",
+        f"and would be suitable for a {visual_type.lower()}.",
+    )
+
+
+def _custom_content(content_description, additional_context):
+    return _form_prompt(
+        "Create content based on the following requirements:",
+        f"{content_description}",
+        "",
+        "Additional context:",
+        f"{additional_context}",
+        "",
+        "Provide a well-structured, creative and professional output that meets these requirements.",
+    )
+
+
+# Generation type -> content kind, prompt builder and its fields with their form defaults
+TEMPLATES = {
+    "Marketing Copy": {
+        "kind": TEXT,
+        "build": _marketing_copy,
+        "fields": {"product_name": "", "key_features": "", "copy_length": "Short", "tone": "Professional"},
+    },
+    "Social Media Post": {
+        "kind": TEXT,
+        "build": _social_media_post,
+        "fields": {"platform": "Instagram", "topic": "", "include_hashtags": False, "include_call_to_action": False},
+    },
+    "Campaign Concept": {
+        "kind": TEXT,
+        "build": _campaign_concept,
+        "fields": {"campaign_objective": "", "campaign_duration": "", "target_audience": "", "key_message": ""},
+    },
+    "Brand Storytelling": {
+        "kind": TEXT,
+        "build": _brand_storytelling,
+        "fields": {"brand_name": "", "brand_values": "", "brand_history": "", "target_audience": ""},
+    },
+    "Visual Content": {
+        "kind": IMAGE,
+        "build": _visual_content,
+        "fields": {"visual_type": "Brand Image", "style": "Realistic", "description": "", "theme": ""},
+    },
+    "Custom Content": {
+        "kind": TEXT,
+        "build": _custom_content,
+        "fields": {"content_description": "", "additional_context": ""},
+    },
+}
+
+GENERATION_TYPES = list(TEMPLATES)
+
+
+def get_template(generation_type):
+    """
+    Look up a prompt template by its generation type
+
+    Args:
+        generation_type (str): One of GENERATION_TYPES, e.g. 'Marketing Copy'
+
+    Returns:
+        dict: The template's kind ('text' or 'image'), build function and fields with defaults
+
+    Raises:
+        ValueError: If there is no template for the generation type
+    """
+    template = TEMPLATES.get(generation_type)
+    if template is None:
+        raise ValueError(f"Unknown content type: {generation_type!r} (expected one of {', '.join(GENERATION_TYPES)})")
+    return template
+
+
+def build_prompt(generation_type, **fields):
+    """
+    Build the prompt the Content Generator sends for a brief
+
+    Args:
+        generation_type (str): One of GENERATION_TYPES
+        **fields: Brief fields; missing ones take the form's default and unknown ones are ignored
+
+    Returns:
+        str: The prompt
+    """
+    template = get_template(generation_type)
+    values = {name: fields.get(name, default) for name, default in template["fields"].items()}
+    return template["build"](**values)
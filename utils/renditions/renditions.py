@@ -0,0 +1,329 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.storage.storage import get_data_dir
+from utils.blob_store.blob_store import get_blob_store
+
+RENDITIONS_DIRNAME = "renditions"
+# Previews written by earlier versions; derived data, removed on first use
+LEGACY_THUMBNAILS_DIRNAME = "thumbnails"
+
+# Preview widths for on-screen views. Previews keep the aspect ratio and are never upscaled.
+PREVIEW_WIDTHS = (160, 320, 640, 1280)
+
+# Exact-size crops for publishing, centred on the image and upscaled if needed
+PLATFORM_RENDITIONS = {
+    "instagram_square": {"label": "Instagram post (1080×1080)", "size": (1080, 1080)},
+    "instagram_portrait": {"label": "Instagram portrait (1080×1350)", "size": (1080, 1350)},
+    "instagram_story": {"label": "Instagram story (1080×1920)", "size": (1080, 1920)},
+    "linkedin": {"label": "LinkedIn post (1200×627)", "size": (1200, 627)},
+    "x": {"label": "X post (1600×900)", "size": (1600, 900)},
+    "facebook": {"label": "Facebook post (1200×630)", "size": (1200, 630)},
+}
+
+RENDITION_FORMAT = os.environ.get("CREATIVEFLOW_RENDITION_FORMAT", "webp").lower()
+# Format -> (Pillow format, MIME type, save options)
+FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "avif": ("AVIF", "image/avif", {"quality": 60, "speed": 8}),
+}
+DEFAULT_WORKERS = int(os.environ.get("CREATIVEFLOW_RENDITION_WORKERS", str(min(4, os.cpu_count() or 1))))
+DEFAULT_CACHE_BYTES = int(os.environ.get("CREATIVEFLOW_THUMBNAIL_CACHE_MB", "64")) * 1024 * 1024
+
+
+def preview_name(width):
+    return f"w{width}"
+
+
+def pick_preview(width):
+    """
+    Choose the smallest preview at least as wide as the display width
+
+    Args:
+        width (int): Display width in pixels
+
+    Returns:
+        str: Rendition name, e.g. 'w320'
+    """
+    return preview_name(min((w for w in PREVIEW_WIDTHS if w >= width), default=max(PREVIEW_WIDTHS)))
+
+
+PREVIEW_NAMES = [preview_name(w) for w in PREVIEW_WIDTHS]
+RENDITION_NAMES = PREVIEW_NAMES + list(PLATFORM_RENDITIONS)
+
+
+def _resolve_format(name):
+    # AVIF needs a Pillow built with libavif; fall back to WebP rather than failing every encode
+    if name == "avif":
+        from PIL import features
+
+        if not features.check("avif"):
+            return "webp"
+    return name if name in FORMATS else "webp"
+
+
+def _write(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def render_renditions(source_path, targets, image_format):
+    """
+    Encode renditions of an image file (runs in a worker process)
+
+    Args:
+        source_path (str): Path of the original image
+        targets (list): (rendition name, output path) pairs
+        image_format (str): Key of FORMATS
+
+    Returns:
+        dict: Rendition name -> encoded size in bytes
+    """
+    from io import BytesIO
+    from PIL import Image, ImageOps
+
+    pil_format, _, options = FORMATS[image_format]
+    sizes = {}
+
+    def save(name, image, path):
+        buffer = BytesIO()
+        image.save(buffer, pil_format, **options)
+        _write(path, buffer.getvalue())
+        sizes[name] = buffer.tell()
+
+    with Image.open(source_path) as image:
+        image.load()
+        source = image.convert("RGB") if image.mode not in ("RGB", "RGBA") else image.copy()
+
+    paths = dict(targets)
+    for name, spec in PLATFORM_RENDITIONS.items():
+        if name in paths:
+            save(name, ImageOps.fit(source, spec["size"], Image.LANCZOS), paths[name])
+
+    # Downscale from the largest preview to the smallest, each step starting from the previous one
+    preview = source
+    for width in sorted(PREVIEW_WIDTHS, reverse=True):
+        name = preview_name(width)
+        if name not in paths:
+            continue
+        if preview.width > width:
+            preview = preview.resize((width, max(1, round(width * preview.height / preview.width))), Image.LANCZOS)
+        save(name, preview, paths[name])
+    return sizes
+
+
+class RenditionCache:
+    """
+    Resized, re-encoded copies of stored images with a memory and a disk tier
+
+    Every stored image gets a ladder of WebP (or AVIF) previews for on-screen
+    views and a set of exact-size crops for social platforms. They are
+    encoded on a process pool (previews as soon as an image is generated,
+    crops once it is saved), so neither Pillow's encoder nor the GIL holds
+    up script runs, and views pick the smallest preview that fills their
+    width. Recently downloaded renditions stay in memory until max_bytes is
+    exceeded. A preview that is not on disk yet (e.g. for images stored
+    before renditions existed) is queued and the view shows the original
+    meanwhile; downloads render a missing crop on request. Renditions that
+    fail to encode are not queued again until the process restarts.
+    """
+
+    def __init__(self, root, max_bytes=DEFAULT_CACHE_BYTES, workers=DEFAULT_WORKERS, image_format=RENDITION_FORMAT):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.image_format = _resolve_format(image_format)
+        self.mime_type = FORMATS[self.image_format][1]
+        self._entries = OrderedDict()
+        self._size = 0
+        # (digest, name) -> future of the queued render that produces it
+        self._pending = {}
+        # (digest, name) of renders that failed, e.g. for a corrupt source image
+        self._failed = set()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def path(self, digest, name):
+        return os.path.join(self.root, name, digest[:2], f"{digest}.{self.image_format}")
+
+    def _targets(self, digest, names):
+        return [(name, self.path(digest, name)) for name in names]
+
+    def _pool(self):
+        if self._executor is None:
+            # Spawned workers: forking a process that runs server and worker threads is unsafe
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def generate(self, digest, names=None):
+        """
+        Render renditions of a blob in this process
+
+        Args:
+            digest (str): SHA-256 digest of the source image in the blob store
+            names (list, optional): Renditions to render; all of RENDITION_NAMES by default
+
+        Returns:
+            dict: Rendition name -> encoded size in bytes
+        """
+        return render_renditions(
+            get_blob_store().path(digest), self._targets(digest, names or RENDITION_NAMES), self.image_format
+        )
+
+    def submit(self, digest, names=None):
+        """
+        Queue renditions of a blob on the worker processes and return immediately
+
+        Renditions already on disk, already queued or failed before are skipped.
+
+        Args:
+            digest (str): SHA-256 digest of the source image in the blob store
+            names (list, optional): Renditions to render; all of RENDITION_NAMES by default
+
+        Returns:
+            concurrent.futures.Future: Resolves to rendition name -> encoded size in bytes,
+                or None if there was nothing to render
+        """
+        with self._lock:
+            missing = [
+                name for name in names or RENDITION_NAMES
+                if (digest, name) not in self._pending and (digest, name) not in self._failed
+                and not os.path.exists(self.path(digest, name))
+            ]
+            if not missing:
+                return None
+            args = (render_renditions, get_blob_store().path(digest), self._targets(digest, missing), self.image_format)
+            try:
+                future = self._pool().submit(*args)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start a fresh pool
+                self._executor = None
+                future = self._pool().submit(*args)
+            for name in missing:
+                self._pending[(digest, name)] = future
+
+        def finished(_):
+            # A broken pool is not the image's fault; those renders are queued again on the next view
+            failed = (not future.cancelled() and future.exception() is not None
+                      and not isinstance(future.exception(), BrokenProcessPool))
+            with self._lock:
+                for name in missing:
+                    if self._pending.get((digest, name)) is future:
+                        del self._pending[(digest, name)]
+                    if failed:
+                        self._failed.add((digest, name))
+
+        future.add_done_callback(finished)
+        return future
+
+    def get(self, digest, name, render=True):
+        """
+        Get an encoded rendition
+
+        Args:
+            digest (str): SHA-256 digest of the source image
+            name (str): Rendition name, one of RENDITION_NAMES
+            render (bool): Render the rendition in this process if it is not on disk yet;
+                otherwise queue it and return None
+
+        Returns:
+            bytes or None: The encoded rendition, or None if it is not ready and render is False
+        """
+        key = (digest, name)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data
+
+        if render:
+            path = self.path(digest, name)
+            if not os.path.exists(path):
+                self.generate(digest, [name])
+        else:
+            path = self.ready_path(digest, name)
+            if path is None:
+                return None
+        with open(path, "rb") as f:
+            data = f.read()
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = data
+                self._size += len(data)
+            while self._size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+        return data
+
+    def ready_path(self, digest, name):
+        """
+        Get the file of a rendition, without waiting for it to be encoded
+
+        A missing preview queues the image's other missing previews with it,
+        since they are downscaled from one decode of the source; platform
+        crops are left for when the image is saved or downloaded.
+
+        Args:
+            digest (str): SHA-256 digest of the source image
+            name (str): Rendition name
+
+        Returns:
+            str or None: Path of the encoded rendition, or None if it is still being encoded or failed
+        """
+        path = self.path(digest, name)
+        if os.path.exists(path):
+            return path
+        self.submit(digest, PREVIEW_NAMES if name in PREVIEW_NAMES else [name])
+        return None
+
+    def discard(self, digest):
+        """
+        Remove all renditions of a blob from memory and disk
+
+        Args:
+            digest (str): SHA-256 digest of the source image
+        """
+        with self._lock:
+            for name in RENDITION_NAMES:
+                self._failed.discard((digest, name))
+                data = self._entries.pop((digest, name), None)
+                if data is not None:
+                    self._size -= len(data)
+        for name in RENDITION_NAMES:
+            for image_format in FORMATS:
+                try:
+                    os.remove(os.path.join(self.root, name, digest[:2], f"{digest}.{image_format}"))
+                except FileNotFoundError:
+                    pass
+
+
+_rendition_cache = None
+_rendition_cache_lock = threading.Lock()
+
+
+def get_rendition_cache():
+    """
+    Get the process-wide rendition cache
+
+    Returns:
+        RenditionCache: The shared rendition cache
+    """
+    global _rendition_cache
+    if _rendition_cache is None:
+        with _rendition_cache_lock:
+            if _rendition_cache is None:
+                data_dir = get_data_dir()
+                shutil.rmtree(os.path.join(data_dir, LEGACY_THUMBNAILS_DIRNAME), ignore_errors=True)
+                _rendition_cache = RenditionCache(os.path.join(data_dir, RENDITIONS_DIRNAME))
+    return _rendition_cache
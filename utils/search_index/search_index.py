@@ -0,0 +1,216 @@
+import html
+import os
+import re
+import sqlite3
+import threading
+
+from utils.storage.storage import get_data_dir, get_storage
+
+SEARCH_FILENAME = "search.db"
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+# Marks matches inside FTS5 output until the text around them is HTML-escaped
+_MATCH_START = "\x02"
+_MATCH_END = "\x03"
+SNIPPET_TOKENS = 24
+REBUILD_BATCH_SIZE = 1000
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS asset_search USING fts5(
+    content,
+    description,
+    prompt,
+    asset_id UNINDEXED,
+    project_id UNINDEXED,
+    type UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+"""
+
+
+def _to_html(text):
+    # Stored text is escaped first so only the match markers become markup
+    if text is None:
+        return None
+    escaped = html.escape(text)
+    return escaped.replace(_MATCH_START, HIGHLIGHT_START).replace(_MATCH_END, HIGHLIGHT_END)
+
+
+def build_match_query(text):
+    """
+    Turn free text from the search box into an FTS5 MATCH expression
+
+    Every word must match; the last one also matches as a prefix so results
+    appear while a word is still being typed. FTS5 operators in the input are
+    treated as plain words.
+
+    Args:
+        text (str): User query
+
+    Returns:
+        str: MATCH expression, or None if the query has no searchable words
+    """
+    tokens = TOKEN_RE.findall(text)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 index over asset content, descriptions and generation prompts
+
+    Assets are added as they are saved. Image assets are searchable by their
+    description and prompt; their content (a blob digest) is not indexed.
+    Results are ranked with BM25 and come with the matches highlighted.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    @staticmethod
+    def _row(asset, prompt):
+        content = asset["content"] if asset["type"] != "image" else ""
+        return (content, asset.get("description") or "", prompt or "", asset["id"], asset["project_id"], asset["type"])
+
+    def add(self, asset, prompt=None):
+        """
+        Index a saved asset
+
+        Args:
+            asset (dict): Asset with the storage ASSET_COLUMNS keys
+            prompt (str, optional): Prompt the asset was generated from
+        """
+        self.add_many([asset], [prompt])
+
+    def add_many(self, assets, prompts=None):
+        """
+        Index several assets in one transaction
+
+        Args:
+            assets (list): Assets with the storage ASSET_COLUMNS keys
+            prompts (list, optional): Prompt of each asset, or None entries
+        """
+        prompts = prompts or [None] * len(assets)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO asset_search (content, description, prompt, asset_id, project_id, type) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [self._row(asset, prompt) for asset, prompt in zip(assets, prompts)]
+            )
+
+    @staticmethod
+    def _filters(match, project_id, asset_type):
+        clauses, params = ["asset_search MATCH ?"], [match]
+        if project_id is not None:
+            clauses.append("project_id = ?")
+            params.append(project_id)
+        if asset_type is not None:
+            clauses.append("type = ?")
+            params.append(asset_type)
+        return " AND ".join(clauses), params
+
+    def search(self, text, project_id=None, asset_type=None, offset=0, limit=20):
+        """
+        Find assets matching a query, best matches first
+
+        Args:
+            text (str): Free-text query
+            project_id (str, optional): Only search assets of this project
+            asset_type (str, optional): Only search assets of this type
+            offset (int): Number of results to skip
+            limit (int): Maximum number of results
+
+        Returns:
+            list: Dicts with asset_id, project_id, type, score, the highlighted
+                content and description and a highlighted prompt snippet (escaped
+                HTML with <mark> tags)
+        """
+        match = build_match_query(text)
+        if match is None:
+            return []
+        where, params = self._filters(match, project_id, asset_type)
+        highlights = (
+            "highlight(asset_search, 0, ?, ?) AS content_highlight, "
+            "highlight(asset_search, 1, ?, ?) AS description_highlight, "
+            f"snippet(asset_search, 2, ?, ?, '…', {SNIPPET_TOKENS}) AS prompt_snippet"
+        )
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT asset_id, project_id, type, bm25(asset_search) AS score, {highlights} "
+                f"FROM asset_search WHERE {where} ORDER BY score LIMIT ? OFFSET ?",
+                [_MATCH_START, _MATCH_END] * 3 + params + [limit, offset]
+            ).fetchall()
+        results = []
+        for row in rows:
+            result = dict(row)
+            for column in ("content_highlight", "description_highlight", "prompt_snippet"):
+                result[column] = _to_html(result[column])
+            results.append(result)
+        return results
+
+    def count(self, text, project_id=None, asset_type=None):
+        match = build_match_query(text)
+        if match is None:
+            return 0
+        where, params = self._filters(match, project_id, asset_type)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM asset_search WHERE {where}", params).fetchone()[0]
+
+    def size(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM asset_search").fetchone()[0]
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM asset_search")
+
+    def rebuild(self, storage):
+        """
+        Re-index every asset in a storage backend; prompts of existing assets are not known
+
+        Args:
+            storage (StorageBackend): Storage to read the assets from
+        """
+        self.clear()
+        offset = 0
+        while True:
+            batch = storage.get_assets(offset=offset, limit=REBUILD_BATCH_SIZE)
+            if batch:
+                self.add_many(batch)
+            if len(batch) < REBUILD_BATCH_SIZE:
+                return
+            offset += len(batch)
+
+
+_search_index = None
+_search_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """
+    Get the process-wide search index kept in the data directory
+
+    The index is built from the stored assets the first time it is created.
+
+    Returns:
+        SearchIndex: The shared search index
+    """
+    global _search_index
+    if _search_index is None:
+        with _search_index_lock:
+            if _search_index is None:
+                search_index = SearchIndex(os.path.join(get_data_dir(), SEARCH_FILENAME))
+                storage = get_storage()
+                if search_index.size() == 0 and storage.count_assets():
+                    search_index.rebuild(storage)
+                _search_index = search_index
+    return _search_index
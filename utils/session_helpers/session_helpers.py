@@ -3,24 +3,36 @@ import streamlit as st
 def initialize_session_state():
     """
     Initialize the session state variables if they don't exist
+
+    Projects, assets and history live in the shared storage backend
+    (see utils.storage), so only per-session UI state is kept here.
     """
     if 'api_key' not in st.session_state:
         st.session_state.api_key = ""
     
-    if 'projects' not in st.session_state:
-        st.session_state.projects = []
-    
     if 'current_project' not in st.session_state:
         st.session_state.current_project = None
     
     if 'generated_content' not in st.session_state:
         st.session_state.generated_content = {}
     
-    if 'history' not in st.session_state:
-        st.session_state.history = []
+    if 'prompt_matches' not in st.session_state:
+        st.session_state.prompt_matches = None
     
     if 'default_text_model' not in st.session_state:
         st.session_state.default_text_model = "meta-llama/Llama-3.3-70B-Instruct-Turbo"
     
     if 'default_image_model' not in st.session_state:
-        st.session_state.default_image_model = "stabilityai/stable-diffusion-xl-base-1.0"
\ No newline at end of file
+        st.session_state.default_image_model = "stabilityai/stable-diffusion-xl-base-1.0"
+    
+    if 'show_new_project' not in st.session_state:
+        st.session_state.show_new_project = False
+    
+    if 'show_import_project' not in st.session_state:
+        st.session_state.show_import_project = False
+    
+    if 'current_project_view' not in st.session_state:
+        st.session_state.current_project_view = None
+    
+    if 'show_clear_confirm' not in st.session_state:
+        st.session_state.show_clear_confirm = False
@@ -0,0 +1,524 @@
+import bisect
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_DATA_DIR = "data"
+DEFAULT_BACKEND = "sqlite"
+SQLITE_FILENAME = "creativeflow.db"
+LOCK_FILENAME = ".lock"
+
+PROJECT_COLUMNS = ("id", "name", "description", "brand_guidelines", "target_audience", "created_at")
+ASSET_COLUMNS = ("id", "project_id", "type", "content", "description", "created_at")
+DATETIME_COLUMNS = ("created_at", "timestamp")
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    brand_guidelines TEXT NOT NULL DEFAULT '',
+    target_audience TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_projects_name ON projects (name);
+CREATE INDEX IF NOT EXISTS idx_projects_created_at ON projects (created_at);
+
+CREATE TABLE IF NOT EXISTS assets (
+    id TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+    type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_assets_project_type_created ON assets (project_id, type, created_at);
+CREATE INDEX IF NOT EXISTS idx_assets_type_created ON assets (type, created_at);
+CREATE INDEX IF NOT EXISTS idx_assets_created_at ON assets (created_at);
+"""
+
+
+def now():
+    """
+    Get the current time at the one-second precision timestamps are stored with
+
+    Returns:
+        datetime: Current local time
+    """
+    return datetime.now().replace(microsecond=0)
+
+
+def _to_db(value):
+    return value.strftime(DATETIME_FORMAT) if isinstance(value, datetime) else value
+
+
+def _from_db(row):
+    item = dict(row)
+    for column in DATETIME_COLUMNS:
+        if isinstance(item.get(column), str):
+            item[column] = datetime.fromisoformat(item[column])
+    return item
+
+
+class StorageBackend:
+    """
+    Interface for durable project and asset storage
+
+    Projects are returned as dicts with the keys in PROJECT_COLUMNS and assets
+    as dicts with the keys in ASSET_COLUMNS plus "project_name". created_at
+    values are datetimes. Activity history lives in utils.history_log.
+    """
+
+    def create_project(self, project):
+        raise NotImplementedError
+
+    def get_project(self, project_id):
+        raise NotImplementedError
+
+    def get_project_by_name(self, name):
+        raise NotImplementedError
+
+    def list_projects(self, limit=None, newest_first=False):
+        raise NotImplementedError
+
+    def count_projects(self):
+        raise NotImplementedError
+
+    def add_asset(self, asset):
+        raise NotImplementedError
+
+    def add_assets(self, assets):
+        raise NotImplementedError
+
+    def get_assets(self, project_id=None, asset_type=None, offset=0, limit=None, newest_first=False):
+        raise NotImplementedError
+
+    def get_assets_by_ids(self, asset_ids):
+        raise NotImplementedError
+
+    def iter_asset_keys(self):
+        raise NotImplementedError
+
+    def count_assets(self, project_id=None, asset_type=None):
+        raise NotImplementedError
+
+    def iter_asset_contents(self, asset_type=None):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    SQLite storage backend running in WAL mode
+
+    Connections are pooled so concurrent Streamlit sessions can read while
+    another session writes; every lookup the app performs is served by an index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._pool = queue.LifoQueue()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _fetch_one(self, sql, params=()):
+        with self._connection() as conn:
+            row = conn.execute(sql, params).fetchone()
+        return _from_db(row) if row else None
+
+    def _fetch_all(self, sql, params=()):
+        with self._connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [_from_db(row) for row in rows]
+
+    def _execute(self, sql, params=()):
+        with self._connection() as conn:
+            with conn:
+                conn.execute(sql, params)
+
+    @staticmethod
+    def _asset_filters(project_id, asset_type):
+        clauses, params = [], []
+        if project_id is not None:
+            clauses.append("a.project_id = ?")
+            params.append(project_id)
+        if asset_type is not None:
+            clauses.append("a.type = ?")
+            params.append(asset_type)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def create_project(self, project):
+        self._execute(
+            f"INSERT INTO projects ({', '.join(PROJECT_COLUMNS)}) VALUES ({', '.join('?' * len(PROJECT_COLUMNS))})",
+            [_to_db(project[c]) for c in PROJECT_COLUMNS]
+        )
+
+    def get_project(self, project_id):
+        return self._fetch_one("SELECT * FROM projects WHERE id = ?", (project_id,))
+
+    def get_project_by_name(self, name):
+        return self._fetch_one(
+            "SELECT * FROM projects WHERE name = ? ORDER BY created_at, rowid LIMIT 1", (name,)
+        )
+
+    def list_projects(self, limit=None, newest_first=False):
+        order = "DESC" if newest_first else "ASC"
+        sql = f"SELECT * FROM projects ORDER BY created_at {order}, rowid {order}"
+        if limit is not None:
+            return self._fetch_all(sql + " LIMIT ?", (limit,))
+        return self._fetch_all(sql)
+
+    def count_projects(self):
+        return self._fetch_one("SELECT COUNT(*) AS n FROM projects")["n"]
+
+    def add_asset(self, asset):
+        self._execute(
+            f"INSERT INTO assets ({', '.join(ASSET_COLUMNS)}) VALUES ({', '.join('?' * len(ASSET_COLUMNS))})",
+            [_to_db(asset[c]) for c in ASSET_COLUMNS]
+        )
+
+    def add_assets(self, assets):
+        with self._connection() as conn:
+            with conn:
+                conn.executemany(
+                    f"INSERT INTO assets ({', '.join(ASSET_COLUMNS)}) VALUES ({', '.join('?' * len(ASSET_COLUMNS))})",
+                    [[_to_db(asset[c]) for c in ASSET_COLUMNS] for asset in assets]
+                )
+
+    def get_assets(self, project_id=None, asset_type=None, offset=0, limit=None, newest_first=False):
+        where, params = self._asset_filters(project_id, asset_type)
+        order = "DESC" if newest_first else "ASC"
+        return self._fetch_all(
+            f"SELECT a.*, p.name AS project_name FROM assets a "
+            f"JOIN projects p ON p.id = a.project_id {where} "
+            f"ORDER BY a.created_at {order}, a.rowid {order} LIMIT ? OFFSET ?",
+            params + [-1 if limit is None else limit, offset]
+        )
+
+    def get_assets_by_ids(self, asset_ids):
+        assets = {}
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(asset_ids), 900):
+            chunk = asset_ids[start:start + 900]
+            for asset in self._fetch_all(
+                f"SELECT a.*, p.name AS project_name FROM assets a "
+                f"JOIN projects p ON p.id = a.project_id WHERE a.id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            ):
+                assets[asset["id"]] = asset
+        return [assets[asset_id] for asset_id in asset_ids if asset_id in assets]
+
+    def iter_asset_keys(self):
+        with self._connection() as conn:
+            for row in conn.execute("SELECT id, project_id, type, created_at FROM assets ORDER BY created_at, rowid"):
+                yield row["id"], row["project_id"], row["type"], datetime.fromisoformat(row["created_at"])
+
+    def count_assets(self, project_id=None, asset_type=None):
+        where, params = self._asset_filters(project_id, asset_type)
+        return self._fetch_one(f"SELECT COUNT(*) AS n FROM assets a {where}", params)["n"]
+
+    def iter_asset_contents(self, asset_type=None):
+        where, params = self._asset_filters(None, asset_type)
+        with self._connection() as conn:
+            for row in conn.execute(f"SELECT a.content FROM assets a {where}", params):
+                yield row["content"]
+
+    def read_legacy_history(self):
+        """
+        Read the history table used before history moved to its own log
+
+        Returns:
+            list: The table's history items, oldest first (empty if there is no table)
+        """
+        with self._connection() as conn:
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history'").fetchone() is None:
+                return []
+            rows = conn.execute("SELECT * FROM history ORDER BY timestamp, seq").fetchall()
+        items = [_from_db(row) for row in rows]
+        for item in items:
+            item.pop("seq", None)
+        return items
+
+    def drop_legacy_history(self):
+        self._execute("DROP TABLE IF EXISTS history")
+
+    def clear(self):
+        with self._connection() as conn:
+            with conn:
+                conn.execute("DELETE FROM assets")
+                conn.execute("DELETE FROM projects")
+
+
+class IndexedStorage(StorageBackend):
+    """
+    In-memory index in front of another storage backend
+
+    Projects are held in id and name maps, and every asset id is posted to
+    the (project, type) lists it belongs to, in creation order, including the
+    "any project" and "any type" combinations. Lookups and counts are dict
+    and list operations, and filtered asset views only fetch the rows they
+    return. The posting lengths double as per project and type asset
+    counters. Writes go to the backend first and then update the index, so
+    the index is rebuilt from the backend on start and stays consistent as
+    long as this process is the only writer, which lock_data_dir enforces.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        with self._lock:
+            self._projects = {}
+            self._projects_by_name = {}
+            self._project_order = []
+            self._postings = {}
+            for project in self.backend.list_projects():
+                self._index_project(project)
+            self._created = {}
+            for asset_id, project_id, asset_type, created_at in self.backend.iter_asset_keys():
+                self._index_asset(asset_id, project_id, asset_type, created_at)
+
+    def _index_project(self, project):
+        self._projects[project["id"]] = project
+        # The first project created under a name wins, as in the backend lookup
+        named = self._projects_by_name.get(project["name"])
+        if named is None or named["created_at"] > project["created_at"]:
+            self._projects_by_name[project["name"]] = project
+        order = self._project_order
+        if not order or self._projects[order[-1]]["created_at"] <= project["created_at"]:
+            order.append(project["id"])
+        else:
+            bisect.insort(order, project["id"], key=lambda project_id: self._projects[project_id]["created_at"])
+
+    def _index_asset(self, asset_id, project_id, asset_type, created_at):
+        self._created[asset_id] = created_at
+        for key in ((project_id, asset_type), (project_id, None), (None, asset_type), (None, None)):
+            ids = self._postings.setdefault(key, [])
+            if not ids or self._created[ids[-1]] <= created_at:
+                ids.append(asset_id)
+            else:
+                # Imported assets can be older than existing ones; keep the backend's order
+                bisect.insort(ids, asset_id, key=self._created.__getitem__)
+
+    def asset_ids(self, project_id=None, asset_type=None, offset=0, limit=None, newest_first=False,
+                  exclude_ids=None):
+        """
+        Get one page of matching asset ids from the index
+
+        Args:
+            project_id (str, optional): Only include assets of this project
+            asset_type (str, optional): Only include assets of this type
+            offset (int): Number of matching assets to skip
+            limit (int, optional): Maximum number of ids to return
+            newest_first (bool): Page from the most recently created asset backwards
+            exclude_ids (set, optional): Leave these assets out; offset counts only the others
+
+        Returns:
+            list: Asset ids; a snapshot that later writes don't change
+        """
+        with self._lock:
+            ids = self._postings.get((project_id, asset_type), [])
+            if exclude_ids:
+                # Walk the posting list only as far as the requested page reaches
+                shown = (asset_id for asset_id in (reversed(ids) if newest_first else ids) if asset_id not in exclude_ids)
+                return list(itertools.islice(shown, offset, None if limit is None else offset + limit))
+            if not newest_first:
+                return ids[offset:None if limit is None else offset + limit]
+            end = max(0, len(ids) - offset)
+            start = 0 if limit is None else max(0, end - limit)
+            return ids[start:end][::-1]
+
+    def create_project(self, project):
+        with self._lock:
+            self.backend.create_project(project)
+            self._index_project(dict(project))
+
+    def get_project(self, project_id):
+        project = self._projects.get(project_id)
+        return dict(project) if project else None
+
+    def get_project_by_name(self, name):
+        project = self._projects_by_name.get(name)
+        return dict(project) if project else None
+
+    def list_projects(self, limit=None, newest_first=False):
+        with self._lock:
+            order = self._project_order
+            if newest_first:
+                order = (order if limit is None else order[max(0, len(order) - limit):])[::-1]
+            elif limit is not None:
+                order = order[:limit]
+            return [dict(self._projects[project_id]) for project_id in order]
+
+    def count_projects(self):
+        return len(self._projects)
+
+    def add_asset(self, asset):
+        with self._lock:
+            self.backend.add_asset(asset)
+            self._index_asset(asset["id"], asset["project_id"], asset["type"], asset["created_at"])
+
+    def add_assets(self, assets):
+        with self._lock:
+            self.backend.add_assets(assets)
+            for asset in assets:
+                self._index_asset(asset["id"], asset["project_id"], asset["type"], asset["created_at"])
+
+    def get_assets(self, project_id=None, asset_type=None, offset=0, limit=None, newest_first=False, exclude_ids=None):
+        return self.backend.get_assets_by_ids(
+            self.asset_ids(project_id, asset_type, offset=offset, limit=limit, newest_first=newest_first,
+                           exclude_ids=exclude_ids)
+        )
+
+    def get_assets_by_ids(self, asset_ids):
+        return self.backend.get_assets_by_ids(asset_ids)
+
+    def iter_asset_keys(self):
+        return self.backend.iter_asset_keys()
+
+    def count_assets(self, project_id=None, asset_type=None):
+        with self._lock:
+            return len(self._postings.get((project_id, asset_type), ()))
+
+    def iter_asset_contents(self, asset_type=None):
+        return self.backend.iter_asset_contents(asset_type=asset_type)
+
+    def clear(self):
+        with self._lock:
+            self.backend.clear()
+            self._load()
+
+
+def _sqlite_backend(data_dir):
+    return SQLiteStorage(os.path.join(data_dir, SQLITE_FILENAME))
+
+
+_BACKENDS = {"sqlite": _sqlite_backend}
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def register_backend(name, factory):
+    """
+    Register a storage backend so it can be selected with CREATIVEFLOW_STORAGE
+
+    Args:
+        name (str): Backend name
+        factory (callable): Called with the data directory, returns a StorageBackend
+    """
+    _BACKENDS[name] = factory
+
+
+def get_data_dir():
+    """
+    Get the directory where CreativeFlow keeps its persistent data
+
+    Returns:
+        str: Path of the data directory (created if missing)
+    """
+    data_dir = os.environ.get("CREATIVEFLOW_DATA_DIR", DEFAULT_DATA_DIR)
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
+
+
+_data_dir_lock = None
+_data_dir_lock_guard = threading.Lock()
+
+
+def lock_data_dir():
+    """
+    Take the exclusive lock on the data directory for the rest of this process
+
+    The indexes, the history log and other stores keep in-memory state that
+    is built on start and assumes this process is the only writer, so the app
+    and bulk_generate.py must not use the same data directory at once. The
+    operating system drops the lock when the process exits, even on a crash.
+
+    Returns:
+        bool: True if this process holds the lock, False if another process does
+    """
+    global _data_dir_lock
+    with _data_dir_lock_guard:
+        if _data_dir_lock is not None:
+            return True
+        lock_file = open(os.path.join(get_data_dir(), LOCK_FILENAME), "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        # Keep the file open; closing it would release the lock
+        _data_dir_lock = lock_file
+        return True
+
+
+def get_storage():
+    """
+    Get the process-wide storage backend, shared by every Streamlit session
+
+    The configured backend is wrapped in an IndexedStorage.
+
+    Returns:
+        StorageBackend: The configured storage backend
+    """
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                name = os.environ.get("CREATIVEFLOW_STORAGE", DEFAULT_BACKEND)
+                if name not in _BACKENDS:
+                    raise ValueError(f"Unknown storage backend: {name}")
+                _storage = IndexedStorage(_BACKENDS[name](get_data_dir()))
+    return _storage
+
+
+def set_storage(backend):
+    """
+    Replace the process-wide storage backend
+
+    Args:
+        backend (StorageBackend): Backend to use from now on
+    """
+    global _storage
+    with _storage_lock:
+        _storage = backend